@@ -11,12 +11,32 @@ from kivy.graphics import Color, RoundedRectangle
 from kivy.properties import ListProperty, StringProperty
 from kivy.clock import Clock
 from datetime import datetime
+import argparse
 import logging
 import socket
 import threading
 import json
+import math
+import secrets
 import time
-import sqlite3
+import database
+from retention import RetentionWorker
+from match_recorder import MatchRecorder, RECORDINGS_DIR
+from traffic_capture import TrafficRecorder
+from transport import TcpNetwork
+from framing import encode_frame, FrameDecoder
+from hit_validation import HitDeduplicator, ShotCorrelator
+from rate_limit import ClientRateLimiter, DEFAULT_RATE_LIMITS, message_class
+from admission import (AdmissionControl, DEFAULT_BACKLOG, DEFAULT_MAX_PER_IP, DEFAULT_MAX_CONNECTIONS,
+                       DEFAULT_HANDSHAKE_TIMEOUT)
+from heartbeat import HeartbeatManager
+from clock_sync import ClockSync, now_ms
+from socket_profile import socket_report
+from udp_channel import DatagramReceiver, MessageIds, decode_datagram, encode_datagram, UDP_MESSAGE_TYPES, MAX_DATAGRAM
+from spectator_feed import SpectatorPublisher, SPECTATOR_EVENTS, DEFAULT_SPECTATOR_GROUP, DEFAULT_SPECTATOR_PORT
+from subscriptions import SubscriptionRegistry
+from scoreboard import ScoreboardStream
+from game_timer import display_seconds
 from encryptions import encrypt_message, decrypt_message
 
 # Configure logging
@@ -48,15 +68,47 @@ class ModernRoundedButton(Button):
 
 # -------------------- Complete Game Server --------------------
 class GameServer:
-    def __init__(self, gui_callback, host='0.0.0.0', port=9999):
+    def __init__(self, gui_callback, host='0.0.0.0', port=9999, db_path=database.DB_PATH,
+                 recordings_dir=RECORDINGS_DIR, clock=time.time, threaded_timer=True, capture_dir=None,
+                 network=None, resume_grace=30, hit_window=0.25, shot_window=1.5,
+                 rate_limits=DEFAULT_RATE_LIMITS, backlog=DEFAULT_BACKLOG, max_per_ip=DEFAULT_MAX_PER_IP,
+                 max_connections=DEFAULT_MAX_CONNECTIONS, handshake_timeout=DEFAULT_HANDSHAKE_TIMEOUT,
+                 heartbeat_interval=2.0, udp_port=None, spectator_group=None,
+                 spectator_port=DEFAULT_SPECTATOR_PORT):
+        """
+        Args:
+            gui_callback: Called (on the Kivy thread) with log lines and PLAYER_JOINED/LEFT notices
+            db_path: SQLite file for game history (':memory:' keeps nothing)
+            recordings_dir: Where matches are recorded (None disables recording)
+            clock: Time source for game logic; replay.py substitutes a virtual clock
+            threaded_timer: Run the game timer on its own thread (replay drives tick_timer itself)
+            capture_dir: If set, raw received bytes are captured there for traffic_capture.py
+            network: transport.TcpNetwork (default) or transport.MemoryNetwork for simulations
+            resume_grace: Seconds a dropped player's slot is held for a reconnect with its resume token
+            hit_window: Repeated reports of the same shooter/victim pair within this many seconds count once
+            shot_window: A hit must follow a shoot from the shooter within this many seconds
+                         (0 trusts hit reports without a matching shot)
+            rate_limits: {message class: (per second, burst)} enforced per connection (None disables)
+            backlog: listen() queue length
+            max_per_ip, max_connections: Connection caps checked before a client thread is started
+            handshake_timeout: Connections that have not registered after this many seconds are closed
+            heartbeat_interval: Quiet seconds before a client is pinged (0 disables liveness checks)
+            udp_port: Also accept shoot/hit_detected as datagrams on this port (see udp_channel.py)
+            spectator_group, spectator_port: Multicast spectator events to this group for displays
+                                             that ask for it (see spectator_feed.py)
+        """
         self.gui_callback = gui_callback
         self.host = host
         self.port = port
+        self.db_path = db_path
+        self.clock = clock
+        self.threaded_timer = threaded_timer
         self.server_socket = None
         self.running = False
         self.clients = {}  # {client_id: (socket, addr)}
         self.player_names = {}  # {client_id: player_name}
-        self.lock = threading.Lock()
+        # Re-entrant: process_hit ends the game via stop_game, kick_player calls disconnect_client
+        self.lock = threading.RLock()
         self.game_state = {
             'max_players': 4,
             'game_duration': 300,
@@ -74,28 +126,92 @@ class GameServer:
         self.player_scores = {}  # {player_name: score}
         self.player_status = {}  # {player_name: 'alive', 'dead', 'respawning'}
         self.max_health = 3  # Players start with 3 health
+        # Numbered deltas of health/score/status, with a full keyframe every 20 (see scoreboard.py)
+        self.scoreboard = ScoreboardStream(keyframe_every=20)
+        # JSON of the full game state for late-joining displays; rebuilt on the first request
+        # after a change, so any number of joins between two changes share one serialization
+        self.state_snapshot = None
+
+        # Session resumption: a player whose connection drops keeps their slot, health and
+        # score for resume_grace seconds; registering with the token from welcome reclaims it
+        self.resume_grace = resume_grace
+        self.resume_tokens = {}  # {resume_token: player_name}
+        self.player_tokens = {}  # {player_name: resume_token}
+        self.held_players = {}  # {player_name: expiry time} for players with no connection
+
+        # One trigger pull can be decoded several times by the victim's receiver
+        self.hit_filter = HitDeduplicator(hit_window)
+        # Pairs hits with the shots that caused them; also tracks accuracy
+        self.shot_tracker = ShotCorrelator(shot_window) if shot_window else None
+
+        # Per-connection token buckets; messages over the limit are dropped before processing
+        self.rate_limits = rate_limits
+        self.rate_limiters = {}  # {client_id: ClientRateLimiter}, shared by the TCP and UDP paths
+        self.dropped_messages = {}  # {message class: count} across all connections
+
+        # Admission: bans and connection caps on the accept thread, then a deadline to register
+        self.backlog = backlog
+        self.admission = AdmissionControl(max_per_ip, max_connections)
+        self.handshake_timeout = handshake_timeout
+        self.pending_handshakes = {}  # {client_id: deadline} for connections that have not registered
+
+        # One timing wheel pings quiet clients, tracks RTT and drops the ones that stop answering
+        self.heartbeats = None
+        if heartbeat_interval:
+            self.heartbeats = HeartbeatManager(self.send_heartbeat, self.heartbeat_lost, interval=heartbeat_interval)
+        # Clock offset of each connection, measured on the heartbeats
+        self.clock_syncs = {}  # {client_id: ClockSync}
+
+        # Optional datagram fast path for shots and hits; each session's datagrams carry its
+        # resume token and the epoch from its latest welcome
+        self.udp_port = udp_port
+        self.udp_socket = None
+        self.udp_sessions = {}  # {resume_token: (client_id, DatagramReceiver)}
+        self.message_ids = {}   # {resume_token: MessageIds}; a shot resent over TCP keeps its id
+
+        # Optional multicast feed; displays on it get spectator events from there, not over TCP
+        self.spectator_group = spectator_group
+        self.spectator_port = spectator_port
+        self.spectator_feed = None
+        self.multicast_displays = set()  # client_ids
+
+        # Events go only to the clients subscribed to their topic ("topics" in register messages)
+        self.subscriptions = SubscriptionRegistry()
         
         self.timer_thread = None
         self.connection_thread = None
         # Database setup
         self.init_database()
         self.log("Database initialized")
+
+        # Archives old games and vacuums the database while no game is running
+        # (nothing to archive for an in-memory database)
+        self.retention = None
+        if db_path != ':memory:':
+            self.retention = RetentionWorker(
+                is_idle=lambda: not self.game_state['is_running'],
+                log=self.log,
+                db_path=db_path
+            )
+
+        # Binary recording of every inbound message and state change (see match_recorder.py)
+        self.recorder = None
+        if recordings_dir:
+            try:
+                self.recorder = MatchRecorder(recordings_dir)
+            except Exception as e:
+                self.log(f"Match recording disabled: {str(e)}", 'warning')
+
+        # Raw encrypted traffic capture, off unless asked for
+        self.traffic = TrafficRecorder(capture_dir) if capture_dir else None
+        self.network = network or TcpNetwork()
         
 
     def init_database(self):
         """Initialize the SQLite database and create tables"""
         try:
-            self.db_connection = sqlite3.connect('lasertag.db', check_same_thread=False)
-            self.db_connection.execute('''
-                CREATE TABLE IF NOT EXISTS games (
-                    game_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    date_time TEXT NOT NULL,
-                    duration INTEGER NOT NULL,
-                    player_count INTEGER NOT NULL,
-                    player_names TEXT NOT NULL
-                )
-            ''')
-            self.db_connection.commit()
+            # Creates the tables and migrates older lasertag.db files
+            self.db_connection = database.connect(self.db_path, check_same_thread=False)
         except Exception as e:
             self.log(f"Database initialization error: {str(e)}", 'error')
 
@@ -107,21 +223,16 @@ class GameServer:
             
             # Calculate actual game duration
             if self.game_state['start_time']:
-                actual_duration = int(time.time() - self.game_state['start_time'] - self.game_state.get('elapsed_before_pause', 0))
+                actual_duration = int(self.clock() - self.game_state['start_time'] - self.game_state.get('elapsed_before_pause', 0))
             else:
                 actual_duration = 0
             
             # Get player count and names
-            player_count = len(self.game_state['active_players'])
-            player_names = ",".join(self.game_state['active_players'])
-            
-            # Insert into database
-            self.db_connection.execute('''
-                INSERT INTO games (date_time, duration, player_count, player_names)
-                VALUES (?, ?, ?, ?)
-            ''', (now, actual_duration, player_count, player_names))
-            
-            self.db_connection.commit()
+            player_names = list(self.game_state['active_players'])
+            player_count = len(player_names)
+
+            # Insert the game and its game_players rows
+            database.record_game(self.db_connection, now, actual_duration, player_names)
             self.log(f"Game saved to database: {player_count} players, {actual_duration}s duration")
             
         except Exception as e:
@@ -141,14 +252,23 @@ class GameServer:
                 self.log("Server already running", 'warning')
                 return
 
-            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self.server_socket.bind((self.host, self.port))
-            self.server_socket.listen(5)
+            self.server_socket = self.network.listen(self.host, self.port, self.backlog)
+            if self.traffic:
+                self.traffic.reopen()  # shutdown() closed it; a restart gets a new capture file
             self.running = True
             self.connection_thread = threading.Thread(target=self.accept_connections, daemon=True)
             self.connection_thread.start()
+            if self.udp_port:
+                self.udp_socket = self.network.datagram(self.host, self.udp_port)
+                threading.Thread(target=self.receive_datagrams, daemon=True).start()
+            if self.spectator_group:
+                self.spectator_feed = SpectatorPublisher(self.network.datagram(self.host), self.spectator_group,
+                                                         self.spectator_port)
+            if self.heartbeats:
+                self.heartbeats.start()
             self.log(f"Server started on {self.host}:{self.port}")
+            if self.retention:
+                self.retention.start()
             return True
         except Exception as e:
             self.log(f"Server start failed: {str(e)}", 'error')
@@ -160,55 +280,184 @@ class GameServer:
             try:
                 client_socket, addr = self.server_socket.accept()
                 client_id = f"{addr[0]}:{addr[1]}"
-                with self.lock:
-                    if len(self.game_state['active_players']) >= self.game_state['max_players']:
-                        client_socket.send(json.dumps({
-                            "type": "error",
-                            "message": "Server full"
-                        }).encode())
+                # Bans and caps are decided before any thread or buffer exists for this connection.
+                # A full game is refused at registration instead, so held slots can still be resumed.
+                reason = self.admission.admit(addr[0])
+                if reason:
+                    self.reject_connection(client_socket, reason)
+                    self.log(f"Rejected connection from {client_id}: {reason}", 'warning')
+                    continue
+
+                # TCP_NODELAY, keepalive and buffer sizes from the network's socket profile
+                try:
+                    self.network.configure(client_socket)
+                    logging.debug(f"Socket options for {client_id}: {socket_report(client_socket)}")
+                except Exception as e:
+                    # Not registered yet, so nothing else would give the admitted slot back
+                    self.admission.release(addr[0])
+                    try:
                         client_socket.close()
-                        self.log(f"Rejected connection (max players reached): {client_id}", 'warning')
-                        continue
-                    
+                    except OSError:
+                        pass
+                    self.log(f"Could not set up connection {client_id}: {str(e)}", 'warning')
+                    continue
+
+                with self.lock:
                     # Add to clients with temporary name
-                self.clients[client_id] = (client_socket, addr)
-                # Don't add display clients to player list yet
-                temp_name = f"Player_{client_id[-4:]}"
-                self.player_names[client_id] = temp_name
-# Only add to active players after we know it's not a display
+                    self.clients[client_id] = (client_socket, addr)
+                    # Don't add display clients to player list yet
+                    temp_name = f"Player_{client_id[-4:]}"
+                    self.player_names[client_id] = temp_name
+                    # Only add to active players after we know it's not a display
+                    self.pending_handshakes[client_id] = self.clock() + self.handshake_timeout
+                if self.heartbeats:
+                    self.heartbeats.add(client_id)
                 
                 self.log(f"New connection: {client_id}")
                 # Notify UI to update player list
                 Clock.schedule_once(lambda dt: self.gui_callback(f"PLAYER_JOINED:{temp_name}"), 0)
                 
-                threading.Thread(target=self.handle_client, args=(client_socket, client_id), daemon=True).start()
+                try:
+                    threading.Thread(target=self.handle_client, args=(client_socket, client_id), daemon=True).start()
+                except RuntimeError:
+                    self._drop_connection(client_id)  # Releases the slot along with the registration
+                    raise
             except socket.timeout:
-                continue
+                pass
             except Exception as e:
                 if self.running:
                     self.log(f"Connection error: {str(e)}", 'error')
+            # The accept timeout doubles as the once-a-second sweep of held slots and handshakes
+            self.expire_sessions()
+            self.expire_handshakes()
 
     def handle_client(self, client_socket, client_id):
+        capture_id = self.traffic.open_connection(client_id) if self.traffic else None
+        decoder = FrameDecoder()
+        limiter = ClientRateLimiter(self.rate_limits) if self.rate_limits else None
+        self.rate_limiters[client_id] = limiter
         try:
             while self.running:
-                data = client_socket.recv(1024)
+                data = client_socket.recv(4096)
                 if not data:
                     break
-                
-                try:
-                    decrypted_data = decrypt_message(data)
-                    message = json.loads(decrypted_data.decode('utf-8'))
-                    self.process_message(message, client_id, client_socket)
-                except json.JSONDecodeError:
-                    self.log(f"Invalid message from {client_id}", 'warning')
+                if capture_id:
+                    self.traffic.record_data(capture_id, data)
+
+                # One recv() may hold several frames, or only part of one
+                for frame in decoder.feed(data):
+                    try:
+                        decrypted_data = decrypt_message(frame, offset=self.client_clock_offset(client_id))
+                        message = json.loads(decrypted_data.decode('utf-8'))
+                        self.dispatch_message(message, decrypted_data, client_id, client_socket, limiter)
+                    except ValueError as e:
+                        # Bad JSON or a stale timestamp spoils one frame, not the connection
+                        self.log(f"Invalid message from {client_id}: {e}", 'warning')
         except Exception as e:
             self.log(f"Client error {client_id}: {str(e)}", 'warning')
         finally:
+            if capture_id:
+                self.traffic.close_connection(capture_id)
+            self.rate_limiters.pop(client_id, None)
             self.disconnect_client(client_id)
 
+    def dispatch_message(self, message, decrypted_data, client_id, client_socket, limiter):
+        """Liveness, rate limit and recording for one decrypted message, then process it"""
+        if self.heartbeats:
+            self.heartbeats.heard(client_id)
+        msg_type = message.get('type')
+        if message.get('mid') is not None and msg_type in UDP_MESSAGE_TYPES and self.is_repeat(client_id, message):
+            return
+        if limiter and not limiter.allow(msg_type):
+            self.count_dropped(client_id, limiter, msg_type)
+            return
+        # Recorded after the limiter so replays see exactly what was processed;
+        # heartbeats never change game state
+        if self.recorder and msg_type not in ('heartbeat', 'heartbeat_ack'):
+            self.recorder.record_message(client_id, decrypted_data)
+        self.process_message(message, client_id, client_socket)
+
+    def is_repeat(self, client_id, message):
+        """A fast-path message already processed, e.g. over UDP with only the ack lost"""
+        with self.lock:
+            token = self.player_tokens.get(self.player_names.get(client_id))
+            ids = self.message_ids.get(token)
+            return ids is not None and not ids.accept(message['mid'])
+
+    def receive_datagrams(self):
+        """Datagram thread: shots and hits sent over udp_channel.py"""
+        self.udp_socket.settimeout(1)
+        while self.running:
+            try:
+                data, addr = self.udp_socket.recvfrom(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                self.handle_datagram(data, addr)
+            except ValueError as e:
+                logging.debug(f"Invalid datagram from {addr[0]}:{addr[1]}: {e}")
+            except Exception as e:
+                self.log(f"Datagram error from {addr[0]}:{addr[1]}: {str(e)}", 'warning')
+
+    def handle_datagram(self, data, addr):
+        envelope = decode_datagram(data)
+        token = envelope.get('token')
+        with self.lock:
+            client_id, receiver = self.udp_sessions.get(token, (None, None))
+            client = self.clients.get(client_id)
+            player_name = self.resume_tokens.get(token)
+        if client is None or player_name is None or envelope.get('epoch') != receiver.epoch:
+            # Unknown token, stale epoch or no live connection: no ack, so the sender falls back to TCP
+            return
+        message = envelope.get('msg')
+        if not isinstance(message, dict) or message.get('type') not in UDP_MESSAGE_TYPES:
+            raise ValueError("Message type not allowed over UDP")
+
+        is_new = receiver.accept(envelope.get('seq'), envelope.get('low'))
+        # Duplicates are acked too: the first ack may be the thing that was lost
+        self.udp_socket.sendto(encode_datagram(receiver.ack()), addr)
+        if not is_new:
+            return
+        if message['type'] == 'hit_detected':
+            message['victim_name'] = player_name  # The session says who was hit, not the datagram
+        decrypted_data = json.dumps(message).encode('utf-8')
+        self.dispatch_message(message, decrypted_data, client_id, client[0], self.rate_limiters.get(client_id))
+
+    def open_datagram_session(self, resume_token, client_id):
+        """Start a new UDP epoch for a session; returns the fields to add to its welcome"""
+        if not self.udp_socket:
+            return {}
+        with self.lock:
+            previous = self.udp_sessions.get(resume_token)
+            epoch = previous[1].epoch + 1 if previous else 1
+            self.udp_sessions[resume_token] = (client_id, DatagramReceiver(epoch))
+            self.message_ids.setdefault(resume_token, MessageIds())
+        return {"udp_port": self.udp_port, "udp_epoch": epoch}
+
+    def count_dropped(self, client_id, limiter, msg_type):
+        """Tally a rate-limited message; warns on a client's first drop and every 100th after"""
+        kind = message_class(msg_type)
+        with self.lock:
+            self.dropped_messages[kind] = self.dropped_messages.get(kind, 0) + 1
+        total = limiter.total_dropped
+        if total == 1 or total % 100 == 0:
+            self.log(f"Rate limit: dropped {total} messages from {client_id} {limiter.dropped}", 'warning')
+
     def process_message(self, message, client_id, client_socket):
         msg_type = message.get('type')
         if msg_type == 'register':
+            if self.admission.is_name_banned(message.get('player_name')):
+                self.reject_connection(client_socket, "banned")
+                self.log(f"Banned player {message.get('player_name')} tried to register", 'warning')
+                self.disconnect_client(client_id, hold_slot=False)
+                return
+
+            # A reconnecting player gets their old slot back in this one round trip
+            if self.resume_session(message.get('resume_token'), client_id, client_socket, message.get('topics')):
+                return
+
             # Existing code for handling 'register' messages
             player_name = message.get('player_name', f"Player_{client_id[-4:]}")
             with self.lock:
@@ -221,29 +470,104 @@ class GameServer:
                     # Update player name
                     old_name = self.player_names.get(client_id, "")
                     if old_name in self.game_state['active_players']:
-                        self.game_state['active_players'].remove(old_name)
+                        self.remove_player(old_name)
                     
                     self.player_names[client_id] = player_name
                     self.game_state['active_players'].append(player_name)
+                    self.pending_handshakes.pop(client_id, None)
                     
                     # ADD THIS - Initialize player game state
                     self.player_health[player_name] = self.max_health
                     self.player_scores[player_name] = 0
                     self.player_status[player_name] = 'alive'
-                    
-                    response = {"type": "welcome", "player_id": client_id}
-                    client_socket.send(json.dumps(response).encode())
+                    self.publish_scoreboard()
+
+                    resume_token = secrets.token_hex(8)
+                    self.resume_tokens[resume_token] = player_name
+                    self.player_tokens[player_name] = resume_token
+
+                    topics = self.subscriptions.subscribe(client_id, message.get('topics'), player_name)
+                    response = {"type": "welcome", "player_id": client_id, "resume_token": resume_token,
+                                "topics": topics}
+                    response.update(self.open_datagram_session(resume_token, client_id))
+                    self.send_encrypted_message(client_socket, response)
                     self.log(f"{player_name} joined the game (Health: {self.max_health})")
+                    self.record_state('player_registered', client_id, player_name=player_name,
+                                      resume_token=resume_token)
                     
                     # Notify UI to update player list
                     if old_name:
                         Clock.schedule_once(lambda dt: self.gui_callback(f"PLAYER_LEFT:{old_name}"), 0)
                     Clock.schedule_once(lambda dt: self.gui_callback(f"PLAYER_JOINED:{player_name}"), 0)
         
+        elif msg_type == 'heartbeat_ack':
+            received = now_ms(self.clock)
+            if self.heartbeats:
+                self.heartbeats.ack(client_id, message.get('seq'))
+            stamps = [message.get(name) for name in ('t1', 't2', 't3')]
+            if all(isinstance(stamp, int) for stamp in stamps):
+                sync = self.clock_syncs.get(client_id)
+                if sync is None:
+                    sync = self.clock_syncs[client_id] = ClockSync(clock=self.clock)
+                sync.add_sample(*stamps, received)
+
+        elif msg_type == 'heartbeat':
+            # Client-initiated heartbeat: echo it so the client can measure RTT too
+            self.send_encrypted_message(client_socket, {
+                "type": "heartbeat_ack",
+                "seq": message.get('seq'),
+                "timestamp": time.time()
+            })
+
+        elif msg_type == 'register_display':
+            # Displays only watch; they need no player slot
+            with self.lock:
+                self.pending_handshakes.pop(client_id, None)
+                self.subscriptions.subscribe(client_id, message.get('topics'))
+                # A late-joining display is correct at once: players, scores, timer and pause state,
+                # then a freshly stamped timer_state for its clock offset
+                self.send_serialized(client_socket, self.get_state_snapshot())
+                timer = self.timer_state()
+                timer['server_time'] = self.clock()
+                self.send_encrypted_message(client_socket, timer)
+                if message.get('multicast') and self.spectator_feed:
+                    self.multicast_displays.add(client_id)
+                    self.send_encrypted_message(client_socket, {
+                        "type": "spectator_feed",
+                        "group": self.spectator_group,
+                        "port": self.spectator_port,
+                        "next_seq": self.spectator_feed.next_seq
+                    })
+            self.log(f"Display connected: {client_id}")
+
+        elif msg_type == 'scoreboard_request':
+            # The client missed a scoreboard delta
+            with self.lock:
+                self.send_encrypted_message(client_socket, self.scoreboard.keyframe())
+
+        elif msg_type == 'state_request':
+            self.send_serialized(client_socket, self.get_state_snapshot())
+
+        elif msg_type == 'spectator_resync':
+            # A display saw a gap in the multicast feed
+            if self.spectator_feed:
+                self.send_encrypted_message(client_socket, self.spectator_feed.resync(message.get('from_seq', 0)))
+
+        elif msg_type == 'spectator_fallback':
+            # The display could not join the group; back to spectator events over TCP
+            with self.lock:
+                self.multicast_displays.discard(client_id)
+
         elif msg_type == 'shoot':
             player_name = self.player_names.get(client_id, f"Player_{client_id[-4:]}")
             player_id = message.get('player_id', 'unknown')
             self.log(f"SHOOT: {player_name} (ID: {player_id}) fired their weapon!")
+            if self.shot_tracker:
+                with self.lock:
+                    early_victims = self.shot_tracker.record_shot(player_name, self.clock())
+                # Hit reports that arrived before this shoot message
+                for victim_name in early_victims:
+                    self.process_hit(player_name, victim_name)
 
         # ADD THIS - New hit detection processing
         elif msg_type == 'hit_detected':
@@ -254,7 +578,17 @@ class GameServer:
             shooter_name = self.find_player_by_id(shooter_id)
             
             if shooter_name:
-                self.process_hit(shooter_name, victim_name)
+                with self.lock:
+                    now = self.clock()
+                    is_new = self.hit_filter.accept(shooter_name, victim_name, now)
+                    has_shot = is_new and (not self.shot_tracker or
+                                           self.shot_tracker.match_hit(shooter_name, victim_name, now))
+                if has_shot:
+                    self.process_hit(shooter_name, victim_name)
+                elif not is_new:
+                    logging.debug(f"Duplicate hit report: {shooter_name} -> {victim_name}")
+                else:
+                    logging.debug(f"Hit {shooter_name} -> {victim_name} waiting for its shot")
             else:
                 self.log(f"Hit detected but unknown shooter ID: {shooter_id}", 'warning')
 
@@ -296,6 +630,7 @@ class GameServer:
             if new_health <= 0:
                 self.player_status[victim_name] = 'dead'
                 self.log(f"ELIMINATED! {victim_name} has been eliminated by {shooter_name}!")
+                self.record_state('player_eliminated', victim=victim_name, shooter=shooter_name)
                 
                 # Broadcast elimination
                 elimination_event = {
@@ -304,7 +639,7 @@ class GameServer:
                     "shooter": shooter_name,
                     "shooter_score": self.player_scores[shooter_name]
                 }
-                self.broadcast_to_all_clients(elimination_event)
+                self.publish_event(elimination_event, involves=(victim_name, shooter_name))
             else:
                 # Broadcast hit event
                 hit_event = {
@@ -314,7 +649,8 @@ class GameServer:
                     "victim_health": new_health,
                     "shooter_score": self.player_scores[shooter_name]
                 }
-                self.broadcast_to_all_clients(hit_event)
+                self.publish_event(hit_event, involves=(victim_name, shooter_name))
+            self.publish_scoreboard()
             
             # Check win condition
             alive_players = [p for p, status in self.player_status.items() if status == 'alive']
@@ -328,17 +664,27 @@ class GameServer:
                     "winner": winner,
                     "final_scores": self.player_scores
                 }
-                self.broadcast_to_all_clients(game_over_event)
+                self.publish_event(game_over_event)
                 
                 # Stop the game
                 self.stop_game()
 
-    # ADD THIS - Broadcast messages to all connected clients
-    def broadcast_to_all_clients(self, message):
-        """Send a message to all connected clients"""
-        for client_id, (client_socket, addr) in list(self.clients.items()):
+    def publish_event(self, message, involves=()):
+        """
+        Send an event to the clients subscribed to its topic, plus the "self" subscribers
+        among the players it involves. Multicast displays get spectator events from the feed.
+        """
+        self.state_snapshot = None  # Every event reflects a state change
+        skip = ()
+        if self.spectator_feed and message.get('type') in SPECTATOR_EVENTS:
+            self.spectator_feed.publish(message)
+            skip = self.multicast_displays
+        for client_id in self.subscriptions.route(message, involves):
+            client = self.clients.get(client_id)
+            if client is None or client_id in skip:
+                continue
             try:
-                self.send_encrypted_message(client_socket, message)
+                self.send_encrypted_message(client[0], message)
             except Exception as e:
                 self.log(f"Broadcast error to {client_id}: {str(e)}", 'warning')
 
@@ -348,19 +694,32 @@ class GameServer:
                 self.game_state['is_running'] = True
                 self.game_state['is_paused'] = False
                 self.game_state['remaining_time'] = self.game_state['game_duration']
-                self.game_state['start_time'] = time.time()
+                self.game_state['start_time'] = self.clock()
                 self.game_state['elapsed_before_pause'] = 0
+                self.hit_filter.clear()
+                if self.shot_tracker:
+                    self.shot_tracker.clear()
                 
                 # ADD THIS - Reset all players for new game
                 for player_name in self.game_state['active_players']:
                     self.player_health[player_name] = self.max_health
                     self.player_scores[player_name] = 0
                     self.player_status[player_name] = 'alive'
+                self.publish_scoreboard()
                 
                 self.log("Game started! All players reset to full health.")
+                if self.recorder:
+                    self.recorder.begin_game(
+                        players=list(self.game_state['active_players']),
+                        clients={client_id: name for client_id, name in self.player_names.items()
+                                 if name in self.game_state['active_players']},
+                        resume_tokens=dict(self.resume_tokens),
+                        game_duration=self.game_state['game_duration'],
+                        max_health=self.max_health
+                    )
                 
                 # Start timer in a separate thread
-                if self.timer_thread is None or not self.timer_thread.is_alive():
+                if self.threaded_timer and (self.timer_thread is None or not self.timer_thread.is_alive()):
                     self.timer_thread = threading.Thread(target=self._run_timer, daemon=True)
                     self.timer_thread.start()
                     
@@ -370,7 +729,8 @@ class GameServer:
                     "remaining_time": self.game_state['remaining_time'],
                     "is_running": True
                 }
-                self.broadcast_to_all_clients(game_event)
+                self.publish_event(game_event)
+                self.publish_timer()
                 return True
             return False
 
@@ -383,17 +743,25 @@ class GameServer:
             self.game_state['elapsed_before_pause'] = 0
             
             if was_running:
-                self.log("Game stopped")
+                self.log(f"Game stopped ({self.hit_filter.duplicates} duplicate hit reports ignored)")
+                if self.shot_tracker:
+                    self.log(f"{self.shot_tracker.rejected} hit reports had no matching shot")
                 self.save_game_to_database()
+                self.record_game_end('game_stopped')
+                # The gap before the next game is our maintenance window
+                if self.retention:
+                    self.retention.start()
                 
                 stop_event = {
                     "type": "game_event",
                     "event": "game_stopped", 
                     "remaining_time": 0,
                     "is_running": False,
-                    "final_scores": self.player_scores
+                    "final_scores": self.player_scores,
+                    "accuracy": self.get_accuracy()
                 }
-                self.broadcast_to_all_clients(stop_event)
+                self.publish_event(stop_event)
+                self.publish_timer()
                 return True
             return False
 
@@ -405,11 +773,12 @@ class GameServer:
             if not self.game_state['is_paused']:
                 # Pausing
                 self.game_state['is_paused'] = True
-                self.game_state['pause_time'] = time.time()
-                # Calculate elapsed time before pause
-                elapsed = int(time.time() - self.game_state['start_time'])
+                self.game_state['pause_time'] = self.clock()
+                # Calculate elapsed time before pause (unrounded, so a pause does not move the deadline)
+                elapsed = self.clock() - self.game_state['start_time']
                 self.game_state['elapsed_before_pause'] = elapsed
                 self.log("Game paused")
+                self.record_state('game_paused')
                 
                 # Broadcast pause to displays
                 pause_event = {
@@ -419,16 +788,18 @@ class GameServer:
                     "is_running": self.game_state['is_running'],
                     "is_paused": self.game_state['is_paused']
                 }
-                self.broadcast_to_all_clients(pause_event)
+                self.publish_event(pause_event)
+                self.publish_timer()
                 
                 return True
             else:
                 # Resuming
                 self.game_state['is_paused'] = False
                 # Set a new start time that accounts for the paused duration
-                current_time = time.time()
+                current_time = self.clock()
                 self.game_state['start_time'] = current_time - self.game_state['elapsed_before_pause']
                 self.log("Game resumed")
+                self.record_state('game_resumed')
                 
                 # Broadcast resume to displays
                 resume_event = {
@@ -438,39 +809,67 @@ class GameServer:
                     "is_running": self.game_state['is_running'],
                     "is_paused": self.game_state['is_paused']
                 }
-                self.broadcast_to_all_clients(resume_event)
+                self.publish_event(resume_event)
+                self.publish_timer()
                 
                 return True
 
     def _run_timer(self):
-        last_update = time.time()
-        
+        # Ticking sends nothing, so it can run often enough to end the game on time
         while self.game_state['is_running'] and self.game_state['remaining_time'] > 0:
-            now = time.time()
-            if now - last_update >= 1:
-                last_update = now
-                
-                with self.lock:
-                    if not self.game_state['is_paused']:
-                        elapsed = int(now - self.game_state['start_time'])
-                        self.game_state['remaining_time'] = max(0, self.game_state['game_duration'] - elapsed)
-
-                        if self.game_state['remaining_time'] % 5 == 0:
-                            timer_update = {
-                                "type": "game_update", 
-                                "remaining_time": self.game_state['remaining_time'],
-                                "is_running": self.game_state['is_running']
-                            }
-                            self.broadcast_to_all_clients(timer_update)
-            
+            self.tick_timer(self.clock())
             time.sleep(0.1)  # Small delay to prevent CPU hogging
         
+        self.finish_timer()
+
+    def tick_timer(self, now):
+        """One timer step: update remaining_time. Clients count down from the deadline themselves"""
+        with self.lock:
+            if not self.game_state['is_paused']:
+                elapsed = int(now - self.game_state['start_time'])
+                self.game_state['remaining_time'] = max(0, self.game_state['game_duration'] - elapsed)
+
+    def timer_state(self):
+        """Deadline (server clock) and pause state; everything a client needs to show the time"""
+        state = self.game_state
+        counting = state['is_running'] and not state['is_paused']
+        if state['is_paused']:
+            remaining = state['game_duration'] - state['elapsed_before_pause']
+        else:
+            remaining = state['remaining_time']
+        return {
+            "type": "timer_state",
+            "end_time": state['start_time'] + state['game_duration'] if counting else None,
+            "remaining_time": remaining,
+            "is_running": state['is_running'],
+            "is_paused": state['is_paused']
+        }
+
+    def publish_timer(self):
+        """Announce a timer change, stamped with our clock for the clients' offset estimate"""
+        with self.lock:
+            message = self.timer_state()
+            message['server_time'] = self.clock()
+            self.publish_event(message)
+
+    def get_remaining_time(self):
+        """Seconds left, from the deadline rather than the last tick"""
+        with self.lock:
+            state = self.timer_state()
+        if state['end_time'] is None:
+            return state['remaining_time']
+        return max(0.0, state['end_time'] - self.clock())
+
+    def finish_timer(self):
+        """Called once the timer loop exits; ends the game if time ran out"""
         # Game ended
         with self.lock:
             if self.game_state['is_running']:
                 self.game_state['is_running'] = False
                 self.game_state['is_paused'] = False
                 self.log("Game over - time's up!")
+                self.record_game_end('time_up')
+                self.publish_timer()
 
     def kick_player(self, player_name):
         """Kick a player from the server"""
@@ -489,16 +888,15 @@ class GameServer:
                         try:
                             # We'll use our own method to log
                             self.log(f"Kicking player {player_name}")
-                            self.disconnect_client(client_id_to_kick)
+                            self.disconnect_client(client_id_to_kick, hold_slot=False)
                             return True
                         except Exception as e:
                             self.log(f"Error disconnecting client: {str(e)}", 'error')
                             return False
                     else:
                         self.log(f"Player {player_name} not found in clients list", 'warning')
-                        # Clean up anyway
-                        if player_name in self.game_state['active_players']:
-                            self.game_state['active_players'].remove(player_name)
+                        # Clean up anyway (also frees a slot held for a reconnect)
+                        self.remove_player(player_name)
                         return True
                 else:
                     self.log(f"Player {player_name} not found in active players", 'warning')
@@ -511,66 +909,259 @@ class GameServer:
                 logging.error("Failed to log after kick error")
             return False
 
-    def disconnect_client(self, client_id):
+    def disconnect_client(self, client_id, hold_slot=True):
+        """
+        Close a client's connection. A registered player's slot, health and score are
+        held for resume_grace seconds unless hold_slot is False (kicks).
+        """
         try:
             with self.lock:
                 if client_id in self.clients:
                     player_name = self.player_names.get(client_id)
-                    
-                    try:
-                        client_socket, _ = self.clients[client_id]
-                        client_socket.close()
-                    except Exception as e:
-                        self.log(f"Error closing client socket: {str(e)}", 'error')
-                    
-                    # Remove from active players list if present
-                    if player_name and player_name in self.game_state['active_players']:
-                        try:
-                            self.game_state['active_players'].remove(player_name)
-                        except Exception as e:
-                            self.log(f"Error removing player from active list: {str(e)}", 'error')
-                    
-                    # ADD THIS - Clean up game state
-                    if player_name:
-                        self.player_health.pop(player_name, None)
-                        self.player_scores.pop(player_name, None)
-                        self.player_status.pop(player_name, None)
-                    
-                    # Remove from clients and player_names dictionaries
-                    try:
-                        del self.clients[client_id]
-                    except Exception as e:
-                        self.log(f"Error removing client: {str(e)}", 'error')
-                        
-                    try:
-                        if client_id in self.player_names:
-                            del self.player_names[client_id]
-                    except Exception as e:
-                        self.log(f"Error removing player name: {str(e)}", 'error')
-                    
-                    if player_name:
+                    self._drop_connection(client_id)
+
+                    if player_name in self.player_tokens and hold_slot and self.resume_grace > 0:
+                        self.held_players[player_name] = self.clock() + self.resume_grace
+                        self.log(f"Client disconnected: {player_name} (slot held for {self.resume_grace}s)")
+                        self.record_state('player_disconnected', client_id, player_name=player_name, held=True)
+                    elif player_name:
+                        self.remove_player(player_name)
                         self.log(f"Client disconnected: {player_name}")
+                        self.record_state('player_disconnected', client_id, player_name=player_name, held=False)
                         # Notify UI through Clock to ensure it runs on the main thread
                         Clock.schedule_once(lambda dt: self.gui_callback(f"PLAYER_LEFT:{player_name}"), 0)
         except Exception as e:
             self.log(f"Disconnect client error: {str(e)}", 'error')
 
+    def _drop_connection(self, client_id):
+        """Close a client's socket and forget the connection; game state is untouched"""
+        if self.heartbeats:
+            self.heartbeats.remove(client_id)
+        self.clock_syncs.pop(client_id, None)
+        try:
+            client_socket, addr = self.clients.pop(client_id)
+            self.admission.release(addr[0])
+            # shutdown() wakes the client thread if it is blocked in recv()
+            try:
+                client_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            client_socket.close()
+        except Exception as e:
+            self.log(f"Error closing client socket: {str(e)}", 'error')
+        self.player_names.pop(client_id, None)
+        self.pending_handshakes.pop(client_id, None)
+        self.multicast_displays.discard(client_id)
+        self.subscriptions.unsubscribe(client_id)
+
+    def send_heartbeat(self, client_id, seq):
+        """Ping one client for the heartbeat manager; False if it can no longer be reached"""
+        client = self.clients.get(client_id)
+        if client is None:
+            return True  # Already gone; nothing to report
+        ping = {"type": "heartbeat", "seq": seq, "t1": now_ms(self.clock)}
+        sync = self.clock_syncs.get(client_id)
+        if sync and sync.points:
+            # Our estimate goes back to the client: server clock minus its clock
+            ping["clock_offset_ms"] = -int(round(sync.offset() * 1000))
+            ping["clock_error_ms"] = int(math.ceil(sync.error() * 1000))
+        return self.send_encrypted_message(client[0], ping)
+
+    def client_clock_offset(self, client_id):
+        """The client's clock minus ours in seconds (0 until measured)"""
+        sync = self.clock_syncs.get(client_id)
+        return (sync.offset() or 0) if sync else 0
+
+    def heartbeat_lost(self, client_id):
+        """The client stopped answering heartbeats: treat it like a dropped connection"""
+        self.log(f"No heartbeat from {client_id}; disconnecting", 'warning')
+        self.disconnect_client(client_id)
+
+    def get_socket_report(self, client_id):
+        """Effective socket options of one connection, read back with getsockopt"""
+        client = self.clients.get(client_id)
+        return socket_report(client[0]) if client else {}
+
+    def get_client_rtts(self):
+        """Smoothed round-trip times in milliseconds, by player name"""
+        if not self.heartbeats:
+            return {}
+        with self.lock:
+            names = dict(self.player_names)
+        rtts = {}
+        for client_id, name in names.items():
+            rtt = self.heartbeats.rtt(client_id)
+            if rtt is not None:
+                rtts[name] = round(rtt * 1000, 1)
+        return rtts
+
+    def get_client_clocks(self):
+        """Clock offset, error bound and drift of each connection, by player name"""
+        with self.lock:
+            names = dict(self.player_names)
+        return {name: self.clock_syncs[client_id].stats()
+                for client_id, name in names.items() if client_id in self.clock_syncs}
+
+    def reject_connection(self, client_socket, reason):
+        """Tell a refused client why without ever blocking, then close it"""
+        try:
+            client_socket.settimeout(0)
+            client_socket.send(encode_frame(encrypt_message(json.dumps({
+                "type": "error",
+                "message": reason
+            }))))
+        except OSError:
+            pass  # The reason is a courtesy; the close is what matters
+        try:
+            client_socket.close()
+        except OSError:
+            pass
+
+    def expire_handshakes(self):
+        """Close connections that never registered"""
+        now = self.clock()
+        with self.lock:
+            expired = [client_id for client_id, deadline in self.pending_handshakes.items() if deadline <= now]
+        for client_id in expired:
+            self.log(f"Closing {client_id}: no registration within {self.handshake_timeout}s", 'warning')
+            self.disconnect_client(client_id, hold_slot=False)
+
+    def ban_player(self, player_name):
+        """Ban a player's name and address and remove them from the game"""
+        with self.lock:
+            addresses = [self.clients[client_id][1][0] for client_id, name in self.player_names.items()
+                         if name == player_name and client_id in self.clients]
+        for ip in addresses or [None]:
+            self.admission.ban(ip=ip, name=player_name)
+        self.log(f"Banned {player_name}" + (f" ({', '.join(addresses)})" if addresses else ""))
+        return self.kick_player(player_name)
+
+    def remove_player(self, player_name):
+        """Remove a player and everything the server keeps about them"""
+        with self.lock:
+            if player_name in self.game_state['active_players']:
+                self.game_state['active_players'].remove(player_name)
+            self.player_health.pop(player_name, None)
+            self.player_scores.pop(player_name, None)
+            self.player_status.pop(player_name, None)
+            self.held_players.pop(player_name, None)
+            token = self.player_tokens.pop(player_name, None)
+            self.resume_tokens.pop(token, None)
+            self.udp_sessions.pop(token, None)
+            self.message_ids.pop(token, None)
+            self.publish_scoreboard()
+
+    def get_state_snapshot(self):
+        """Serialized state_snapshot message, rebuilt only if something changed since the last one"""
+        with self.lock:
+            if self.state_snapshot is None:
+                self.state_snapshot = json.dumps({
+                    "type": "state_snapshot",
+                    "players": list(self.game_state['active_players']),
+                    # The scoreboard as of scoreboard_seq: later deltas apply on top of it
+                    "scoreboard": self.scoreboard.keyframe(),
+                    "timer": self.timer_state(),
+                    "game_duration": self.game_state['game_duration'],
+                    "is_running": self.game_state['is_running'],
+                    "is_paused": self.game_state['is_paused'],
+                    "max_players": self.game_state['max_players']
+                })
+            return self.state_snapshot
+
+    def publish_scoreboard(self):
+        """Publish what changed in health, score and status since the last scoreboard message"""
+        with self.lock:
+            snapshot = {name: {"health": self.player_health.get(name),
+                               "score": self.player_scores.get(name),
+                               "status": self.player_status.get(name)}
+                        for name in self.game_state['active_players']}
+            message = self.scoreboard.update(snapshot)
+            if message:
+                self.publish_event(message)
+
+    def resume_session(self, resume_token, client_id, client_socket, topics=None):
+        """Give a reconnecting client its old slot back; False if the token is unknown or expired"""
+        if not resume_token:
+            return False
+        with self.lock:
+            player_name = self.resume_tokens.get(resume_token)
+            if player_name is None:
+                return False
+
+            # The old connection may not have noticed it is dead yet
+            for old_id, name in list(self.player_names.items()):
+                if name == player_name and old_id != client_id:
+                    self._drop_connection(old_id)
+
+            temp_name = self.player_names.get(client_id)
+            self.player_names[client_id] = player_name
+            self.held_players.pop(player_name, None)
+            self.pending_handshakes.pop(client_id, None)
+            topics = self.subscriptions.subscribe(client_id, topics, player_name)
+
+            response = {
+                "type": "welcome",
+                "player_id": client_id,
+                "resume_token": resume_token,
+                "resumed": True,
+                "health": self.player_health.get(player_name),
+                "score": self.player_scores.get(player_name),
+                "status": self.player_status.get(player_name),
+                "topics": topics
+            }
+            response.update(self.open_datagram_session(resume_token, client_id))
+            self.send_encrypted_message(client_socket, response)
+        self.log(f"{player_name} reconnected and resumed their slot")
+        self.record_state('player_resumed', client_id, player_name=player_name)
+        if temp_name and temp_name != player_name:
+            Clock.schedule_once(lambda dt: self.gui_callback(f"PLAYER_LEFT:{temp_name}"), 0)
+        return True
+
+    def expire_sessions(self):
+        """Free the slots of dropped players whose grace period has run out"""
+        now = self.clock()
+        with self.lock:
+            expired = [name for name, deadline in self.held_players.items() if deadline <= now]
+            for player_name in expired:
+                self.remove_player(player_name)
+        for player_name in expired:
+            self.log(f"{player_name} did not reconnect in time; slot released")
+            self.record_state('session_expired', player_name=player_name)
+            Clock.schedule_once(lambda dt, name=player_name: self.gui_callback(f"PLAYER_LEFT:{name}"), 0)
+
     def shutdown(self):
         if self.running:
             self.running = False
+            if self.heartbeats:
+                self.heartbeats.stop()
             if self.game_state['is_running']:
                 self.stop_game()
                 
             # Close all client connections
             with self.lock:
-                for client_id, (sock, _) in list(self.clients.items()):
+                for client_id, (sock, addr) in list(self.clients.items()):
+                    self.admission.release(addr[0])
                     try:
                         sock.close()
                     except:
                         pass
                 self.clients.clear()
                 self.player_names.clear()
+                self.pending_handshakes.clear()
+                self.multicast_displays.clear()
+                self.subscriptions = SubscriptionRegistry()
+
+            if self.recorder:
+                self.recorder.close()
+            if self.traffic:
+                self.traffic.close()
                 
+            if self.udp_socket:
+                self.udp_socket.close()
+            if self.spectator_feed:
+                self.spectator_feed.close()
+                self.spectator_feed = None
+
             # Close server socket
             if self.server_socket:
                 try:
@@ -581,6 +1172,23 @@ class GameServer:
             return True
         return False
 
+    def record_state(self, event, client_id=None, **fields):
+        """Record a state transition if match recording is enabled"""
+        if self.recorder:
+            self.recorder.record_state(event, client_id, **fields)
+
+    def record_game_end(self, reason):
+        """Close the current game in the match recording with its final scores"""
+        if self.recorder and self.recorder.game_start_seq is not None:
+            self.recorder.end_game(reason=reason, final_scores=dict(self.player_scores))
+
+    def get_accuracy(self):
+        """Live per-player shots, hits, accuracy and shot-to-hit latency for this game"""
+        if not self.shot_tracker:
+            return {}
+        with self.lock:
+            return self.shot_tracker.accuracy()
+
     def get_active_players(self):
         """Return a list of currently active players"""
         with self.lock:
@@ -591,8 +1199,16 @@ class GameServer:
         """Send encrypted message to client"""
         try:
             json_str = json.dumps(message)
+        except (TypeError, ValueError) as e:
+            self.log(f"Send error: {e}", 'error')
+            return False
+        return self.send_serialized(client_socket, json_str)
+
+    def send_serialized(self, client_socket, json_str):
+        """Send an already serialized message; encryption happens per send for a fresh timestamp"""
+        try:
             encrypted_data = encrypt_message(json_str)
-            client_socket.send(encrypted_data)
+            client_socket.sendall(encode_frame(encrypted_data))
             return True
         except Exception as e:
             self.log(f"Send error: {e}", 'error')
@@ -600,7 +1216,8 @@ class GameServer:
 
 # -------------------- GUI Implementation (Same as before) --------------------
 class ServerGUI(BoxLayout):
-    def __init__(self, **kwargs):
+    def __init__(self, server_options=None, **kwargs):
+        """server_options: extra GameServer keyword arguments (from the command line)"""
         super().__init__(**kwargs)
         self.orientation = "vertical"
         self.padding = 20
@@ -615,10 +1232,10 @@ class ServerGUI(BoxLayout):
         self.setup_console()
         
         # Initialize server - MOVED AFTER UI SETUP!
-        self.server = GameServer(self.handle_server_message)
+        self.server = GameServer(self.handle_server_message, **(server_options or {}))
         
         # Timer updates
-        Clock.schedule_interval(self.update_timer_display, 0.5)
+        Clock.schedule_interval(self.update_timer_display, 1 / 30)  # Frame rate, from the deadline
 
     def handle_server_message(self, message):
         """Process messages from the server thread"""
@@ -790,17 +1407,27 @@ class ServerGUI(BoxLayout):
             player_item = BoxLayout(size_hint_y=None, height=30)
             
             # Player name
-            player_item.add_widget(Label(text=player_name, color=(0.9, 0.9, 0.9, 1), size_hint_x=0.7))
+            player_item.add_widget(Label(text=player_name, color=(0.9, 0.9, 0.9, 1), size_hint_x=0.5))
             
             # Kick button
             kick_btn = Button(
                 text="Kick", 
-                size_hint_x=0.3,
+                size_hint_x=0.25,
                 background_color=(0.8, 0.3, 0.1, 1)
             )
             kick_btn.player_name = player_name  # Store player name as a property
             kick_btn.bind(on_release=self.kick_button_pressed)
             player_item.add_widget(kick_btn)
+
+            # Ban button (name and address are refused from then on)
+            ban_btn = Button(
+                text="Ban",
+                size_hint_x=0.25,
+                background_color=(0.7, 0.1, 0.1, 1)
+            )
+            ban_btn.player_name = player_name
+            ban_btn.bind(on_release=self.ban_button_pressed)
+            player_item.add_widget(ban_btn)
             
             self.player_list_container.add_widget(player_item)
             logging.info(f"Added player {player_name} to UI list")
@@ -847,10 +1474,24 @@ class ServerGUI(BoxLayout):
             logging.error(f"Error in kick button handler: {str(e)}")
             self.update_status(f"Error in kick button: {str(e)}")
 
+    def ban_button_pressed(self, instance):
+        """Ban the player on this row"""
+        player_name = getattr(instance, 'player_name', None)
+        if player_name:
+            logging.info(f"Ban button pressed for player: {player_name}")
+            Clock.schedule_once(lambda dt: self.ban_player(player_name), 0.1)
+
+    def ban_player(self, player_name):
+        if self.server.ban_player(player_name):
+            self.update_status(f"Player {player_name} has been banned")
+        else:
+            self.update_status(f"Failed to ban player {player_name}")
+
     def update_max_players(self, instance, value):
         try:
             max_players = int(value)
             self.server.game_state['max_players'] = max_players
+            self.server.state_snapshot = None
             self.update_status(f"Max players set to {max_players}")
         except ValueError:
             self.update_status("Invalid max players value", 'warning')
@@ -862,6 +1503,7 @@ class ServerGUI(BoxLayout):
                 self.server.game_state['game_duration'] = duration
                 if not self.server.game_state['is_running']:
                     self.server.game_state['remaining_time'] = duration
+                self.server.publish_timer()
                 self.update_status(f"Game duration set to {duration}s")
         except ValueError:
             self.update_status("Invalid game duration", 'warning')
@@ -895,14 +1537,15 @@ class ServerGUI(BoxLayout):
     def update_timer_display(self, dt):
         """Update the timer display"""
         try:
-            minutes = self.server.game_state['remaining_time'] // 60
-            seconds = self.server.game_state['remaining_time'] % 60
+            remaining = display_seconds(self.server.get_remaining_time())
+            minutes = remaining // 60
+            seconds = remaining % 60
             self.timer_text.text = f"{minutes:02d}:{seconds:02d}"
             
             # Update timer color based on remaining time
-            if self.server.game_state['remaining_time'] <= 30:
+            if remaining <= 30:
                 self.timer_text.color = (0.9, 0.2, 0.2, 1)
-            elif self.server.game_state['remaining_time'] <= 60:
+            elif remaining <= 60:
                 self.timer_text.color = (0.9, 0.7, 0.2, 1)
             else:
                 self.timer_text.color = (0.2, 0.8, 0.2, 1)
@@ -951,8 +1594,12 @@ class ServerGUI(BoxLayout):
 
 # -------------------- Main App Class --------------------
 class LaserTagServerApp(App):
+    def __init__(self, server_options=None, **kwargs):
+        super().__init__(**kwargs)
+        self.server_options = server_options
+
     def build(self):
-        return ServerGUI()
+        return ServerGUI(server_options=self.server_options)
 
 # -------------------- Run the Application --------------------
 if __name__ == "__main__":
@@ -962,6 +1609,20 @@ if __name__ == "__main__":
             level=logging.INFO,
             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
-        LaserTagServerApp().run()
+        # Our options go after Kivy's, behind "--": python EnhancedServerGUI.py -- --max-per-ip 32
+        parser = argparse.ArgumentParser(description="Laser Tag server")
+        parser.add_argument('--max-per-ip', type=int, default=DEFAULT_MAX_PER_IP,
+                            help="connections allowed from one address; raise it when clients come "
+                                 "through wifi_proxy.py, which connects them all from its own address")
+        parser.add_argument('--spectator-group', nargs='?', const=DEFAULT_SPECTATOR_GROUP,
+                            help=f"multicast spectator events to displays on this group "
+                                 f"(default group {DEFAULT_SPECTATOR_GROUP} if given without a value)")
+        parser.add_argument('--spectator-port', type=int, default=DEFAULT_SPECTATOR_PORT)
+        args = parser.parse_args()
+        LaserTagServerApp(server_options={
+            "max_per_ip": args.max_per_ip,
+            "spectator_group": args.spectator_group,
+            "spectator_port": args.spectator_port
+        }).run()
     except Exception as e:
         logging.error(f"Application error: {str(e)}")
\ No newline at end of file
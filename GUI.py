@@ -12,6 +12,8 @@ from kivy.properties import ListProperty
 from kivy.clock import Clock
 from datetime import datetime
 import logging
+import time
+from game_timer import display_seconds
 
 # Set up logging
 class GuiLogHandler(logging.Handler):
@@ -69,6 +71,7 @@ class ConfiguratorGUI(BoxLayout):
         self.game_running = False
         self.game_paused = False  # New game paused state
         self.remaining_time = 0
+        self.end_time = None  # time.monotonic() deadline while the timer runs
         self.active_players = []
         self.banned_players = []
         self.timer_event = None
@@ -446,7 +449,7 @@ class ConfiguratorGUI(BoxLayout):
         # If game is paused, resume it
         if self.game_paused:
             self.game_paused = False
-            self.timer_event = Clock.schedule_interval(self.update_timer, 1)
+            self.run_timer()
             logging.info("Game resumed")
             return
             
@@ -478,7 +481,7 @@ class ConfiguratorGUI(BoxLayout):
         # Set up and start the timer
         self.remaining_time = game_duration
         self.update_timer_display()
-        self.timer_event = Clock.schedule_interval(self.update_timer, 1)
+        self.run_timer()
 
         # Log the action
         logging.info(f"Game started with {player_count} players, {game_duration}s duration, "
@@ -495,9 +498,7 @@ class ConfiguratorGUI(BoxLayout):
         if not self.game_paused:
             # Pause the game
             self.game_paused = True
-            if self.timer_event:
-                self.timer_event.cancel()
-                self.timer_event = None
+            self.halt_timer()
             
             # Enable Start Game button to allow resuming
             self.start_button.disabled = False
@@ -505,7 +506,7 @@ class ConfiguratorGUI(BoxLayout):
         else:
             # Resume the game
             self.game_paused = False
-            self.timer_event = Clock.schedule_interval(self.update_timer, 1)
+            self.run_timer()
             self.start_button.disabled = True
             logging.info("Game resumed.")
 
@@ -519,9 +520,7 @@ class ConfiguratorGUI(BoxLayout):
         self.game_paused = False
         
         # Stop the timer if it's running
-        if self.timer_event:
-            self.timer_event.cancel()
-            self.timer_event = None
+        self.halt_timer()
         
         # Reset the timer display
         self.timer_display.text = "00:00"
@@ -533,29 +532,43 @@ class ConfiguratorGUI(BoxLayout):
         # Log the action
         logging.info("Game stopped.")
 
+    def run_timer(self):
+        """Count down to a deadline rather than decrementing, so missed frames cannot make the timer drift."""
+        self.end_time = time.monotonic() + self.remaining_time
+        self.timer_event = Clock.schedule_interval(self.update_timer, 1 / 30)
+
+    def halt_timer(self):
+        """Stop counting, keeping what is left for a resume."""
+        if self.end_time is not None:
+            self.remaining_time = max(0, self.end_time - time.monotonic())
+            self.end_time = None
+        if self.timer_event:
+            self.timer_event.cancel()
+            self.timer_event = None
+
     def update_timer(self, dt):
-        """Update the game timer every second."""
+        """Update the game timer at frame rate from the deadline."""
+        if self.end_time is not None:
+            self.remaining_time = max(0, self.end_time - time.monotonic())
         if self.remaining_time > 0:
-            self.remaining_time -= 1
             self.update_timer_display()
         else:
             # Time's up
-            if self.timer_event:
-                self.timer_event.cancel()
-                self.timer_event = None
+            self.halt_timer()
             logging.info("Game time expired!")
             self.stop_game(None)
             
     def update_timer_display(self):
         """Update the timer display with the current remaining time."""
-        minutes = self.remaining_time // 60
-        seconds = self.remaining_time % 60
+        remaining = display_seconds(self.remaining_time)
+        minutes = remaining // 60
+        seconds = remaining % 60
         self.timer_display.text = f"{minutes:02d}:{seconds:02d}"
         
         # Change color based on remaining time
-        if self.remaining_time <= 30:
+        if remaining <= 30:
             self.timer_display.color = (0.9, 0.2, 0.2, 1)  # Red when < 30 seconds
-        elif self.remaining_time <= 60:
+        elif remaining <= 60:
             self.timer_display.color = (0.9, 0.7, 0.2, 1)  # Yellow when < 60 seconds
         else:
             self.timer_display.color = (0.2, 0.8, 0.2, 1)  # Green otherwise
@@ -1,10 +1,16 @@
+from transport import TcpNetwork
+
+
 class NetworkEntity:
-    def __init__(self, entity_type: str, device_name: str, ip_address: str, port: int, connected: bool):
+    def __init__(self, entity_type: str, device_name: str, ip_address: str, port: int, connected: bool,
+                 network=None):
         self.entity_type = entity_type
         self.device_name = device_name
         self.ip_address = ip_address
         self.port = port
         self.connected = connected
+        # Where sockets come from: TcpNetwork, or a MemoryNetwork for simulations
+        self.network = network or TcpNetwork()
 
     # Manually enforce abstract methods by raising NotImplementedError with method name
     def accept_connections(self):
@@ -0,0 +1,67 @@
+# Connection admission for the Laser Tag server
+# Runs on the accept thread for every new connection, before the server spends a
+# thread or a buffer on it: banned addresses and connection storms are turned away
+# with a set lookup and two counters.
+
+import threading
+
+DEFAULT_BACKLOG = 64          # listen() queue; 5 overflowed when a room of guns reconnects at once
+DEFAULT_MAX_PER_IP = 4        # A Pico needs one connection; a PC may run a display too
+DEFAULT_MAX_CONNECTIONS = 64
+DEFAULT_HANDSHAKE_TIMEOUT = 5.0  # Seconds a connection may take to register
+
+
+class AdmissionControl:
+    """Ban sets and connection caps; safe to call from any thread"""
+
+    def __init__(self, max_per_ip=DEFAULT_MAX_PER_IP, max_connections=DEFAULT_MAX_CONNECTIONS):
+        self.max_per_ip = max_per_ip
+        self.max_connections = max_connections
+        self.banned_ips = set()
+        self.banned_names = set()
+        self.connections_per_ip = {}  # {ip: open connections}
+        self.connections = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def admit(self, ip):
+        """Count a new connection from ip; returns None if admitted, else the reason it was refused"""
+        with self.lock:
+            if ip in self.banned_ips:
+                reason = "banned"
+            elif self.connections >= self.max_connections:
+                reason = "server_busy"
+            elif self.connections_per_ip.get(ip, 0) >= self.max_per_ip:
+                reason = "too_many_connections"
+            else:
+                self.connections_per_ip[ip] = self.connections_per_ip.get(ip, 0) + 1
+                self.connections += 1
+                return None
+            self.rejected += 1
+            return reason
+
+    def release(self, ip):
+        """An admitted connection from ip has closed"""
+        with self.lock:
+            count = self.connections_per_ip.get(ip, 0)
+            if count <= 1:
+                self.connections_per_ip.pop(ip, None)
+            else:
+                self.connections_per_ip[ip] = count - 1
+            if count:
+                self.connections -= 1
+
+    def ban(self, ip=None, name=None):
+        with self.lock:
+            if ip:
+                self.banned_ips.add(ip)
+            if name:
+                self.banned_names.add(name)
+
+    def unban(self, ip=None, name=None):
+        with self.lock:
+            self.banned_ips.discard(ip)
+            self.banned_names.discard(name)
+
+    def is_name_banned(self, name):
+        return name in self.banned_names
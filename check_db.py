@@ -3,13 +3,20 @@ from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.label import Label
 from kivy.uix.button import Button
-from kivy.uix.scrollview import ScrollView
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.core.window import Window
 from kivy.graphics import Color, RoundedRectangle
 from kivy.properties import ListProperty
 from kivy.clock import Clock
 from datetime import datetime
-import sqlite3
+import queue
+import threading
+import database
+
+# Games loaded per query; more pages are fetched as the history is scrolled
+PAGE_SIZE = 50
 
 # Modern Rounded Button (same as your server)
 class ModernRoundedButton(Button):
@@ -32,8 +39,9 @@ class ModernRoundedButton(Button):
             Color(*self.background_color)
             RoundedRectangle(pos=self.pos, size=self.size, radius=self.border_radius)
 
-class GameCard(BoxLayout):
-    def __init__(self, game_data, **kwargs):
+class GameCard(RecycleDataViewBehavior, BoxLayout):
+    """One row of the game history; the RecycleView reuses cards as they scroll out of view"""
+    def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.orientation = 'vertical'
         self.size_hint_y = None
@@ -47,82 +55,89 @@ class GameCard(BoxLayout):
             self.rect = RoundedRectangle(pos=self.pos, size=self.size, radius=[15])
         self.bind(pos=self.update_rect, size=self.update_rect)
         
-        game_id, date_time, duration, player_count, player_names = game_data
-        
         # Header with game ID and emoji
         header = BoxLayout(size_hint_y=0.3)
-        emoji = self.get_game_emoji(duration, player_count)
-        header.add_widget(Label(
-            text=f"{emoji} GAME #{game_id}", 
+        self.title_label = Label(
             font_size=18, 
             bold=True,
             color=(0.3, 0.8, 1, 1),
             halign='left',
             text_size=(None, None)
-        ))
+        )
+        header.add_widget(self.title_label)
         
-        # Format date
-        try:
-            dt = datetime.strptime(date_time, "%Y-%m-%d %H:%M:%S")
-            formatted_date = dt.strftime("%b %d, %Y • %I:%M %p")
-        except:
-            formatted_date = date_time
-            
-        header.add_widget(Label(
-            text=formatted_date,
+        self.date_label = Label(
             font_size=12,
             color=(0.7, 0.7, 0.7, 1),
             halign='right',
             text_size=(None, None)
-        ))
+        )
+        header.add_widget(self.date_label)
         self.add_widget(header)
         
         # Game info
         info_layout = GridLayout(cols=2, size_hint_y=0.7)
         
         # Duration
-        duration_str = self.format_duration(duration)
-        info_layout.add_widget(Label(
-            text=f"⏱️ Duration: {duration_str}",
+        self.duration_label = Label(
             font_size=14,
             color=(0.9, 0.9, 0.9, 1),
             halign='left',
             text_size=(None, None)
-        ))
+        )
+        info_layout.add_widget(self.duration_label)
         
         # Players
-        if player_count == 0:
-            player_text = "🤖 Test Run"
-            player_color = (0.8, 0.6, 0.2, 1)
-        else:
-            player_text = f"👥 {player_count} Players"
-            player_color = (0.2, 0.8, 0.2, 1)
-            
-        info_layout.add_widget(Label(
-            text=player_text,
+        self.players_label = Label(
             font_size=14,
-            color=player_color,
             halign='left',
             text_size=(None, None)
-        ))
+        )
+        info_layout.add_widget(self.players_label)
         
         # Player names (if any)
-        if player_names and player_count > 0:
-            names_text = f"Players: {player_names.replace(',', ', ')}"
-            info_layout.add_widget(Label(
-                text=names_text,
-                font_size=12,
-                color=(0.7, 0.9, 0.7, 1),
-                halign='left',
-                text_size=(None, None)
-            ))
-        else:
-            info_layout.add_widget(Label())  # Empty space
+        self.names_label = Label(
+            font_size=12,
+            color=(0.7, 0.9, 0.7, 1),
+            halign='left',
+            text_size=(None, None)
+        )
+        info_layout.add_widget(self.names_label)
             
         info_layout.add_widget(Label())  # Empty space
         
         self.add_widget(info_layout)
     
+    def refresh_view_attrs(self, rv, index, data):
+        """Fill the card's labels from one games row (called when the card is (re)used)"""
+        game_id, date_time, duration, player_count, player_names = data['game']
+        
+        emoji = self.get_game_emoji(duration, player_count)
+        self.title_label.text = f"{emoji} GAME #{game_id}"
+        
+        # Format date
+        try:
+            dt = datetime.strptime(date_time, "%Y-%m-%d %H:%M:%S")
+            self.date_label.text = dt.strftime("%b %d, %Y • %I:%M %p")
+        except:
+            self.date_label.text = date_time
+        
+        self.duration_label.text = f"⏱️ Duration: {self.format_duration(duration)}"
+        
+        if player_count == 0:
+            self.players_label.text = "🤖 Test Run"
+            self.players_label.color = (0.8, 0.6, 0.2, 1)
+        else:
+            self.players_label.text = f"👥 {player_count} Players"
+            self.players_label.color = (0.2, 0.8, 0.2, 1)
+        
+        if player_names and player_count > 0:
+            self.names_label.text = f"Players: {player_names.replace(',', ', ')}"
+        else:
+            self.names_label.text = ""
+        
+        return super().refresh_view_attrs(rv, index, data)
+    
     def update_rect(self, *args):
         self.rect.pos = self.pos
         self.rect.size = self.size
@@ -177,6 +192,58 @@ class StatCard(BoxLayout):
         self.rect.pos = self.pos
         self.rect.size = self.size
 
+class HistoryLoader:
+    """
+    Runs the viewer's queries on one background thread with a persistent read connection.
+    Results are handed back to the Kivy main thread through Clock.
+    """
+    def __init__(self, db_path=database.DB_PATH):
+        self.db_path = db_path
+        self.conn = None
+        self.jobs = queue.Queue()
+        # High-water mark: newest game_id already sent to the UI (worker thread only)
+        self.last_seen_id = 0
+        threading.Thread(target=self.run, daemon=True).start()
+    
+    def submit(self, query, callback):
+        """Queue query(conn); callback(result, error) is then called on the main thread"""
+        self.jobs.put((query, callback))
+    
+    def run(self):
+        while True:
+            query, callback = self.jobs.get()
+            result, error = None, None
+            try:
+                if self.conn is None:
+                    self.conn = database.connect_readonly(self.db_path)
+                result = query(self.conn)
+            except Exception as e:
+                error = e
+                # Reopen on the next job in case the file was replaced or locked
+                if self.conn is not None:
+                    try:
+                        self.conn.close()
+                    except:
+                        pass
+                    self.conn = None
+            Clock.schedule_once(lambda dt, c=callback, r=result, e=error: c(r, e), 0)
+    
+    def load_first_page(self, conn):
+        """Stats plus the newest page of games; resets the high-water mark"""
+        games = database.fetch_games_page(conn, limit=PAGE_SIZE)
+        # Taken from the page itself: a game saved after the page was read is newer
+        # than everything on it, so load_new_games shows it exactly once
+        if games:
+            self.last_seen_id = max(game[0] for game in games)
+        return games, database.get_overall_stats(conn)
+    
+    def load_new_games(self, conn):
+        """Stats plus only the games saved since the last call"""
+        games = database.fetch_games_since(conn, self.last_seen_id)
+        if games:
+            self.last_seen_id = max(game[0] for game in games)
+        return games, database.get_overall_stats(conn)
+
 class DatabaseViewer(BoxLayout):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -220,77 +287,158 @@ class DatabaseViewer(BoxLayout):
         )
         self.add_widget(games_label)
         
-        # Scrollable games container
-        scroll = ScrollView()
-        self.games_container = BoxLayout(
+        # Shown instead of the list when there are no games or the database fails
+        self.message_label = Label(
+            text="",
+            font_size=16,
+            color=(0.6, 0.6, 0.6, 1),
+            text_size=(400, None),
+            halign='center',
+            size_hint_y=None,
+            height=0
+        )
+        self.add_widget(self.message_label)
+        
+        # Virtualized games list - only the visible cards exist as widgets
+        self.games_view = RecycleView(viewclass='GameCard')
+        games_layout = RecycleBoxLayout(
             orientation='vertical',
+            default_size=(None, 120),
+            default_size_hint=(1, None),
             size_hint_y=None,
             spacing=10
         )
-        self.games_container.bind(minimum_height=self.games_container.setter('height'))
-        scroll.add_widget(self.games_container)
-        self.add_widget(scroll)
+        games_layout.bind(minimum_height=games_layout.setter('height'))
+        self.games_view.add_widget(games_layout)
+        self.games_view.bind(scroll_y=self.on_games_scroll)
+        self.add_widget(self.games_view)
+        
+        # Keyset pagination state
+        self.last_key = None  # (date_time, game_id) of the oldest loaded game
+        self.all_loaded = False
+        self.loading_more = False
+        self.poll_pending = False
+        self.current_stats = None
+        
+        # All queries run on this worker, off the Kivy main thread
+        self.loader = HistoryLoader()
         
         # Load initial data
         self.refresh_data()
         
-        # Auto-refresh every 10 seconds
-        Clock.schedule_interval(lambda dt: self.refresh_data(), 10)
+        # Auto-refresh every 10 seconds (only games newer than the ones already shown)
+        Clock.schedule_interval(lambda dt: self.poll_new_games(), 10)
     
     def refresh_data(self, instance=None):
-        try:
-            conn = sqlite3.connect('lasertag.db')
-            games = conn.execute("SELECT * FROM games ORDER BY date_time DESC").fetchall()
-            conn.close()
-            
-            # Clear existing widgets
-            self.stats_container.clear_widgets()
-            self.games_container.clear_widgets()
-            
-            if not games:
-                # No data message
-                self.games_container.add_widget(Label(
-                    text="📭 No games found!\n💡 Start playing to see data here",
-                    font_size=16,
-                    color=(0.6, 0.6, 0.6, 1),
-                    text_size=(400, None),
-                    halign='center'
-                ))
-            else:
-                # Calculate statistics
-                total_games = len(games)
-                total_duration = sum(game[2] for game in games)
-                total_players = sum(game[3] for game in games)
-                avg_duration = total_duration / total_games if total_games else 0
-                
-                # Add stat cards
-                self.stats_container.add_widget(StatCard(
-                    "Total Games", str(total_games), "🎯", (0.3, 0.8, 1, 1)
-                ))
-                self.stats_container.add_widget(StatCard(
-                    "Total Playtime", self.format_duration(total_duration), "⏱️", (0.8, 0.3, 1, 1)
-                ))
-                self.stats_container.add_widget(StatCard(
-                    "Player Sessions", str(total_players), "👥", (0.2, 0.8, 0.2, 1)
-                ))
-                self.stats_container.add_widget(StatCard(
-                    "Avg Game Length", self.format_duration(int(avg_duration)), "📊", (0.8, 0.6, 0.2, 1)
-                ))
-                
-                # Add game cards
-                for game in games:
-                    self.games_container.add_widget(GameCard(game))
-                    
-        except Exception as e:
+        """Reload the stats and the first page of games from scratch"""
+        self.loader.submit(self.loader.load_first_page, self.apply_first_page)
+    
+    def apply_first_page(self, result, error):
+        if error:
             # Error message
-            self.games_container.clear_widgets()
-            self.games_container.add_widget(Label(
-                text=f"❌ Database Error!\n{str(e)}\n💡 Make sure lasertag.db exists",
-                font_size=14,
-                color=(0.9, 0.3, 0.3, 1),
-                text_size=(400, None),
-                halign='center'
-            ))
+            self.set_games([])
+            self.stats_container.clear_widgets()
+            self.current_stats = None
+            self.show_message(
+                f"❌ Database Error!\n{str(error)}\n💡 Make sure lasertag.db exists",
+                (0.9, 0.3, 0.3, 1)
+            )
+            return
+        
+        games, stats = result
+        self.set_games(games)
+        self.update_stats(stats)
+    
+    def poll_new_games(self):
+        """Fetch only games saved since the last refresh"""
+        if self.poll_pending:
+            return
+        self.poll_pending = True
+        self.loader.submit(self.loader.load_new_games, self.apply_new_games)
+    
+    def apply_new_games(self, result, error):
+        self.poll_pending = False
+        if error:
+            self.show_message(f"❌ Database Error!\n{str(error)}", (0.9, 0.3, 0.3, 1))
+            return
+        
+        games, stats = result
+        if games:
+            # New games are the newest, so they go on top of the list
+            self.games_view.data = [{'game': game} for game in games] + self.games_view.data
+            if self.last_key is None:
+                self.last_key = (games[-1][1], games[-1][0])
+        self.update_stats(stats)
+    
+    def update_stats(self, stats):
+        """Rebuild the stat cards, but only when the totals actually changed"""
+        if stats == self.current_stats:
+            return
+        self.current_stats = stats
+        self.stats_container.clear_widgets()
+        
+        total_games, total_duration, total_players = stats
+        if not total_games:
+            # No data message
+            self.show_message("📭 No games found!\n💡 Start playing to see data here", (0.6, 0.6, 0.6, 1))
+            return
+        self.show_message("")
+        
+        # Calculate statistics
+        avg_duration = total_duration / total_games if total_games else 0
+        
+        # Add stat cards
+        self.stats_container.add_widget(StatCard(
+            "Total Games", str(total_games), "🎯", (0.3, 0.8, 1, 1)
+        ))
+        self.stats_container.add_widget(StatCard(
+            "Total Playtime", self.format_duration(total_duration), "⏱️", (0.8, 0.3, 1, 1)
+        ))
+        self.stats_container.add_widget(StatCard(
+            "Player Sessions", str(total_players), "👥", (0.2, 0.8, 0.2, 1)
+        ))
+        self.stats_container.add_widget(StatCard(
+            "Avg Game Length", self.format_duration(int(avg_duration)), "📊", (0.8, 0.6, 0.2, 1)
+        ))
+    
+    def set_games(self, games):
+        """Replace the list contents with the first page of games"""
+        self.games_view.data = [{'game': game} for game in games]
+        self.last_key = (games[-1][1], games[-1][0]) if games else None
+        self.all_loaded = len(games) < PAGE_SIZE
+    
+    def load_more(self):
+        """Append the next page of older games"""
+        if self.all_loaded or self.last_key is None or self.loading_more:
+            return
+        self.loading_more = True
+        before = self.last_key
+        self.loader.submit(
+            lambda conn: database.fetch_games_page(conn, before=before, limit=PAGE_SIZE),
+            self.apply_more_games
+        )
+    
+    def apply_more_games(self, games, error):
+        self.loading_more = False
+        if error:
+            self.show_message(f"❌ Database Error!\n{str(error)}", (0.9, 0.3, 0.3, 1))
+            return
+        
+        self.games_view.data.extend({'game': game} for game in games)
+        if games:
+            self.last_key = (games[-1][1], games[-1][0])
+        self.all_loaded = len(games) < PAGE_SIZE
+    
+    def on_games_scroll(self, instance, scroll_y):
+        """Fetch the next page when the list is scrolled close to the bottom"""
+        if scroll_y <= 0.05:
+            self.load_more()
+    
+    def show_message(self, text, color=(0.6, 0.6, 0.6, 1)):
+        """Show (or with empty text, hide) the message above the games list"""
+        self.message_label.text = text
+        self.message_label.color = color
+        self.message_label.height = 80 if text else 0
     
     def format_duration(self, seconds):
         if seconds < 60:
@@ -1,9 +1,19 @@
+import collections
+import json
+import queue
+import random
+import socket
+import threading
+
 from NetworkEntity import NetworkEntity
+from encryptions import encrypt_message, decrypt_message
+from framing import encode_frame, FrameDecoder
+from clock_sync import now_ms
 
 # Abstract Client class
 class Client(NetworkEntity):
-    def __init__(self, device_name: str, ip_address: str, port: int, connected: bool):
-        super().__init__("Client", device_name, ip_address, port, connected)
+    def __init__(self, device_name: str, ip_address: str, port: int, connected: bool, network=None):
+        super().__init__("Client", device_name, ip_address, port, connected, network)
         self.socket = None
         self.type = None  # Will be overridden by subclasses
         self.connected = connected  # Track the connection status
@@ -27,3 +37,211 @@ class Client(NetworkEntity):
             self.socket.close()
             self.connected = False
             print(f"{self.device_name} disconnected.")
+
+
+class LaserTagClient(Client):
+    """
+    Ready-to-use client for GameServer.
+    - Framed, encrypted messages (framing.py + encryptions.py)
+    - A background thread that reads, decodes and hands messages over in batches
+    - Pipelined sends: send_data() only queues; a writer thread sends everything
+      queued so far in one write, without waiting for replies
+    - Server heartbeats are answered automatically, with the timestamps the server
+      needs to measure our clock offset; its estimate comes back on the next ping
+    - Automatic reconnect with exponential backoff; the registration message is sent
+      again first thing on every new connection (with the server's resume token, so
+      the player keeps their slot), and queued messages follow it
+    """
+
+    def __init__(self, device_name: str, ip_address: str, port: int, register_message=None,
+                 on_messages=None, on_status=None, network=None, reconnect=True,
+                 min_backoff=0.5, max_backoff=10.0, max_pending=1000):
+        """
+        Args:
+            register_message: Sent on every (re)connection, e.g. {"type": "register", "player_name": ...}
+            on_messages: Called from the reader thread with a list of decoded messages.
+                         Without it, batches are kept for receive_data()
+            on_status: Called with (connected, error) whenever the connection comes or goes
+            max_pending: Outgoing messages kept while disconnected; the oldest are dropped
+        """
+        super().__init__(device_name, ip_address, port, False, network)
+        self.type = "LaserTagClient"
+        self.register_message = register_message
+        self.on_messages = on_messages
+        self.on_status = on_status
+        self.reconnect = reconnect
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.player_id = None  # From the server's welcome
+        self.resume_token = None  # Ditto; reclaims our slot after a reconnect
+        self.server_offset = None  # Server clock minus ours in seconds, as the server measured it
+        self.server_offset_error = None  # Bound on that, in seconds
+
+        self.outgoing = collections.deque(maxlen=max_pending)
+        self.condition = threading.Condition()
+        self.inbox = queue.Queue()
+        self.stopping = threading.Event()
+        self.connected_event = threading.Event()
+        self.thread = None
+        self.messages_dropped = 0  # Undecodable frames from the server
+
+    def connect(self):
+        """Start connecting in the background; use wait_connected() to block"""
+        if self.thread is None:
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+            threading.Thread(target=self._write_loop, daemon=True).start()
+
+    def wait_connected(self, timeout=None):
+        return self.connected_event.wait(timeout)
+
+    def send_data(self, data):
+        """Queue a message (dict) for sending; returns immediately"""
+        with self.condition:
+            self.outgoing.append(data)
+            self.condition.notify()
+
+    def receive_data(self, timeout=None):
+        """Return the messages received so far (waiting up to timeout for the first batch)"""
+        messages = []
+        try:
+            messages.extend(self.inbox.get(timeout=timeout))
+            while True:
+                messages.extend(self.inbox.get_nowait())
+        except queue.Empty:
+            pass
+        return messages
+
+    def disconnect(self):
+        self.stopping.set()
+        with self.condition:
+            sock = self.socket
+            self.condition.notify_all()
+        if sock:
+            self._close_socket(sock)
+        self.thread = None
+        self.connected = False
+
+    # ---- internals ----
+
+    @staticmethod
+    def _close_socket(sock):
+        # shutdown() wakes a reader blocked in recv(); close() alone may not
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def _set_status(self, connected, error=None):
+        self.connected = connected
+        if connected:
+            self.connected_event.set()
+        else:
+            self.connected_event.clear()
+        if self.on_status:
+            self.on_status(connected, error)
+
+    def _run(self):
+        backoff = self.min_backoff
+        while not self.stopping.is_set():
+            try:
+                sock = self.network.connect(self.ip_address, self.port, 5)
+                sock.settimeout(None)
+                if self.register_message:
+                    register = dict(self.register_message)
+                    if self.resume_token:
+                        register['resume_token'] = self.resume_token
+                    sock.sendall(encode_frame(encrypt_message(json.dumps(register))))
+            except OSError as e:
+                self._set_status(False, str(e))
+            else:
+                with self.condition:
+                    self.socket = sock
+                    self.condition.notify()
+                self._set_status(True)
+                backoff = self.min_backoff
+                error = self._read_loop(sock)
+                with self.condition:
+                    self.socket = None
+                self._close_socket(sock)
+                self._set_status(False, error)
+
+            if not self.reconnect:
+                break
+            # Random spread keeps a room full of guns from reconnecting in lockstep
+            self.stopping.wait(backoff * random.uniform(0.5, 1.0))
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _read_loop(self, sock):
+        """Read until the connection ends; returns the reason"""
+        decoder = FrameDecoder()
+        while not self.stopping.is_set():
+            try:
+                data = sock.recv(4096)
+            except OSError as e:
+                return str(e)
+            if not data:
+                return "Connection closed by server"
+            received = now_ms()
+
+            batch = []
+            for frame in decoder.feed(data):
+                try:
+                    message = json.loads(decrypt_message(frame, offset=self.server_offset or 0).decode('utf-8'))
+                except ValueError:
+                    self.messages_dropped += 1
+                    continue
+                if message.get('type') == 'heartbeat':
+                    # Answered here so the server's RTT estimate is not skewed by the callback
+                    ack = {"type": "heartbeat_ack", "seq": message.get('seq')}
+                    if 't1' in message:
+                        ack.update(t1=message['t1'], t2=received)  # t3 is stamped by the writer
+                    if message.get('clock_offset_ms') is not None:
+                        self.server_offset = message['clock_offset_ms'] / 1000
+                        self.server_offset_error = message.get('clock_error_ms', 0) / 1000
+                    self.send_data(ack)
+                    continue
+                if message.get('type') == 'welcome':
+                    self.player_id = message.get('player_id')
+                    self.resume_token = message.get('resume_token', self.resume_token)
+                elif message.get('type') == 'error' and message.get('message') == 'banned':
+                    self.reconnect = False  # Retrying would only be refused again
+                batch.append(message)
+
+            if batch:
+                if self.on_messages:
+                    self.on_messages(batch)
+                else:
+                    self.inbox.put(batch)
+        return None
+
+    def _write_loop(self):
+        while not self.stopping.is_set():
+            with self.condition:
+                while not (self.outgoing and self.socket) and not self.stopping.is_set():
+                    self.condition.wait()
+                if self.stopping.is_set():
+                    return
+                sock = self.socket
+                pending = list(self.outgoing)
+                self.outgoing.clear()
+
+            # Encrypt at send time so messages queued during an outage carry a fresh timestamp
+            for message in pending:
+                if message.get('type') == 'heartbeat_ack' and 't2' in message:
+                    message['t3'] = now_ms()
+            data = b''.join(encode_frame(encrypt_message(json.dumps(message))) for message in pending)
+            try:
+                sock.sendall(data)
+            except OSError:
+                # Put them back in front; the reader notices the broken connection and reconnects
+                with self.condition:
+                    self.outgoing.extendleft(reversed(pending))
+                    if self.socket is sock:
+                        self.socket = None
+                self._close_socket(sock)
@@ -0,0 +1,110 @@
+# Clock offset estimation between the server and each client
+# NTP's on-wire exchange, piggybacked on the heartbeats. The server's ping carries
+# its send time t1; the client's heartbeat_ack echoes it and adds when the ping
+# arrived (t2) and when the answer left (t3); the server notes when the answer
+# arrived (t4). All four are milliseconds since the epoch, on the clock that took them:
+#   offset = ((t2 - t1) + (t3 - t4)) / 2     client clock minus server clock
+#   delay  = (t4 - t1) - (t3 - t2)           round trip, less the client's own time
+# A sample is wrong by up to half the delay, and queueing is what makes delays long,
+# so of the last few samples only the one with the smallest delay is believed. The
+# believed samples are fitted against time for the drift rate, which carries the
+# estimate between heartbeats. The server hands its estimate back on the next ping
+# ("clock_offset_ms", "clock_error_ms") so clients can translate server timestamps too.
+
+import time
+
+DISPERSION_RATE = 15e-6  # Error bound growth per second of sample age (NTP's PHI)
+MAX_DRIFT = 500e-6       # Quartz does better than 500 ppm; a steeper fit is noise
+
+
+def now_ms(clock=time.time):
+    """Wire timestamp: integer milliseconds, which MicroPython can produce and parse exactly"""
+    return int(clock() * 1000)
+
+
+class ClockSync:
+    """Offset, drift and error bound for one connection"""
+
+    def __init__(self, window=8, history=16, min_span=10.0, clock=time.time):
+        """
+        Args:
+            window: Recent samples the minimum-delay filter chooses from
+            history: Filtered samples kept for the drift fit
+            min_span: Seconds the filtered samples must cover before a drift is fitted
+        """
+        self.window = window
+        self.history = history
+        self.min_span = min_span
+        self.clock = clock
+        self.samples = []  # [(t4, offset, delay)] in seconds, newest last
+        self.points = []   # Samples that won the filter, for the drift fit
+        self.drift = 0.0   # Offset change per second
+        self.sample_count = 0
+
+    def add_sample(self, t1, t2, t3, t4):
+        """One exchange (milliseconds); returns False if the timestamps cannot be right"""
+        t1, t2, t3, t4 = t1 / 1000, t2 / 1000, t3 / 1000, t4 / 1000
+        delay = (t4 - t1) - (t3 - t2)
+        if t4 < t1 or t3 < t2 or delay < -0.002:  # Millisecond rounding can take a LAN delay just below 0
+            return False
+        sample = (t4, ((t2 - t1) + (t3 - t4)) / 2, max(delay, 0.0))
+        self.samples.append(sample)
+        del self.samples[:-self.window]
+        self.sample_count += 1
+
+        best = min(self.samples, key=lambda entry: entry[2])
+        if not self.points or best[0] > self.points[-1][0]:
+            self.points.append(best)
+            del self.points[:-self.history]
+            self._fit_drift()
+        return True
+
+    def _fit_drift(self):
+        """Least-squares slope of offset against time over the filtered samples"""
+        t0 = self.points[0][0]
+        if len(self.points) < 3 or self.points[-1][0] - t0 < self.min_span:
+            return
+        count = len(self.points)
+        mean_t = sum(t - t0 for t, _, _ in self.points) / count
+        mean_offset = sum(offset for _, offset, _ in self.points) / count
+        variance = sum((t - t0 - mean_t) ** 2 for t, _, _ in self.points)
+        covariance = sum((t - t0 - mean_t) * (offset - mean_offset) for t, offset, _ in self.points)
+        self.drift = max(-MAX_DRIFT, min(MAX_DRIFT, covariance / variance))
+
+    def offset(self, now=None):
+        """Client clock minus server clock in seconds, or None before the first sample"""
+        if not self.points:
+            return None
+        t, offset, _ = self.points[-1]
+        now = self.clock() if now is None else now
+        return offset + self.drift * (now - t)
+
+    def error(self, now=None):
+        """Bound on how far offset() can be out: half the round trip, plus the sample's age"""
+        if not self.points:
+            return None
+        t, _, delay = self.points[-1]
+        now = self.clock() if now is None else now
+        return delay / 2 + DISPERSION_RATE * max(0.0, now - t)
+
+    def to_server(self, client_time):
+        """A client timestamp (seconds) on the server's clock"""
+        return client_time - (self.offset() or 0)
+
+    def to_client(self, server_time):
+        """A server timestamp (seconds) on the client's clock"""
+        return server_time + (self.offset() or 0)
+
+    def stats(self):
+        """Figures for the operator's screen and latency metrics"""
+        now = self.clock()
+        offset = self.offset(now)
+        if offset is None:
+            return {"samples": self.sample_count}
+        return {
+            "offset_ms": round(offset * 1000, 1),
+            "error_ms": round(self.error(now) * 1000, 1),
+            "drift_ppm": round(self.drift * 1e6, 1),
+            "delay_ms": round(self.points[-1][2] * 1000, 1),
+            "samples": self.sample_count
+        }
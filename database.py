@@ -0,0 +1,272 @@
+# Database helpers for Laser Tag
+# Shared by the game server (EnhancedServerGUI.py) and the viewer (check_db.py)
+
+import sqlite3
+
+DB_PATH = 'lasertag.db'
+
+
+def connect(path=DB_PATH, **kwargs):
+    """
+    Open the game database and bring its schema up to date
+    path: database file (default: lasertag.db)
+    kwargs: passed straight to sqlite3.connect
+    returns: sqlite3 connection
+    """
+    conn = sqlite3.connect(path, **kwargs)
+    # Off by default in SQLite and set per connection; game_players relies on ON DELETE CASCADE
+    conn.execute("PRAGMA foreign_keys = ON")
+    init_schema(conn)
+    return conn
+
+
+def connect_readonly(path=DB_PATH, **kwargs):
+    """
+    Open the game database for reading only: no migrations, no writes, safe while
+    the server is running a game
+    returns: sqlite3 connection
+    """
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True, **kwargs)
+
+
+def init_schema(conn):
+    """Create the base tables and run any pending migrations"""
+    # auto_vacuum can only be switched cheaply before the first table exists;
+    # older files are converted once by retention.py in an idle window
+    if conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone() is None:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS games (
+            game_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date_time TEXT NOT NULL,
+            duration INTEGER NOT NULL,
+            player_count INTEGER NOT NULL,
+            player_names TEXT NOT NULL
+        )
+    ''')
+    conn.commit()
+
+    # PRAGMA user_version holds the number of migrations already applied
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        # Each migration and its version bump commit (or roll back) together
+        conn.execute("BEGIN")
+        try:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def split_player_names(player_names):
+    """Split the legacy comma-joined player_names column into a list of names"""
+    return [name.strip() for name in (player_names or "").split(',') if name.strip()]
+
+
+def _link_players(conn, game_id, names):
+    """Insert the game_players rows for one game (and any new players)"""
+    for name in names:
+        conn.execute("INSERT OR IGNORE INTO players (name) VALUES (?)", (name,))
+        conn.execute('''
+            INSERT OR IGNORE INTO game_players (player_id, game_id)
+            SELECT player_id, ? FROM players WHERE name = ?
+        ''', (game_id, name))
+
+
+def _migrate_player_tables(conn):
+    """Migration 1: normalized players/game_players tables, backfilled from games.player_names"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS players (
+            player_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+    ''')
+    # The primary key doubles as the per-player history index
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS game_players (
+            player_id INTEGER NOT NULL REFERENCES players(player_id),
+            game_id INTEGER NOT NULL REFERENCES games(game_id) ON DELETE CASCADE,
+            PRIMARY KEY (player_id, game_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_game_players_game ON game_players(game_id)")
+
+    for game_id, player_names in conn.execute("SELECT game_id, player_names FROM games").fetchall():
+        _link_players(conn, game_id, split_player_names(player_names))
+
+
+def _migrate_stats_rollups(conn):
+    """Migration 2: overall and daily totals, kept up to date by record_game"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_totals (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_games INTEGER NOT NULL,
+            total_duration INTEGER NOT NULL,
+            total_player_sessions INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_daily (
+            day TEXT PRIMARY KEY,
+            games INTEGER NOT NULL,
+            duration INTEGER NOT NULL,
+            player_sessions INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+    conn.execute('''
+        INSERT OR REPLACE INTO stats_totals (id, total_games, total_duration, total_player_sessions)
+        SELECT 1, COUNT(*), COALESCE(SUM(duration), 0), COALESCE(SUM(player_count), 0) FROM games
+    ''')
+    conn.execute('''
+        INSERT OR REPLACE INTO stats_daily (day, games, duration, player_sessions)
+        SELECT substr(date_time, 1, 10), COUNT(*), SUM(duration), SUM(player_count)
+        FROM games GROUP BY substr(date_time, 1, 10)
+    ''')
+
+
+def _migrate_date_time_index(conn):
+    """Migration 3: index backing the newest-first keyset pagination of games"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_games_date_time ON games(date_time)")
+
+
+def _migrate_player_summaries(conn):
+    """Migration 4: per-player daily summaries of games moved to the archive by retention.py"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS player_summaries (
+            player_id INTEGER NOT NULL REFERENCES players(player_id),
+            day TEXT NOT NULL,
+            games INTEGER NOT NULL,
+            duration INTEGER NOT NULL,
+            PRIMARY KEY (player_id, day)
+        ) WITHOUT ROWID
+    ''')
+
+
+# Applied in order; never edit or reorder an entry once it has shipped
+MIGRATIONS = [
+    _migrate_player_tables,
+    _migrate_stats_rollups,
+    _migrate_date_time_index,
+    _migrate_player_summaries,
+]
+
+
+def _add_to_rollups(conn, date_time, duration, player_count):
+    """Add one game to the overall and daily totals (call inside the insert transaction)"""
+    conn.execute('''
+        INSERT INTO stats_totals (id, total_games, total_duration, total_player_sessions)
+        VALUES (1, 1, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            total_games = total_games + 1,
+            total_duration = total_duration + excluded.total_duration,
+            total_player_sessions = total_player_sessions + excluded.total_player_sessions
+    ''', (duration, player_count))
+    conn.execute('''
+        INSERT INTO stats_daily (day, games, duration, player_sessions)
+        VALUES (?, 1, ?, ?)
+        ON CONFLICT(day) DO UPDATE SET
+            games = games + 1,
+            duration = duration + excluded.duration,
+            player_sessions = player_sessions + excluded.player_sessions
+    ''', (date_time[:10], duration, player_count))
+
+
+def record_game(conn, date_time, duration, player_names):
+    """
+    Save a finished game and its players in one transaction
+    player_names: list of player names
+    returns: the new game_id
+    """
+    with conn:
+        cursor = conn.execute('''
+            INSERT INTO games (date_time, duration, player_count, player_names)
+            VALUES (?, ?, ?, ?)
+        ''', (date_time, duration, len(player_names), ",".join(player_names)))
+        game_id = cursor.lastrowid
+        _link_players(conn, game_id, player_names)
+        _add_to_rollups(conn, date_time, duration, len(player_names))
+    return game_id
+
+
+def fetch_games_page(conn, before=None, limit=50):
+    """
+    Return one page of games, newest first, using keyset pagination
+    before: (date_time, game_id) of the last row of the previous page, or None for the first page
+    returns: list of (game_id, date_time, duration, player_count, player_names)
+    """
+    if before is None:
+        return conn.execute('''
+            SELECT game_id, date_time, duration, player_count, player_names FROM games
+            ORDER BY date_time DESC, game_id DESC LIMIT ?
+        ''', (limit,)).fetchall()
+
+    # game_id breaks ties between games saved in the same second
+    return conn.execute('''
+        SELECT game_id, date_time, duration, player_count, player_names FROM games
+        WHERE (date_time, game_id) < (?, ?)
+        ORDER BY date_time DESC, game_id DESC LIMIT ?
+    ''', (before[0], before[1], limit)).fetchall()
+
+
+def fetch_games_since(conn, game_id):
+    """Return games with a game_id above the given high-water mark, newest first"""
+    return conn.execute('''
+        SELECT game_id, date_time, duration, player_count, player_names FROM games
+        WHERE game_id > ? ORDER BY game_id DESC
+    ''', (game_id,)).fetchall()
+
+
+def get_latest_game_id(conn):
+    """Return the highest game_id saved so far (0 for an empty database)"""
+    return conn.execute("SELECT COALESCE(MAX(game_id), 0) FROM games").fetchone()[0]
+
+
+def get_overall_stats(conn):
+    """Return (total_games, total_duration, total_player_sessions) from the rollup table"""
+    row = conn.execute('''
+        SELECT total_games, total_duration, total_player_sessions FROM stats_totals WHERE id = 1
+    ''').fetchone()
+    return row or (0, 0, 0)
+
+
+def get_daily_stats(conn, days=7):
+    """Return (day, games, duration, player_sessions) for the most recent days that had games"""
+    return conn.execute('''
+        SELECT day, games, duration, player_sessions FROM stats_daily
+        ORDER BY day DESC LIMIT ?
+    ''', (days,)).fetchall()
+
+
+def get_player_history(conn, player_name, limit=50):
+    """Return the most recent games a player took part in, newest first"""
+    return conn.execute('''
+        SELECT g.game_id, g.date_time, g.duration, g.player_count, g.player_names
+        FROM players p
+        JOIN game_players gp ON gp.player_id = p.player_id
+        JOIN games g ON g.game_id = gp.game_id
+        WHERE p.name = ?
+        ORDER BY gp.game_id DESC
+        LIMIT ?
+    ''', (player_name, limit)).fetchall()
+
+
+def get_player_stats(conn, player_name):
+    """Return (games_played, total_duration) for a player, including archived games"""
+    live_games, live_duration = conn.execute('''
+        SELECT COUNT(*), COALESCE(SUM(g.duration), 0)
+        FROM players p
+        JOIN game_players gp ON gp.player_id = p.player_id
+        JOIN games g ON g.game_id = gp.game_id
+        WHERE p.name = ?
+    ''', (player_name,)).fetchone()
+    archived_games, archived_duration = conn.execute('''
+        SELECT COALESCE(SUM(s.games), 0), COALESCE(SUM(s.duration), 0)
+        FROM players p
+        JOIN player_summaries s ON s.player_id = p.player_id
+        WHERE p.name = ?
+    ''', (player_name,)).fetchone()
+    return live_games + archived_games, live_duration + archived_duration
@@ -7,17 +7,19 @@ from kivy.uix.scrollview import ScrollView
 from kivy.core.window import Window
 from kivy.clock import Clock
 from datetime import datetime
-import socket
-import threading
-import json
-import time
 
-# Import encryption
-from encryptions import encrypt_message, decrypt_message
+# Framed, encrypted connection with reconnect
+from client import LaserTagClient
+# Spectator events by LAN multicast, gaps filled over the TCP connection
+from spectator_feed import SpectatorSubscriber, join_group
+# Health/score table kept current from numbered deltas
+from scoreboard import ScoreboardMirror
+from game_timer import TimerMirror, display_seconds
 
 # Configuration
 SERVER_IP = "127.0.0.1"  # localhost (same computer)
 SERVER_PORT = 9999
+USE_MULTICAST = True  # Take spectator events from the server's multicast feed when it has one
 
 class DisplayClient(BoxLayout):
     def __init__(self, **kwargs):
@@ -31,18 +33,22 @@ class DisplayClient(BoxLayout):
         
         # Connection
         self.connected = False
-        self.sock = None
+        self.client = None
+        self.feed = None  # SpectatorSubscriber once the server has offered its feed
         
         # Game state
         self.game_time = 300
         self.game_running = False
         self.game_paused = False
         self.players = []
+        self.scoreboard = ScoreboardMirror()
+        self.timer = TimerMirror()  # Fed on the reader thread, read at frame rate
         
         self.setup_ui()
         self.connect_to_server()
         
-        # Update display every second
+        # Timer at frame rate from the server's deadline; the rest every second
+        Clock.schedule_interval(self.update_timer, 1 / 30)
         Clock.schedule_interval(self.update_display, 1)
 
     def setup_ui(self):
@@ -145,46 +151,78 @@ class DisplayClient(BoxLayout):
         self.feed_text.cursor = (len(self.feed_text.text), 0)
 
     def send_encrypted_message(self, message):
-        """Send encrypted message to server"""
-        try:
-            json_str = json.dumps(message)
-            encrypted_data = encrypt_message(json_str)
-            self.sock.send(encrypted_data)
-            return True
-        except Exception as e:
-            self.add_to_feed(f"❌ Send error: {e}")
+        """Queue an encrypted message for the server"""
+        if not self.client:
             return False
+        self.client.send_data(message)
+        return True
 
     def connect_to_server(self):
-        """Connect to server"""
-        def connect():
-            try:
-                self.sock = socket.socket()
-                self.sock.connect((SERVER_IP, SERVER_PORT))
-                
-                # Register as display
-                registration = {
-                    "type": "register_display",
-                    "client_type": "display"
-                }
-                
-                if self.send_encrypted_message(registration):
-                    self.connected = True
-                    Clock.schedule_once(lambda dt: self.update_connection_status(True), 0)
-                    Clock.schedule_once(lambda dt: self.add_to_feed("✅ Connected to server"), 0)
-                    
-                    # Start listening
-                    threading.Thread(target=self.listen_for_messages, daemon=True).start()
-                else:
-                    raise Exception("Failed to register")
-                    
-            except Exception as e:
-                Clock.schedule_once(lambda dt: self.update_connection_status(False, str(e)), 0)
-                Clock.schedule_once(lambda dt: self.add_to_feed(f"❌ Connection failed: {e}"), 0)
-                # Retry in 5 seconds
-                Clock.schedule_once(lambda dt: threading.Thread(target=connect, daemon=True).start(), 5)
-        
-        threading.Thread(target=connect, daemon=True).start()
+        """Connect to server; the client reconnects on its own if the link drops"""
+        self.client = LaserTagClient(
+            "Display", SERVER_IP, SERVER_PORT,
+            # Register as display (sent again after every reconnect)
+            register_message={
+                "type": "register_display",
+                "client_type": "display",
+                "topics": ["all"],
+                "multicast": USE_MULTICAST
+            },
+            on_messages=self.on_messages,
+            on_status=self.on_status
+        )
+        self.client.connect()
+
+    def on_messages(self, messages):
+        """Reader thread: hand the whole batch to the main thread in one go"""
+        batch = []
+        for message in messages:
+            if message.get('type') == 'timer_state':
+                self.timer.apply(message)  # Here, so the offset sample is taken on arrival
+            elif message.get('type') == 'state_snapshot':
+                self.timer.apply(message.get('timer', {}))
+                batch.append(message)
+            elif message.get('type') == 'spectator_feed':
+                self.join_feed(message)
+            elif message.get('type') == 'spectator_resync':
+                if self.feed:
+                    self.feed.handle_resync(message)  # Delivers through on_messages itself
+            else:
+                batch.append(message)
+        if not batch:
+            return
+        messages = batch
+
+        def process(dt):
+            for message in messages:
+                self.process_message(message)
+        Clock.schedule_once(process, 0)
+
+    def join_feed(self, offer):
+        """Subscribe to the server's multicast group; on a reconnect, fetch what was missed"""
+        if self.feed:
+            self.feed.resync_from(offer.get('next_seq', 0))
+            return
+        try:
+            sock = join_group(offer['group'], offer['port'])
+        except OSError as e:
+            # No multicast here (e.g. Wi-Fi isolation): the server keeps using TCP for us
+            self.client.send_data({"type": "spectator_fallback"})
+            Clock.schedule_once(lambda dt: self.add_to_feed(f"⚠️ Multicast unavailable: {e}"), 0)
+            return
+        self.feed = SpectatorSubscriber(
+            sock, self.on_messages,
+            lambda seq: self.client.send_data({"type": "spectator_resync", "from_seq": seq}))
+        self.feed.start(offer.get('next_seq'))
+
+    def on_status(self, connected, error):
+        was_connected = self.connected
+        self.connected = connected
+        Clock.schedule_once(lambda dt: self.update_connection_status(connected, error), 0)
+        if connected:
+            Clock.schedule_once(lambda dt: self.add_to_feed("✅ Connected to server"), 0)
+        elif was_connected:
+            Clock.schedule_once(lambda dt: self.add_to_feed(f"⚠️ Connection lost: {error}"), 0)
 
     def update_connection_status(self, connected, error=None):
         """Update connection status in UI"""
@@ -195,51 +233,15 @@ class DisplayClient(BoxLayout):
             self.connection_label.text = f"🔴 {error or 'Disconnected'}"
             self.connection_label.color = (1, 0.3, 0.3, 1)
 
-    def listen_for_messages(self):
-        """Listen for encrypted messages from server"""
-        while self.connected:
-            try:
-                data = self.sock.recv(1024)
-                if not data:
-                    break
-                
-                # Decrypt message
-                decrypted_data = decrypt_message(data)
-                message = json.loads(decrypted_data.decode('utf-8'))
-                
-                # Process on main thread
-                Clock.schedule_once(lambda dt: self.process_message(message), 0)
-                
-            except Exception as e:
-                Clock.schedule_once(lambda dt: self.add_to_feed(f"⚠️ Message error: {e}"), 0)
-                if "too old" in str(e):
-                    # Clock sync issue, continue listening
-                    continue
-                else:
-                    # Connection lost
-                    break
-        
-        self.connected = False
-        Clock.schedule_once(lambda dt: self.update_connection_status(False, "Connection lost"), 0)
-
     def process_message(self, message):
         """Process received message"""
         msg_type = message.get('type', 'unknown')
         
-        if msg_type == 'game_update':
-            self.game_time = message.get('remaining_time', 300)
-            self.game_running = message.get('is_running', False)
-            self.add_to_feed(f"🎮 Timer: {self.game_time}s")
-            
-        elif msg_type == 'game_event':
+        if msg_type == 'game_event':
             event_type = message.get('event', '')
             
             if event_type in ['game_started', 'game_paused', 'game_resumed', 'game_stopped']:
-                # Update game state from server
-                self.game_time = message.get('remaining_time', 300)
-                self.game_running = message.get('is_running', False)
-                self.game_paused = message.get('is_paused', False)  # ADD THIS LINE
-                
+                # The timer itself follows the timer_state that comes with these
                 if event_type == 'game_started':
                     self.add_to_feed("🎮 Game started!")
                 elif event_type == 'game_paused':
@@ -248,12 +250,25 @@ class DisplayClient(BoxLayout):
                     self.add_to_feed("▶️ Game resumed")
                 elif event_type == 'game_stopped':
                     self.add_to_feed("🛑 Game stopped")
-                    self.game_time = 300  # Reset timer display
             else:
                 # Regular game events
                 event_text = message.get('message', 'Unknown event')
                 self.add_to_feed(f"📢 {event_text}")
             
+        elif msg_type == 'state_snapshot':
+            # Sent on (re)connect: everything a display needs, in one message (timer taken in on_messages)
+            self.update_timer(0)
+            self.players = list(message.get('players', []))
+            # Authoritative: after a server restart its seqs start again below ours
+            self.scoreboard = ScoreboardMirror()
+            self.scoreboard.apply(message.get('scoreboard', {}))
+            self.add_to_feed(f"🔄 Synced: {len(self.players)} players, {self.game_time}s left")
+            
+        elif msg_type == 'scoreboard':
+            if not self.scoreboard.apply(message):
+                # Missed a delta: the next keyframe puts the table right
+                self.send_encrypted_message({"type": "scoreboard_request"})
+            
         elif msg_type == 'player_joined':
             player_name = message.get('player_name', 'Unknown')
             self.players.append(player_name)
@@ -268,10 +283,13 @@ class DisplayClient(BoxLayout):
         else:
             self.add_to_feed(f"❓ Unknown message: {msg_type}")
 
-    def update_display(self, dt):
-        """Update display every second"""
-        if self.game_running and not self.game_paused and self.game_time > 0:
-            self.game_time -= 1
+    def update_timer(self, dt):
+        """Frame-rate countdown from the server's deadline; nothing is counted locally"""
+        if self.client and self.client.server_offset is not None:
+            self.timer.set_offset(self.client.server_offset)
+        self.game_time = display_seconds(self.timer.remaining_time())
+        self.game_running = self.timer.is_running
+        self.game_paused = self.timer.is_paused
             
         # Format timer
         minutes = self.game_time // 60
@@ -285,7 +303,9 @@ class DisplayClient(BoxLayout):
             self.timer_label.color = (1, 0.8, 0.2, 1)  # Orange
         else:
             self.timer_label.color = (0.2, 1, 0.2, 1)  # Green
-        
+
+    def update_display(self, dt):
+        """Update the rest of the display every second"""
         # Game status
         if self.game_running:
             self.status_label.text = "🟢 Game In Progress"
@@ -295,7 +315,12 @@ class DisplayClient(BoxLayout):
             self.status_label.color = (1, 0.3, 0.3, 1)
         
         # Players list
-        if self.players:
+        if self.scoreboard.players:
+            self.players_label.text = '\n'.join(
+                f"• {name}  ❤ {fields.get('health')}  ★ {fields.get('score')}"
+                + ("  ☠" if fields.get('status') == 'dead' else "")
+                for name, fields in sorted(self.scoreboard.players.items(), key=lambda item: -(item[1].get('score') or 0)))
+        elif self.players:
             players_text = '\n'.join([f"• {player}" for player in self.players])
             self.players_label.text = players_text
         else:
@@ -32,10 +32,11 @@ def encrypt_message(message, key=ENCRYPTION_KEY):
     # Return: timestamp (4 bytes) + encrypted message
     return bytes(timestamp_bytes + encrypted)
 
-def decrypt_message(encrypted_data, key=ENCRYPTION_KEY):
+def decrypt_message(encrypted_data, key=ENCRYPTION_KEY, offset=0):
     """
     Decrypt encrypted data
     encrypted_data: bytes from network
+    offset: sender's clock minus ours in seconds, if known (see clock_sync.py)
     returns: decrypted bytes
     """
     if len(encrypted_data) < 4:
@@ -47,7 +48,8 @@ def decrypt_message(encrypted_data, key=ENCRYPTION_KEY):
         timestamp |= encrypted_data[i] << (i * 8)
     
     # Check if message is not too old (within 5 minutes)
-    current_time = int(time.time())
+    # (judged on the sender's clock, so a known offset does not eat into the window)
+    current_time = int(time.time() + offset)
     if abs(current_time - timestamp) > 300:  # 5 minutes
         raise ValueError("Message too old or clock mismatch")
     
@@ -0,0 +1,37 @@
+# Message framing for the Laser Tag protocol
+# TCP is a byte stream: one send() can arrive split over several recv() calls or
+# glued to the next one. Every encrypted message therefore travels as a frame:
+#   2-byte big-endian payload length + payload
+# Written without struct or f-strings so the same file runs on the Pico.
+
+MAX_FRAME = 65535
+
+
+def encode_frame(payload):
+    """Prefix payload (bytes) with its length"""
+    length = len(payload)
+    if length > MAX_FRAME:
+        raise ValueError("Frame too large")
+    return bytes([length >> 8, length & 0xFF]) + payload
+
+
+class FrameDecoder:
+    """Collects received bytes and returns the complete frames in them"""
+
+    def __init__(self):
+        self.buffer = b''
+
+    def feed(self, data):
+        """Add received bytes; returns a list of complete payloads (possibly empty)"""
+        buffer = self.buffer + data if self.buffer else data
+        frames = []
+        position = 0
+        end = len(buffer)
+        while end - position >= 2:
+            length = (buffer[position] << 8) | buffer[position + 1]
+            if end - position - 2 < length:
+                break
+            frames.append(buffer[position + 2:position + 2 + length])
+            position += 2 + length
+        self.buffer = buffer[position:]
+        return frames
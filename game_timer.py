@@ -0,0 +1,61 @@
+# Server-authoritative game timer
+# The server publishes the game's end deadline (on its own clock) and pause state
+# only when they change - start, pause, resume, stop, time up:
+#   {"type": "timer_state", "end_time": 1718000300.0 or None, "remaining_time": 300,
+#    "is_running": true, "is_paused": false, "server_time": 1718000000.0}
+# Clients convert the deadline to their own clock with an offset estimate and work
+# out the remaining time themselves at frame rate, so every screen shows the same
+# time and nothing is sent while the clock simply runs down.
+
+import math
+import time
+
+
+def display_seconds(remaining):
+    """Whole seconds as the countdown shows them (299.2 s left still reads 05:00)"""
+    return max(0, int(math.ceil(remaining - 1e-6)))
+
+
+class TimerMirror:
+    """Client end: follows timer_state messages and interpolates in between"""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.offset = None      # Server clock minus local clock, best estimate so far
+        self.synced = False     # offset comes from clock_sync's measurement, not observe()
+        self.end_time = None    # Server clock; None unless counting down
+        self.remaining = 0      # Frozen value while paused or stopped
+        self.is_running = False
+        self.is_paused = False
+
+    def observe(self, server_time, received=None):
+        """
+        One offset sample: a message stamped server_time arrived at local time received.
+        Transit delay can only make a sample too small, so the largest one is kept.
+        """
+        if self.synced:
+            return
+        sample = server_time - (self.clock() if received is None else received)
+        if self.offset is None or sample > self.offset:
+            self.offset = sample
+
+    def set_offset(self, offset):
+        """Use the server's heartbeat measurement (LaserTagClient.server_offset) from now on"""
+        self.offset = offset
+        self.synced = True
+
+    def apply(self, state, received=None):
+        """Take a timer_state message (or the timer part of a state_snapshot)"""
+        if state.get("server_time") is not None:
+            self.observe(state["server_time"], received)
+        self.end_time = state.get("end_time")
+        self.remaining = state.get("remaining_time") or 0
+        self.is_running = state.get("is_running", False)
+        self.is_paused = state.get("is_paused", False)
+
+    def remaining_time(self, now=None):
+        """Seconds left (float), on the local clock"""
+        if self.is_running and not self.is_paused and self.end_time is not None:
+            now = self.clock() if now is None else now
+            return max(0.0, self.end_time - (now + (self.offset or 0)))
+        return self.remaining
@@ -0,0 +1,194 @@
+# Liveness detection for Laser Tag servers
+# One thread and one hashed timing wheel watch every connection, instead of each
+# client thread waking up on a recv() timeout. A client that has been quiet for
+# `interval` seconds is pinged; the answer gives a round-trip time, and the smoothed
+# RTT sets how long to wait for the next answer (srtt + 4 * rttvar, as TCP does).
+# A client that misses `max_misses` pings in a row is reported dead.
+
+import itertools
+import math
+import threading
+import time
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel: timers land in slot (deadline / tick) % slots and carry
+    how many full turns remain. Scheduling is O(1); each tick touches one slot.
+    """
+
+    def __init__(self, tick=0.1, slots=256, now=0.0):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.current = int(now / tick)  # Absolute tick number processed last
+
+    def schedule(self, deadline, key):
+        """Fire key once at deadline (rounded up to the next tick)"""
+        target = max(int(math.ceil(deadline / self.tick)), self.current + 1)
+        turns = (target - self.current - 1) // len(self.slots)
+        self.slots[target % len(self.slots)].append([turns, key])
+
+    def advance(self, now):
+        """Return the keys whose deadline has passed, in deadline order"""
+        fired = []
+        target = int(now / self.tick)
+        while self.current < target:
+            self.current += 1
+            slot = self.slots[self.current % len(self.slots)]
+            if not slot:
+                continue
+            waiting = []
+            for entry in slot:
+                if entry[0]:
+                    entry[0] -= 1
+                    waiting.append(entry)
+                else:
+                    fired.append(entry[1])
+            slot[:] = waiting
+        return fired
+
+
+class _Peer:
+    __slots__ = ('last_heard', 'srtt', 'rttvar', 'ping_seq', 'ping_sent', 'misses', 'generation')
+
+    def __init__(self, now):
+        self.last_heard = now
+        self.srtt = None
+        self.rttvar = None
+        self.ping_seq = None   # Outstanding ping, if any
+        self.ping_sent = None
+        self.misses = 0
+        self.generation = 0    # Bumped to cancel a scheduled timer
+
+
+class HeartbeatManager:
+    """Pings idle clients and reports the ones that stop answering"""
+
+    def __init__(self, send_ping, on_dead, interval=2.0, initial_timeout=1.0, min_timeout=0.5, max_timeout=5.0,
+                 max_misses=3, tick=0.1, clock=time.monotonic):
+        """
+        Args:
+            send_ping: Called as send_ping(client_id, seq); returns False if the send failed
+            on_dead: Called as on_dead(client_id) once a client is considered gone
+            interval: Quiet time before a client is pinged
+            initial_timeout: Wait for an answer before any RTT has been measured
+            min_timeout, max_timeout: Bounds on the adaptive wait for an answer
+        """
+        self.send_ping = send_ping
+        self.on_dead = on_dead
+        self.interval = interval
+        self.initial_timeout = initial_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.max_misses = max_misses
+        self.clock = clock
+        self.wheel = TimingWheel(tick, now=clock())
+        self.peers = {}  # {client_id: _Peer}
+        self.sequence = itertools.count(1)
+        self.lock = threading.Lock()
+        self.running = False
+
+    # ---- called from client threads ----
+
+    def add(self, client_id):
+        now = self.clock()
+        with self.lock:
+            peer = self.peers[client_id] = _Peer(now)
+            self._schedule(client_id, peer, now + self.interval)
+
+    def remove(self, client_id):
+        with self.lock:
+            self.peers.pop(client_id, None)
+
+    def heard(self, client_id):
+        """Any message proves the client is alive; no timer work is done here"""
+        peer = self.peers.get(client_id)
+        if peer is not None:
+            peer.last_heard = self.clock()
+
+    def ack(self, client_id, seq):
+        """A heartbeat_ack arrived; update the client's RTT estimate"""
+        now = self.clock()
+        with self.lock:
+            peer = self.peers.get(client_id)
+            if peer is None or seq is None or seq != peer.ping_seq:
+                return
+            sample = now - peer.ping_sent
+            if peer.srtt is None:
+                peer.srtt, peer.rttvar = sample, sample / 2
+            else:
+                peer.rttvar = 0.75 * peer.rttvar + 0.25 * abs(peer.srtt - sample)
+                peer.srtt = 0.875 * peer.srtt + 0.125 * sample
+            peer.last_heard = now
+            peer.ping_seq = None
+            peer.misses = 0
+
+    def rtt(self, client_id):
+        """Smoothed round-trip time in seconds, or None before the first answer"""
+        peer = self.peers.get(client_id)
+        return peer.srtt if peer else None
+
+    def timeout(self, client_id):
+        peer = self.peers.get(client_id)
+        return self._timeout(peer) if peer else None
+
+    # ---- wheel thread ----
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+
+    def _timeout(self, peer):
+        if peer.srtt is None:
+            return self.initial_timeout
+        return min(self.max_timeout, max(self.min_timeout, peer.srtt + 4 * peer.rttvar))
+
+    def _schedule(self, client_id, peer, deadline):
+        peer.generation += 1
+        self.wheel.schedule(deadline, (client_id, peer.generation))
+
+    def _run(self):
+        while self.running:
+            time.sleep(self.wheel.tick)
+            self.poll()
+
+    def poll(self):
+        """Process due timers; the wheel thread calls this every tick"""
+        pings, dead = [], []
+        now = self.clock()
+        with self.lock:
+            for client_id, generation in self.wheel.advance(now):
+                peer = self.peers.get(client_id)
+                if peer is None or peer.generation != generation:
+                    continue  # Removed or rescheduled since
+
+                if peer.ping_seq is not None and peer.last_heard < peer.ping_sent:
+                    # The ping went unanswered and nothing else came in either
+                    peer.misses += 1
+                    if peer.misses >= self.max_misses:
+                        del self.peers[client_id]
+                        dead.append(client_id)
+                        continue
+                elif now - peer.last_heard < self.interval:
+                    # Heard from recently: check again once it has been quiet long enough
+                    peer.ping_seq = None
+                    peer.misses = 0
+                    self._schedule(client_id, peer, peer.last_heard + self.interval)
+                    continue
+
+                peer.ping_seq = next(self.sequence)
+                peer.ping_sent = now
+                pings.append((client_id, peer.ping_seq))
+                self._schedule(client_id, peer, now + self._timeout(peer))
+
+        # Callbacks run outside the lock: they send on sockets and may disconnect clients
+        for client_id, seq in pings:
+            if self.send_ping(client_id, seq) is False:
+                dead.append(client_id)
+                self.remove(client_id)
+        for client_id in dead:
+            self.on_dead(client_id)
@@ -0,0 +1,151 @@
+# Hit validation for the Laser Tag server
+# Checks run on every hit_detected report before GameServer.process_hit.
+
+import collections
+
+
+class HitDeduplicator:
+    """
+    Collapses repeated reports of the same hit.
+    One trigger pull often reaches a vest as several IR decodes; reports of the same
+    (shooter, victim) pair within `window` seconds of the first are duplicates.
+    Lookups are a dict access; old entries leave through a FIFO in arrival order.
+    """
+
+    def __init__(self, window=0.25):
+        self.window = window
+        self.last_hit = {}  # {(shooter, victim): time of the last accepted report}
+        self.expiry = collections.deque()  # (time, key) in arrival order
+        self.duplicates = 0
+
+    def accept(self, shooter, victim, now):
+        """Return True for a new hit, False for a duplicate report"""
+        # Forget pairs whose window has closed
+        horizon = now - self.window
+        while self.expiry and self.expiry[0][0] <= horizon:
+            seen_at, key = self.expiry.popleft()
+            if self.last_hit.get(key) == seen_at:
+                del self.last_hit[key]
+
+        key = (shooter, victim)
+        if key in self.last_hit:
+            self.duplicates += 1
+            return False
+        self.last_hit[key] = now
+        self.expiry.append((now, key))
+        return True
+
+    def clear(self):
+        self.last_hit.clear()
+        self.expiry.clear()
+        self.duplicates = 0
+
+
+class _ShotRing:
+    """The last few shots of one player: fire times and whether a hit has claimed them"""
+    __slots__ = ('times', 'matched', 'next')
+
+    def __init__(self, capacity):
+        self.times = [None] * capacity
+        self.matched = [False] * capacity
+        self.next = 0  # Slot the next shot overwrites (the oldest one)
+
+
+class ShotCorrelator:
+    """
+    Matches hit reports to the shots that caused them.
+    Every shooter has a fixed-size ring of recent shot times, so matching a hit is a
+    scan of at most `capacity` slots. A hit is credited to the oldest unclaimed shot
+    fired at most `window` seconds earlier. The victim's report can overtake the
+    shooter's shoot message on the network, so a hit with no shot yet waits up to
+    `early_grace` seconds for one; if none arrives it is rejected.
+    Also keeps per-shooter shots, hits and shot-to-hit latency for live accuracy.
+    """
+
+    def __init__(self, window=1.5, early_grace=0.3, capacity=8):
+        self.window = window
+        self.early_grace = early_grace
+        self.capacity = capacity
+        self.rings = {}  # {shooter: _ShotRing}
+        self.early_hits = {}  # {shooter: deque of (time, victim)} waiting for their shot
+        self.stats = {}  # {shooter: [shots, hits, total latency]}
+        self.rejected = 0
+
+    def _stats(self, shooter):
+        stats = self.stats.get(shooter)
+        if stats is None:
+            stats = self.stats[shooter] = [0, 0, 0.0]
+        return stats
+
+    def _expire_early(self, shooter, now):
+        pending = self.early_hits.get(shooter)
+        while pending and pending[0][0] < now - self.early_grace:
+            pending.popleft()
+            self.rejected += 1
+        return pending
+
+    def record_shot(self, shooter, now):
+        """
+        Remember a shot. Returns the victims whose early reports this shot explains;
+        the caller applies those hits now.
+        """
+        ring = self.rings.get(shooter)
+        if ring is None:
+            ring = self.rings[shooter] = _ShotRing(self.capacity)
+        slot = ring.next
+        ring.times[slot] = now
+        ring.matched[slot] = False
+        ring.next = (slot + 1) % self.capacity
+        stats = self._stats(shooter)
+        stats[0] += 1
+
+        pending = self._expire_early(shooter, now)
+        if not pending:
+            return []
+        _, victim = pending.popleft()
+        ring.matched[slot] = True
+        stats[1] += 1  # The report came first, so the latency counts as zero
+        return [victim]
+
+    def match_hit(self, shooter, victim, now):
+        """
+        Try to pair a hit with a recent shot. True means the hit is valid; False means
+        it is waiting for its shot (see record_shot) or will be rejected.
+        """
+        ring = self.rings.get(shooter)
+        if ring is not None:
+            # Oldest to newest, starting at the slot the next shot would overwrite
+            for offset in range(self.capacity):
+                slot = (ring.next + offset) % self.capacity
+                fired = ring.times[slot]
+                if fired is None or ring.matched[slot] or now - fired > self.window or fired > now:
+                    continue
+                ring.matched[slot] = True
+                stats = self._stats(shooter)
+                stats[1] += 1
+                stats[2] += now - fired
+                return True
+
+        pending = self._expire_early(shooter, now)
+        if pending is None:
+            pending = self.early_hits[shooter] = collections.deque(maxlen=self.capacity)
+        pending.append((now, victim))
+        return False
+
+    def accuracy(self):
+        """Return {shooter: {"shots", "hits", "accuracy", "avg_latency_ms"}}"""
+        summary = {}
+        for shooter, (shots, hits, latency) in self.stats.items():
+            summary[shooter] = {
+                "shots": shots,
+                "hits": hits,
+                "accuracy": round(hits / shots, 3) if shots else 0.0,
+                "avg_latency_ms": round(latency / hits * 1000, 1) if hits else None
+            }
+        return summary
+
+    def clear(self):
+        self.rings.clear()
+        self.early_hits.clear()
+        self.stats.clear()
+        self.rejected = 0
@@ -0,0 +1,94 @@
+# Round-trip latency of small encrypted messages with and without the socket profile
+# An echo server and a client exchange framed, encrypted game messages over real
+# TCP sockets. Each round trip sends two messages in separate writes (a shot and a
+# hit report, say); the server answers once it has both - the write-write-read
+# pattern where Nagle holds the second write until the first is ACKed, and the
+# peer delays that ACK because it has nothing to send yet.
+#
+# Usage: python latency_bench.py [--rounds 300] [--host 127.0.0.1]
+
+import argparse
+import json
+import socket
+import statistics
+import threading
+import time
+
+from encryptions import encrypt_message
+from framing import encode_frame, FrameDecoder
+from socket_profile import LOW_LATENCY, SYSTEM_DEFAULT, socket_report
+
+
+def echo_server(listener, profile):
+    while True:
+        try:
+            conn, _ = listener.accept()
+        except OSError:
+            return
+        profile.apply(conn)
+        decoder = FrameDecoder()
+        pending = []
+        try:
+            while True:
+                data = conn.recv(4096)
+                if not data:
+                    break
+                pending.extend(decoder.feed(data))
+                # Like a hit that needs its shot: answer when the pair is complete
+                while len(pending) >= 2:
+                    conn.sendall(encode_frame(pending.pop(0)) + encode_frame(pending.pop(0)))
+        except OSError:
+            pass
+        conn.close()
+
+
+def measure(profile, rounds, host):
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, 0))
+    listener.listen(1)
+    threading.Thread(target=echo_server, args=(listener, profile), daemon=True).start()
+
+    sock = profile.apply(socket.create_connection(listener.getsockname()))
+    report = socket_report(sock)
+    decoder = FrameDecoder()
+    shot = json.dumps({"type": "shoot", "player_name": "Player1", "player_id": 1})
+    hit = json.dumps({"type": "hit_detected", "victim_name": "Player2", "shooter_id": 1})
+
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        sock.sendall(encode_frame(encrypt_message(shot)))
+        sock.sendall(encode_frame(encrypt_message(hit)))
+        received = 0
+        while received < 2:
+            received += len(decoder.feed(sock.recv(4096)))
+        samples.append(time.perf_counter() - started)
+
+    sock.close()
+    listener.close()
+    return samples, report
+
+
+def summarize(name, samples, report):
+    ordered = sorted(samples)
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1e6
+    print(f"{name}: mean {statistics.mean(samples) * 1e6:,.0f} us, p50 {pct(0.5):,.0f} us, "
+          f"p95 {pct(0.95):,.0f} us, p99 {pct(0.99):,.0f} us")
+    print(f"  {report}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare small-message latency with and without TCP_NODELAY")
+    parser.add_argument('--rounds', type=int, default=300)
+    parser.add_argument('--host', default='127.0.0.1')
+    args = parser.parse_args()
+
+    for name, profile in (("system default (Nagle on)", SYSTEM_DEFAULT), ("low latency profile", LOW_LATENCY)):
+        samples, report = measure(profile, args.rounds, args.host)
+        summarize(name, samples, report)
+
+
+if __name__ == "__main__":
+    main()
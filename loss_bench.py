@@ -0,0 +1,130 @@
+# Shot latency under packet loss: TCP stream vs the UDP fast path
+# Runs a real GameServer with a datagram port behind wifi_proxy.py's impairments and
+# fires shots at it from one gun, first over the TCP connection and then through
+# udp_channel.DatagramSender. Latency is measured from the send to the moment the
+# server processes the shot. A lost TCP segment delays every shot behind it; a lost
+# datagram delays only itself.
+#
+# Usage: python loss_bench.py [--loss 0.05] [--shots 300] [--rate 20] [--latency-ms 10]
+
+import argparse
+import json
+import logging
+import os
+import socket
+import statistics
+import time
+
+os.environ.setdefault('KIVY_NO_ARGS', '1')  # Keep Kivy from parsing our command line
+
+from EnhancedServerGUI import GameServer
+from admission import DEFAULT_MAX_CONNECTIONS
+from encryptions import encrypt_message, decrypt_message
+from framing import encode_frame, FrameDecoder
+from udp_channel import DatagramSender
+from wifi_proxy import Impairment, ImpairmentProxy, DatagramRelay
+
+
+def free_port():
+    probe = socket.socket()
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    return port
+
+
+def run(use_udp, shots, rate, loss, latency_ms, seed):
+    server_port, udp_port, proxy_port = free_port(), free_port(), free_port()
+    # Everything arrives from the proxy's address, so the per-address cap must not be what gets measured
+    server = GameServer(lambda message: None, host='127.0.0.1', port=server_port, db_path=':memory:',
+                        recordings_dir=None, rate_limits=None, heartbeat_interval=0, udp_port=udp_port,
+                        max_per_ip=DEFAULT_MAX_CONNECTIONS)
+    processed = {}  # {shot number: time the server processed it}
+    process_message = server.process_message
+
+    def timed_process(message, client_id, client_socket):
+        if message.get('type') == 'shoot':
+            processed.setdefault(message.get('shot'), time.perf_counter())
+        process_message(message, client_id, client_socket)
+    server.process_message = timed_process
+    server.start_server()
+
+    impairments = [Impairment(latency_ms=latency_ms, loss_chance=loss, seed=seed + i) for i in range(2)]
+    proxy = ImpairmentProxy(proxy_port, ('127.0.0.1', server_port), *impairments, listen_host='127.0.0.1')
+    relay = DatagramRelay(proxy_port, ('127.0.0.1', udp_port), *impairments, stats=proxy.stats,
+                          listen_host='127.0.0.1')
+    proxy.start()
+    relay.start()
+
+    sock = socket.create_connection(('127.0.0.1', proxy_port))
+    sock.sendall(encode_frame(encrypt_message(json.dumps({"type": "register", "player_name": "Bench"}))))
+    decoder = FrameDecoder()
+    welcome = None
+    while welcome is None:
+        for frame in decoder.feed(sock.recv(4096)):
+            message = json.loads(decrypt_message(frame).decode('utf-8'))
+            if message.get('type') == 'welcome':
+                welcome = message
+
+    sender = None
+    if use_udp:
+        udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        udp_sock.setblocking(False)
+        sender = DatagramSender(udp_sock, ('127.0.0.1', proxy_port), welcome['resume_token'], welcome['udp_epoch'])
+
+    sent = {}
+    interval = 1.0 / rate
+    next_shot = time.perf_counter()
+    for shot in range(shots):
+        while time.perf_counter() < next_shot:
+            if sender:
+                for message in sender.poll():
+                    sock.sendall(encode_frame(encrypt_message(json.dumps(message))))
+            time.sleep(0.001)
+        message = {"type": "shoot", "player_id": 1, "shot": shot}
+        sent[shot] = time.perf_counter()
+        if not (sender and sender.send(message)):
+            sock.sendall(encode_frame(encrypt_message(json.dumps(message))))
+        next_shot += interval
+
+    deadline = time.perf_counter() + 5
+    while len(processed) < shots and time.perf_counter() < deadline:
+        if sender:
+            sender.poll()
+        time.sleep(0.001)
+
+    sock.close()
+    proxy.stop()
+    relay.stop()
+    server.shutdown()
+    samples = [(processed[shot] - sent[shot]) * 1000 for shot in sent if shot in processed]
+    return samples, shots - len(samples), proxy.stats, sender.retransmits if sender else 0
+
+
+def summarize(name, samples, missing, stats, retransmits):
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+    print(f"{name}: mean {statistics.mean(samples):.1f} ms, p50 {pct(0.5):.1f} ms, p95 {pct(0.95):.1f} ms, "
+          f"p99 {pct(0.99):.1f} ms, max {ordered[-1]:.1f} ms, missing {missing}")
+    print(f"  losses={stats.losses} retransmits={retransmits}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare shot latency over TCP and UDP under packet loss")
+    parser.add_argument('--shots', type=int, default=300)
+    parser.add_argument('--rate', type=float, default=20, help="shots per second")
+    parser.add_argument('--loss', type=float, default=0.05, help="packet loss chance each way")
+    parser.add_argument('--latency-ms', type=float, default=10, help="one-way delay added by the proxy")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    # Per-shot INFO logging would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    for name, use_udp in (("TCP", False), ("UDP fast path", True)):
+        summarize(name, *run(use_udp, args.shots, args.rate, args.loss, args.latency_ms, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# Match recording for the Laser Tag server
+# Every decoded inbound message and every game state transition is appended as a
+# fixed-size binary record to memory-mapped segment files. A small JSON-lines index
+# marks where each game starts and ends.
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+RECORDINGS_DIR = 'recordings'
+RECORD_SIZE = 256
+SEGMENT_RECORDS = 16384  # 4 MiB per segment file
+INDEX_FILE = 'matches.idx'
+
+# Record header: seq, timestamp, kind, flags, payload length, client id
+HEADER = struct.Struct('<QdBBH32s')
+PAYLOAD_SIZE = RECORD_SIZE - HEADER.size
+
+# Record kinds
+KIND_MESSAGE = 1     # Decrypted bytes of a message received from a client
+KIND_STATE = 2       # JSON describing a state transition
+KIND_GAME_START = 3  # JSON with the settings and players at game start
+KIND_GAME_END = 4    # JSON with the final scores
+
+# Flags
+FLAG_CONTINUED = 0x01  # Payload continues in the next record
+
+
+def segment_path(directory, number):
+    return os.path.join(directory, f"match_{number:06d}.seg")
+
+
+class MatchRecorder:
+    """Appends records to mmap'd segment files; safe to call from any client thread"""
+
+    def __init__(self, directory=RECORDINGS_DIR, segment_records=SEGMENT_RECORDS):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.lock = threading.Lock()
+        self.segment_number = None
+        self.segment_file = None
+        self.segment_map = None
+        self.game_number = 0
+        self.game_start_seq = None
+
+        os.makedirs(directory, exist_ok=True)
+        self.next_seq = self._find_next_seq()
+        self._load_game_number()
+
+    # ---- segment handling ----
+
+    def _find_next_seq(self):
+        """Continue after the last record written by a previous run"""
+        numbers = sorted(
+            int(name[6:12]) for name in os.listdir(self.directory)
+            if name.startswith('match_') and name.endswith('.seg')
+        )
+        if not numbers:
+            return 1
+
+        last = numbers[-1]
+        with open(segment_path(self.directory, last), 'rb') as f:
+            data = f.read()
+        # Slots fill in order, so the first empty one ends the segment
+        low, high = 0, len(data) // RECORD_SIZE
+        while low < high:
+            middle = (low + high) // 2
+            if HEADER.unpack_from(data, middle * RECORD_SIZE)[0] == 0:
+                high = middle
+            else:
+                low = middle + 1
+        return last * self.segment_records + low + 1
+
+    def _load_game_number(self):
+        for entry in read_index(self.directory):
+            self.game_number = max(self.game_number, entry.get('game', 0))
+
+    def _open_segment(self, number):
+        self._close_segment()
+        path = segment_path(self.directory, number)
+        size = self.segment_records * RECORD_SIZE
+        self.segment_file = open(path, 'a+b')
+        if os.path.getsize(path) < size:
+            self.segment_file.truncate(size)  # Preallocate; unused slots read as zeros
+        self.segment_map = mmap.mmap(self.segment_file.fileno(), size)
+        self.segment_number = number
+
+    def _close_segment(self):
+        if self.segment_map is not None:
+            self.segment_map.flush()
+            self.segment_map.close()
+            self.segment_file.close()
+            self.segment_map = None
+            self.segment_file = None
+        self.segment_number = None  # The next write reopens its segment (after close(), too)
+
+    def _write(self, kind, client_id, payload):
+        """Write one logical record (split over several slots if needed); returns its first seq"""
+        client = client_id.encode('utf-8')[:32] if client_id else b''
+        now = time.time()
+        with self.lock:
+            first_seq = self.next_seq
+            offset = 0
+            while True:
+                chunk = payload[offset:offset + PAYLOAD_SIZE]
+                offset += PAYLOAD_SIZE
+                flags = FLAG_CONTINUED if offset < len(payload) else 0
+
+                seq = self.next_seq
+                number, slot = divmod(seq - 1, self.segment_records)
+                if number != self.segment_number:
+                    self._open_segment(number)
+                position = slot * RECORD_SIZE
+                HEADER.pack_into(self.segment_map, position, seq, now, kind, flags, len(chunk), client)
+                self.segment_map[position + HEADER.size:position + HEADER.size + len(chunk)] = chunk
+                self.next_seq += 1
+
+                if not flags:
+                    return first_seq
+
+    def _append_index(self, entry):
+        with open(os.path.join(self.directory, INDEX_FILE), 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+
+    # ---- public API ----
+
+    def record_message(self, client_id, payload):
+        """Record the decrypted bytes of a message received from client_id"""
+        return self._write(KIND_MESSAGE, client_id, payload)
+
+    def record_state(self, event, client_id=None, **fields):
+        """Record a state transition such as game_paused or player_registered"""
+        fields['event'] = event
+        return self._write(KIND_STATE, client_id, json.dumps(fields).encode('utf-8'))
+
+    def begin_game(self, **info):
+        """Mark the start of a game; info is stored with the record and in the index"""
+        self.game_number += 1
+        self.game_start_seq = self._write(KIND_GAME_START, None, json.dumps(info).encode('utf-8'))
+        self._append_index({
+            "game": self.game_number,
+            "event": "start",
+            "seq": self.game_start_seq,
+            "time": time.time()
+        })
+
+    def end_game(self, **info):
+        """Mark the end of the current game and flush it to disk"""
+        seq = self._write(KIND_GAME_END, None, json.dumps(info).encode('utf-8'))
+        self._append_index({
+            "game": self.game_number,
+            "event": "end",
+            "seq": seq,
+            "time": time.time()
+        })
+        self.game_start_seq = None
+        with self.lock:
+            if self.segment_map is not None:
+                self.segment_map.flush()
+
+    def close(self):
+        with self.lock:
+            self._close_segment()
+
+
+def read_index(directory=RECORDINGS_DIR):
+    """Return the raw entries of the game boundary index"""
+    path = os.path.join(directory, INDEX_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class MatchReader:
+    """Reads recorded games back from a recordings directory"""
+
+    def __init__(self, directory=RECORDINGS_DIR, segment_records=SEGMENT_RECORDS):
+        self.directory = directory
+        self.segment_records = segment_records
+
+    def games(self):
+        """Return {game_number: {"start": seq, "end": seq or None}} from the index"""
+        games = {}
+        for entry in read_index(self.directory):
+            game = games.setdefault(entry['game'], {"start": None, "end": None})
+            game[entry['event']] = entry['seq']
+        return games
+
+    def records(self, start_seq=1, end_seq=None):
+        """
+        Yield (seq, timestamp, kind, client_id, payload) from start_seq to end_seq inclusive.
+        Split payloads are joined back together.
+        """
+        seq = start_seq
+        segment_number, data = None, b''
+        pending = None
+        while end_seq is None or seq <= end_seq:
+            number, slot = divmod(seq - 1, self.segment_records)
+            if number != segment_number:
+                path = segment_path(self.directory, number)
+                if not os.path.exists(path):
+                    return
+                with open(path, 'rb') as f:
+                    data = f.read()
+                segment_number = number
+
+            position = slot * RECORD_SIZE
+            if position + RECORD_SIZE > len(data):
+                return
+            record_seq, timestamp, kind, flags, length, client = HEADER.unpack_from(data, position)
+            if record_seq == 0:
+                return  # Past the last record written
+            chunk = data[position + HEADER.size:position + HEADER.size + length]
+
+            if pending is None:
+                pending = [record_seq, timestamp, kind, client.rstrip(b'\0').decode('utf-8'), chunk]
+            else:
+                pending[4] += chunk
+            if not flags & FLAG_CONTINUED:
+                yield tuple(pending)
+                pending = None
+            seq += 1
+
+    def game_records(self, game_number):
+        """Yield the records of one game, from its start marker to its end marker"""
+        game = self.games()[game_number]
+        return self.records(game['start'], game['end'])
@@ -8,6 +8,8 @@ from button import Button  # Import your Button class
 from IRTransmitter import IRTransmitter  # Import the IR Transmitter class
 from IRReceiver import IRReceiver  # ADD THIS - Import the IR Receiver class
 from encryptions import encrypt_message, decrypt_message
+from framing import encode_frame, FrameDecoder  # Copy framing.py to the Pico alongside encryptions.py
+from udp_channel import DatagramSender  # Ditto udp_channel.py
 
 # Configuration 
 PLAYER_NAME = "Player1"
@@ -17,9 +19,19 @@ WIFI_PASSWORD = "Melmansan2012"  # Your WiFi password
 SERVER_IP = "192.168.1.221"  # Your server's IP address
 SERVER_PORT = 9999
 
+RECONNECT_MIN_MS = 500  # Backoff between reconnect attempts after a Wi-Fi drop
+RECONNECT_MAX_MS = 8000
+USE_UDP = True  # Send shots and hits as datagrams when the server offers it; a lost packet then delays only itself
+
 # Global variables
 connected = False
 sock = None
+decoder = None
+resume_token = None  # From the server's welcome; reclaims our slot (health, score) on reconnect
+reconnect_delay_ms = RECONNECT_MIN_MS
+next_reconnect_ms = 0
+udp = None  # DatagramSender once a welcome has offered a UDP port
+server_offset_ms = 0  # Server clock minus ours, from the server's heartbeats (clock_sync.py)
 
 # Setup hardware - UPDATED WITH IR RECEIVER
 button_pin = 16  # Pin for the button
@@ -101,35 +113,158 @@ def connect_wifi():
 
 def connect_to_server():
     """Connect to the game server"""
-    global connected, sock
+    global connected, sock, decoder
     try:
         addr = socket.getaddrinfo(SERVER_IP, SERVER_PORT)[0][-1]
         sock = socket.socket()
         # Socket is set to blocking mode by default
         sock.connect(addr)
         print("Connected to server")
+        try:
+            # Send hits immediately instead of waiting on Nagle's algorithm (newer MicroPython builds)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except (AttributeError, OSError):
+            pass
         
         # Set connected flag
         connected = True
+        decoder = FrameDecoder()
         
-        # Register with server
+        # Register with server (a resume token gets our old slot back)
         message = {
             "type": "register",
             "player_name": PLAYER_NAME,
-            "player_id": PLAYER_ID
+            "player_id": PLAYER_ID,
+            # Only events about us and game start/stop; no timer ticks or other players' hits
+            "topics": ["self", "game_control"]
         }
+        if resume_token:
+            message["resume_token"] = resume_token
         
         json_message = json.dumps(message).encode('utf-8')
         encrypted_data = encrypt_message(json_message)
-        sock.send(encrypted_data)
+        sock.sendall(encode_frame(encrypted_data))
         print("Registration message sent to server")
         
+        # Wait briefly for the welcome so we have a resume token early
+        deadline = time.ticks_add(time.ticks_ms(), 2000)
+        while resume_token is None and time.ticks_diff(deadline, time.ticks_ms()) > 0:
+            poll_server()
+            time.sleep(0.05)
+        
         return True
     except Exception as e:
         print(f"Server connection failed: {e}")
         connected = False
         return False
 
+def wall_ms():
+    """Wall clock in integer milliseconds; floats are too coarse on the Pico for epoch times"""
+    try:
+        return time.time_ns() // 1000000
+    except AttributeError:
+        return int(time.time() * 1000)
+
+def offset_seconds():
+    """server_offset_ms in whole seconds, rounded toward zero in integers (Pico floats lose epoch-sized values)"""
+    seconds = abs(server_offset_ms) // 1000
+    return seconds if server_offset_ms >= 0 else -seconds
+
+def poll_server():
+    """Read whatever the server has sent without blocking; keeps the receive buffer empty"""
+    global connected, resume_token, server_offset_ms
+    if not (connected and sock):
+        return
+    try:
+        sock.settimeout(0)
+        data = sock.recv(512)
+        if not data:
+            print("Server closed the connection")
+            connected = False
+            return
+        received = wall_ms()
+        for frame in decoder.feed(data):
+            try:
+                message = json.loads(decrypt_message(frame, offset=offset_seconds()).decode('utf-8'))
+            except ValueError:
+                continue
+            if message.get("type") == "heartbeat":
+                # The server drops guns that stop answering; the timestamps let it measure our clock
+                server_offset_ms = message.get("clock_offset_ms", server_offset_ms)
+                ack = {"type": "heartbeat_ack", "seq": message.get("seq")}
+                if "t1" in message:
+                    ack["t1"] = message["t1"]
+                    ack["t2"] = received
+                    ack["t3"] = wall_ms()
+                reply = encrypt_message(json.dumps(ack))
+                sock.settimeout(None)
+                sock.sendall(encode_frame(reply))
+                sock.settimeout(0)
+            elif message.get("type") == "welcome":
+                resume_token = message.get("resume_token", resume_token)
+                if message.get("resumed"):
+                    print("Resumed session, health:", message.get("health"))
+                if USE_UDP and message.get("udp_port"):
+                    open_udp(message["udp_port"], message.get("udp_epoch"))
+    except OSError:
+        pass  # Nothing to read right now
+    finally:
+        if sock:
+            sock.settimeout(None)
+
+def open_udp(port, epoch):
+    """Start (or, after a reconnect, re-key) the datagram channel for shots and hits"""
+    global udp
+    if udp:
+        udp.rebind(resume_token, epoch)
+        return
+    try:
+        udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        udp_sock.setblocking(False)
+        address = socket.getaddrinfo(SERVER_IP, port)[0][-1]
+        udp = DatagramSender(udp_sock, address, resume_token, epoch)
+        print("UDP fast path on port", port)
+    except OSError as e:
+        print(f"UDP unavailable, staying on TCP: {e}")
+
+def send_game_message(message):
+    """Send a shoot/hit message by datagram if possible, otherwise over TCP"""
+    if udp and udp.send(message):
+        return
+    json_message = json.dumps(message).encode('utf-8')
+    sock.sendall(encode_frame(encrypt_message(json_message)))
+
+def poll_udp():
+    """Collect acks and retransmit; messages that never got through go over TCP instead"""
+    global connected
+    if not udp:
+        return
+    for message in udp.poll():
+        if connected and sock:
+            try:
+                sock.sendall(encode_frame(encrypt_message(json.dumps(message))))
+            except OSError:
+                connected = False
+
+def reconnect_if_needed():
+    """Retry the server with growing gaps after the connection was lost"""
+    global sock, reconnect_delay_ms, next_reconnect_ms
+    if connected or time.ticks_diff(next_reconnect_ms, time.ticks_ms()) > 0:
+        return
+    if sock:
+        try:
+            sock.close()
+        except OSError:
+            pass
+        sock = None
+    print("Reconnecting to server...")
+    if connect_to_server():
+        reconnect_delay_ms = RECONNECT_MIN_MS
+        flash_led(3, 0.05)
+    else:
+        next_reconnect_ms = time.ticks_add(time.ticks_ms(), reconnect_delay_ms)
+        reconnect_delay_ms = min(reconnect_delay_ms * 2, RECONNECT_MAX_MS)
+
 def shoot():
     """Send a shoot message and IR signal"""
     global connected, sock
@@ -152,12 +287,8 @@ def shoot():
         }
         
         try:
-            json_message = json.dumps(message).encode('utf-8')
             print("Sending shoot message to server:", message)
-            
-            # Send the data
-            encrypted_data = encrypt_message(json_message)
-            bytes_sent = sock.send(encrypted_data)
+            send_game_message(message)
             
             # Flash status LED to confirm
             flash_led(1, 0.1)
@@ -189,11 +320,8 @@ def send_hit_to_server(shooter_id):
         }
         
         try:
-            json_message = json.dumps(message).encode('utf-8')
             print("Sending hit message to server:", message)
-            
-            encrypted_data = encrypt_message(json_message)
-            sock.send(encrypted_data)
+            send_game_message(message)
             
             # Flash status LED differently for hits (2 quick flashes)
             flash_led(2, 0.05)
@@ -258,6 +386,11 @@ try:
             # Small delay to prevent multiple hit detections
             time.sleep(0.1)
         
+        # Keep up with the server and recover from Wi-Fi drops
+        poll_server()
+        poll_udp()
+        reconnect_if_needed()
+        
         # Small delay to prevent 100% CPU usage
         time.sleep(0.01)
 except Exception as e:
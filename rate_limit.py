@@ -0,0 +1,81 @@
+# Ingress rate limiting for the Laser Tag server
+# Every connection gets a token bucket per message class, checked right after a
+# message is decrypted. Messages over the limit are dropped and counted, so a
+# faulty or malicious client cannot flood shoot/hit_detected or heartbeats.
+
+import time
+
+# {message class: (tokens per second, burst size)}
+# A Pico can fire about 5 times a second (0.2 s trigger delay); one shot may be
+# decoded several times by the victim, so hits get more headroom.
+DEFAULT_RATE_LIMITS = {
+    "shoot": (5, 10),
+    "hit_detected": (10, 20),
+    "heartbeat": (2, 5),
+    "other": (5, 20),
+}
+
+# Message types that share a bucket
+MESSAGE_CLASSES = {
+    "shoot": "shoot",
+    "hit_detected": "hit_detected",
+    "heartbeat": "heartbeat",
+    "heartbeat_ack": "heartbeat",
+    "ping": "heartbeat",
+}
+
+
+def message_class(msg_type):
+    return MESSAGE_CLASSES.get(msg_type, "other")
+
+
+class TokenBucket:
+    """Allows `rate` events per second on average and bursts of up to `burst`"""
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now):
+        """Spend one token; False if the bucket is empty"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class ClientRateLimiter:
+    """
+    The buckets of one connection, used by its thread and, for datagrams, the UDP
+    thread. No lock: a rare race can only let one extra message through.
+    """
+
+    def __init__(self, limits=DEFAULT_RATE_LIMITS, clock=time.monotonic):
+        self.limits = limits
+        self.clock = clock
+        self.buckets = {}  # {message class: TokenBucket}, created on first use
+        self.dropped = {}  # {message class: count}
+
+    def allow(self, msg_type):
+        """Return True if a message of this type may be processed now"""
+        kind = message_class(msg_type)
+        now = self.clock()
+        bucket = self.buckets.get(kind)
+        if bucket is None:
+            if kind not in self.limits:
+                return True  # No limit configured for this class
+            rate, burst = self.limits[kind]
+            bucket = self.buckets[kind] = TokenBucket(rate, burst, now)
+        if bucket.take(now):
+            return True
+        self.dropped[kind] = self.dropped.get(kind, 0) + 1
+        return False
+
+    @property
+    def total_dropped(self):
+        return sum(self.dropped.values())
@@ -0,0 +1,210 @@
+# Deterministic match replay for the Laser Tag server
+# Feeds a game recorded by match_recorder.py back through the real GameServer
+# logic on a virtual clock, as fast as possible, and checks the final scores.
+#
+# Usage: python replay.py [--dir recordings] [--game N] [--repeat K]
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+os.environ.setdefault('KIVY_NO_ARGS', '1')  # Keep Kivy from parsing our command line
+
+from match_recorder import (MatchReader, RECORDINGS_DIR, KIND_MESSAGE, KIND_STATE,
+                            KIND_GAME_START, KIND_GAME_END)
+from EnhancedServerGUI import GameServer
+
+
+class VirtualClock:
+    """Stands in for time.time(); only moves when the replay advances it"""
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+class NullSocket:
+    """Accepts everything the server sends and only counts the bytes"""
+    def __init__(self):
+        self.bytes_sent = 0
+
+    def send(self, data):
+        self.bytes_sent += len(data)
+        return len(data)
+
+    def sendall(self, data):
+        self.bytes_sent += len(data)
+
+    def shutdown(self, how):
+        pass
+
+    def close(self):
+        pass
+
+
+class ReplayResult:
+    def __init__(self, game_number, events, wall_seconds, game_seconds, scores, expected_scores, bytes_sent):
+        self.game_number = game_number
+        self.events = events
+        self.wall_seconds = wall_seconds
+        self.game_seconds = game_seconds
+        self.scores = scores
+        self.expected_scores = expected_scores
+        self.bytes_sent = bytes_sent
+
+    @property
+    def scores_match(self):
+        return self.expected_scores is None or self.scores == self.expected_scores
+
+    def summary(self):
+        rate = self.events / self.wall_seconds if self.wall_seconds else 0
+        speedup = self.game_seconds / self.wall_seconds if self.wall_seconds else 0
+        status = "OK" if self.scores_match else "SCORE MISMATCH"
+        lines = [
+            f"Game #{self.game_number}: {status}",
+            f"  {self.events} events in {self.wall_seconds * 1000:.1f} ms "
+            f"({rate:,.0f} events/s, {speedup:,.0f}x real time)",
+            f"  {self.bytes_sent} bytes sent to clients",
+        ]
+        if not self.scores_match:
+            lines.append(f"  expected: {self.expected_scores}")
+            lines.append(f"  replayed: {self.scores}")
+        return "\n".join(lines)
+
+
+class MatchReplayer:
+    """Replays one recorded game through a fresh GameServer"""
+
+    def __init__(self, reader):
+        self.reader = reader
+
+    def replay(self, game_number):
+        records = list(self.reader.game_records(game_number))
+        if not records or records[0][2] != KIND_GAME_START:
+            raise ValueError(f"Game #{game_number} has no start record")
+
+        start_info = json.loads(records[0][4].decode('utf-8'))
+        clock = VirtualClock(records[0][1])
+        server = GameServer(
+            lambda message: None,
+            db_path=':memory:',
+            recordings_dir=None,
+            clock=clock,
+            threaded_timer=False
+        )
+        sockets = {}
+
+        def connect(client_id):
+            if client_id not in sockets:
+                sockets[client_id] = NullSocket()
+                host, _, port = client_id.rpartition(':')
+                server.clients[client_id] = (sockets[client_id], (host, int(port or 0)))
+            return sockets[client_id]
+
+        # Rebuild the roster in join order (find_player_by_id depends on it)
+        clients = start_info.get('clients', {})
+        by_name = {name: client_id for client_id, name in clients.items()}
+        server.game_state['max_players'] = max(len(start_info['players']), server.game_state['max_players'])
+        server.game_state['game_duration'] = start_info.get('game_duration', 300)
+        server.max_health = start_info.get('max_health', server.max_health)
+        for name in start_info['players']:
+            client_id = by_name.get(name, f"replay:{len(sockets) + 1}")
+            sock = connect(client_id)
+            server.process_message({"type": "register", "player_name": name}, client_id, sock)
+        # Recorded reconnects carry the tokens the live server issued
+        server.resume_tokens.update(start_info.get('resume_tokens', {}))
+
+        server.start_game()
+        last_tick = clock.now
+        expected_scores = None
+        events = 0
+
+        def advance(until):
+            # remaining_time only changes on whole seconds, so one tick per second matches the live timer
+            nonlocal last_tick
+            while server.game_state['is_running'] and last_tick + 1 <= until:
+                last_tick += 1
+                clock.now = last_tick
+                server.tick_timer(last_tick)
+                if server.game_state['remaining_time'] <= 0:
+                    server.finish_timer()
+            clock.now = max(clock.now, until)
+
+        wall_start = time.perf_counter()
+        for seq, timestamp, kind, client_id, payload in records[1:]:
+            advance(timestamp)
+            events += 1
+
+            if kind == KIND_MESSAGE:
+                sock = connect(client_id)
+                try:
+                    message = json.loads(payload.decode('utf-8'))
+                except ValueError:
+                    continue
+                server.process_message(message, client_id, sock)
+
+            elif kind == KIND_STATE:
+                fields = json.loads(payload.decode('utf-8'))
+                event = fields.get('event')
+                if event in ('game_paused', 'game_resumed'):
+                    server.pause_game()
+                elif event == 'player_disconnected':
+                    # Recordings from before session resumption always removed the player
+                    server.disconnect_client(client_id, hold_slot=fields.get('held', False))
+                elif event == 'player_registered' and fields.get('resume_token'):
+                    server.resume_tokens[fields['resume_token']] = fields['player_name']
+                elif event == 'session_expired':
+                    server.remove_player(fields['player_name'])
+
+            elif kind == KIND_GAME_END:
+                end_info = json.loads(payload.decode('utf-8'))
+                expected_scores = end_info.get('final_scores')
+                if end_info.get('reason') == 'time_up':
+                    advance(timestamp + 1)
+                    if server.game_state['is_running']:
+                        server.finish_timer()
+                else:
+                    server.stop_game()
+                break
+        wall_seconds = time.perf_counter() - wall_start
+
+        scores = dict(server.player_scores)
+        bytes_sent = sum(sock.bytes_sent for sock in sockets.values())
+        game_seconds = clock.now - records[0][1]
+        server.db_connection.close()
+        return ReplayResult(game_number, events, wall_seconds, game_seconds, scores, expected_scores, bytes_sent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded Laser Tag matches through GameServer")
+    parser.add_argument('--dir', default=RECORDINGS_DIR, help="recordings directory")
+    parser.add_argument('--game', type=int, action='append', help="game number (default: all finished games)")
+    parser.add_argument('--repeat', type=int, default=1, help="replay each game this many times")
+    args = parser.parse_args()
+
+    # Per-event INFO logging would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+
+    reader = MatchReader(args.dir)
+    games = reader.games()
+    numbers = args.game or sorted(n for n, g in games.items() if g['end'] is not None)
+    if not numbers:
+        print(f"No finished games in {args.dir}")
+        return 1
+
+    replayer = MatchReplayer(reader)
+    failed = False
+    for number in numbers:
+        for _ in range(args.repeat):
+            result = replayer.replay(number)
+            print(result.summary())
+            failed = failed or not result.scores_match
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
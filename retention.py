@@ -0,0 +1,153 @@
+# History retention for lasertag.db
+# Old games are rolled into per-player daily summaries and their raw rows are
+# moved, compressed, into a separate archive database. The live database is
+# then shrunk with incremental VACUUM and re-analyzed while no game is running.
+
+import json
+import logging
+import sqlite3
+import threading
+import zlib
+from datetime import datetime, timedelta
+
+import database
+
+ARCHIVE_PATH = 'lasertag_archive.db'
+RETENTION_DAYS = 90       # Games newer than this stay in lasertag.db
+BATCH_SIZE = 500          # Games moved per transaction, so a game start never waits long
+VACUUM_PAGES = 1000       # Free pages returned to the OS per maintenance pass
+
+
+def _log(message, level='info'):
+    getattr(logging, level)(message)
+
+
+def init_archive(path=ARCHIVE_PATH):
+    """Create the archive database if it does not exist yet"""
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS archived_games (
+            game_id INTEGER PRIMARY KEY,
+            date_time TEXT NOT NULL,
+            duration INTEGER NOT NULL,
+            player_count INTEGER NOT NULL,
+            detail BLOB NOT NULL
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_archived_games_date_time ON archived_games(date_time)")
+    conn.commit()
+    conn.close()
+
+
+def compress_detail(detail):
+    """Pack a game's raw detail (a JSON-able dict) for the archive"""
+    return zlib.compress(json.dumps(detail).encode('utf-8'), 9)
+
+
+def decompress_detail(blob):
+    """Unpack a detail blob read from archived_games"""
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+
+def compact_batch(conn, cutoff, batch_size=BATCH_SIZE):
+    """
+    Archive up to batch_size games older than cutoff in one transaction.
+    conn must have the archive attached as 'archive'.
+    returns: number of games moved
+    """
+    games = conn.execute('''
+        SELECT game_id, date_time, duration, player_count, player_names FROM games
+        WHERE date_time < ? ORDER BY date_time LIMIT ?
+    ''', (cutoff, batch_size)).fetchall()
+    if not games:
+        return 0
+
+    with conn:
+        for game_id, date_time, duration, player_count, player_names in games:
+            names = database.split_player_names(player_names)
+            conn.execute('''
+                INSERT OR REPLACE INTO archive.archived_games
+                    (game_id, date_time, duration, player_count, detail)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (game_id, date_time, duration, player_count,
+                  compress_detail({"player_names": names})))
+
+            # Per-player totals survive in the live database as one row per player per day
+            conn.execute('''
+                INSERT INTO player_summaries (player_id, day, games, duration)
+                SELECT player_id, ?, 1, ? FROM game_players WHERE game_id = ?
+                ON CONFLICT(player_id, day) DO UPDATE SET
+                    games = games + 1,
+                    duration = duration + excluded.duration
+            ''', (date_time[:10], duration, game_id))
+
+            # game_players rows go with it (ON DELETE CASCADE)
+            conn.execute("DELETE FROM games WHERE game_id = ?", (game_id,))
+    # stats_totals/stats_daily are left alone: they already count these games
+    return len(games)
+
+
+def run_maintenance(conn, pages=VACUUM_PAGES):
+    """Return up to `pages` free pages to the OS and refresh query planner statistics"""
+    conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+    # Bounded ANALYZE: sample at most 1000 rows per index
+    conn.execute("PRAGMA analysis_limit = 1000")
+    conn.execute("PRAGMA optimize")
+
+
+def enable_incremental_vacuum(conn):
+    """Switch an older database (auto_vacuum = NONE) to incremental mode; needs one full VACUUM"""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+
+
+class RetentionWorker:
+    """
+    Runs compaction and maintenance on a background thread between games.
+    is_idle() is checked between batches; work stops as soon as it returns False.
+    """
+    def __init__(self, is_idle, log=_log, db_path=database.DB_PATH, archive_path=ARCHIVE_PATH,
+                 keep_days=RETENTION_DAYS):
+        self.is_idle = is_idle
+        self.log = log
+        self.db_path = db_path
+        self.archive_path = archive_path
+        self.keep_days = keep_days
+        self.thread = None
+
+    def start(self):
+        """Start an idle pass unless one is already running"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self.run_idle_pass, daemon=True)
+        self.thread.start()
+
+    def run_idle_pass(self):
+        cutoff = (datetime.now() - timedelta(days=self.keep_days)).strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            init_archive(self.archive_path)
+            # Own connection: the server's connection belongs to the game threads
+            conn = database.connect(self.db_path, timeout=10)
+            try:
+                if not self.is_idle():
+                    return
+                enable_incremental_vacuum(conn)
+
+                conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+                moved = 0
+                while self.is_idle():
+                    count = compact_batch(conn, cutoff)
+                    if not count:
+                        break
+                    moved += count
+                conn.execute("DETACH DATABASE archive")
+
+                if self.is_idle():
+                    run_maintenance(conn)
+                if moved:
+                    self.log(f"Retention: archived {moved} games older than {self.keep_days} days")
+            finally:
+                conn.close()
+        except Exception as e:
+            self.log(f"Retention error: {str(e)}", 'warning')
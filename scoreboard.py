@@ -0,0 +1,84 @@
+# Versioned scoreboard stream
+# Instead of shipping every player's numbers with each event, the server publishes
+# numbered scoreboard messages that carry only what changed since the previous one:
+#   {"type": "scoreboard", "seq": 7, "delta": {"Alice": {"score": 20}}, "removed": ["Bob"]}
+# Every `keyframe_every` updates, and whenever a client asks with
+# {"type": "scoreboard_request"}, a keyframe carries the full table instead:
+#   {"type": "scoreboard", "seq": 7, "keyframe": true, "players": {"Alice": {...}, ...}}
+# A client that sees a seq it did not expect has missed a delta and asks for a keyframe.
+
+FIELDS = ("health", "score", "status")
+
+
+class ScoreboardStream:
+    """Server end: turns successive scoreboard snapshots into deltas and keyframes"""
+
+    def __init__(self, keyframe_every=20):
+        self.keyframe_every = keyframe_every
+        self.players = {}  # {player name: {field: value}} as last published
+        self.seq = 0
+        self.since_keyframe = 0
+
+    def update(self, snapshot):
+        """
+        Publishable message for a new snapshot ({player: {field: value}}), or None if
+        nothing changed. Every keyframe_every-th update is a keyframe.
+        """
+        delta = {}
+        for name, fields in snapshot.items():
+            previous = self.players.get(name, {})
+            changed = {field: value for field, value in fields.items() if previous.get(field) != value}
+            if changed or name not in self.players:
+                delta[name] = changed
+        removed = [name for name in self.players if name not in snapshot]
+        if not delta and not removed:
+            return None
+
+        self.players = {name: dict(fields) for name, fields in snapshot.items()}
+        self.seq += 1
+        self.since_keyframe += 1
+        if self.since_keyframe >= self.keyframe_every:
+            self.since_keyframe = 0
+            return self.keyframe()
+        message = {"type": "scoreboard", "seq": self.seq, "delta": delta}
+        if removed:
+            message["removed"] = removed
+        return message
+
+    def keyframe(self):
+        """The full table as of the current seq"""
+        return {"type": "scoreboard", "seq": self.seq, "keyframe": True,
+                "players": {name: dict(fields) for name, fields in self.players.items()}}
+
+
+class ScoreboardMirror:
+    """Client end: rebuilds the table from the stream"""
+
+    def __init__(self):
+        self.players = {}
+        self.seq = None
+        self.waiting = False  # A delta was missed; deltas are ignored until a keyframe
+
+    def apply(self, message):
+        """
+        Apply a scoreboard message. Returns False on the first missed delta: ask for a
+        keyframe then (once - later deltas are ignored quietly until it arrives).
+        """
+        seq = message.get("seq")
+        if message.get("keyframe"):
+            if self.seq is None or self.waiting or seq >= self.seq:
+                self.players = {name: dict(fields) for name, fields in message.get("players", {}).items()}
+                self.seq = seq
+                self.waiting = False
+            return True
+        if self.waiting or (self.seq is not None and seq <= self.seq):
+            return True  # Waiting for a keyframe, or already covered by one
+        if self.seq is None or seq != self.seq + 1:
+            self.waiting = True
+            return False
+        for name, changed in message.get("delta", {}).items():
+            self.players.setdefault(name, {}).update(changed)
+        for name in message.get("removed", ()):
+            self.players.pop(name, None)
+        self.seq = seq
+        return True
@@ -3,15 +3,17 @@ import threading
 import json
 import time
 from NetworkEntity import NetworkEntity
+from heartbeat import HeartbeatManager
 
 class LaserTagServer(NetworkEntity):
-    def __init__(self, host='0.0.0.0', port=9999):
+    def __init__(self, host='0.0.0.0', port=9999, network=None):
         """
         Initialize a simplified Laser Tag Server that just handles button presses.
         
         Args:
             host: Host address to bind to (default: all interfaces)
             port: Port number to bind to (default: 9999)
+            network: transport.TcpNetwork (default) or transport.MemoryNetwork
         """
         # Initialize with NetworkEntity parameters
         super().__init__(
@@ -19,7 +21,8 @@ class LaserTagServer(NetworkEntity):
             device_name="LaserTagServer",
             ip_address=host,
             port=port,
-            connected=False
+            connected=False,
+            network=network
         )
         
         # Server properties
@@ -31,17 +34,23 @@ class LaserTagServer(NetworkEntity):
         
         # Lock for thread safety
         self.lock = threading.Lock()
+
+        # Liveness: one timing wheel pings clients that have been quiet for 10 seconds
+        # (replacing a 0.5 s recv timeout per client). As before, only a ping that cannot be
+        # sent disconnects a client: our newline-JSON clients do not answer pings, so an
+        # answer ("pong" or "heartbeat_ack" with the seq) only feeds the RTT estimate
+        self.heartbeats = HeartbeatManager(self.send_ping, self.heartbeat_lost, interval=10.0,
+                                           initial_timeout=5.0, max_timeout=10.0)
+        self.unreachable = set()  # client_ids whose ping could not be sent
     
     def start(self):
         """Start the server and begin accepting connections."""
         try:
             # Create server socket
-            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self.server_socket.bind((self.ip_address, self.port))
-            self.server_socket.listen(5)
+            self.server_socket = self.network.listen(self.ip_address, self.port, 5)
             self.connected = True
             self.running = True
+            self.heartbeats.start()
             
             print(f"Server started on {self.ip_address}:{self.port}")
             
@@ -60,6 +69,8 @@ class LaserTagServer(NetworkEntity):
         while self.running:
             try:
                 client_socket, client_address = self.server_socket.accept()
+                # TCP_NODELAY and keepalive (see socket_profile.py)
+                self.network.configure(client_socket)
                 # Create a new thread to handle this client
                 client_id = self.next_client_id
                 self.next_client_id += 1
@@ -69,6 +80,7 @@ class LaserTagServer(NetworkEntity):
                 # Store client info (socket, address, no name yet)
                 with self.lock:
                     self.clients[client_id] = (client_socket, client_address, None)
+                self.heartbeats.add(client_id)
                 
                 # Start client handler thread
                 client_thread = threading.Thread(
@@ -97,11 +109,10 @@ class LaserTagServer(NetworkEntity):
             client_id: ID assigned to this client
         """
         try:
-            # Set a timeout for receiving data
-            client_socket.settimeout(0.5)
+            # Block in recv(); the heartbeat manager closes the socket if the client goes silent
+            client_socket.settimeout(None)
             
             buffer = b''
-            last_active_time = time.time()
             
             while self.running:
                 try:
@@ -114,7 +125,7 @@ class LaserTagServer(NetworkEntity):
                         break
                     
                     # Client is active
-                    last_active_time = time.time()
+                    self.heartbeats.heard(client_id)
                     
                     # Add to buffer and process complete messages
                     buffer += data
@@ -135,20 +146,6 @@ class LaserTagServer(NetworkEntity):
                             except json.JSONDecodeError as e:
                                 print(f"JSON decode error from client {client_id}: {e}, data: {line}")
                     
-                except socket.timeout:
-                    # This is expected due to the socket timeout
-                    # Check if client has been inactive for too long (30 seconds)
-                    if time.time() - last_active_time > 30:
-                        print(f"Client {client_id} inactive for 30 seconds, checking connection")
-                        # Send a ping message to check if client is still there
-                        try:
-                            ping_msg = {"type": "ping"}
-                            self.send_message(client_socket, ping_msg)
-                            last_active_time = time.time()  # Reset the timer
-                        except Exception:
-                            print(f"Failed to send ping to client {client_id}, assuming disconnected")
-                            break
-                    continue
                 except ConnectionResetError:
                     print(f"Connection reset by client {client_id}")
                     break
@@ -211,6 +208,10 @@ class LaserTagServer(NetworkEntity):
                     }
                     self.send_message(self.clients[client_id][0], ack_msg)
             
+        elif msg_type in ("pong", "heartbeat_ack"):
+            # Answer to our ping; gives the round-trip time
+            self.heartbeats.ack(client_id, message.get("seq"))
+            
         elif msg_type == "button_press":
             # Button press notification
             button_pin = message.get("button_pin")
@@ -253,6 +254,37 @@ class LaserTagServer(NetworkEntity):
             print(f"Error sending message: {e}")
             return False
     
+    def send_ping(self, client_id, seq):
+        """The same {"type": "ping"} as ever, numbered so an answer carrying the seq gives an RTT"""
+        with self.lock:
+            client = self.clients.get(client_id)
+        if client is None:
+            return False  # Already gone: the manager forgets it and heartbeat_lost has nothing to do
+        if self.send_message(client[0], {"type": "ping", "seq": seq}):
+            return True
+        self.unreachable.add(client_id)
+        return False
+    
+    def heartbeat_lost(self, client_id):
+        """
+        A ping could not be sent: the client is gone, and closing the socket ends its
+        handler thread. Unanswered pings alone are normal here, so keep pinging.
+        """
+        with self.lock:
+            client = self.clients.get(client_id)
+        if client is None:
+            self.unreachable.discard(client_id)
+            return
+        if client_id not in self.unreachable:
+            self.heartbeats.add(client_id)
+            return
+        self.unreachable.discard(client_id)
+        print(f"Failed to send ping to client {client_id}, assuming disconnected")
+        try:
+            client[0].shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    
     def broadcast_message(self, message):
         """
         Send a message to all connected clients.
@@ -280,6 +312,7 @@ class LaserTagServer(NetworkEntity):
         
         # If we have the client ID, remove from lists
         if client_id:
+            self.heartbeats.remove(client_id)
             with self.lock:
                 if client_id in self.clients:
                     player_name = self.clients[client_id][2] or f"Player{client_id}"
@@ -291,6 +324,7 @@ class LaserTagServer(NetworkEntity):
     def shutdown(self):
         """Shut down the server and clean up resources."""
         self.running = False
+        self.heartbeats.stop()
         
         # Close all client connections
         with self.lock:
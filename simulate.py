@@ -0,0 +1,118 @@
+# Socket-free load simulation for the Laser Tag server
+# Runs a real GameServer on a transport.MemoryNetwork and connects hundreds of
+# simulated players to it, so the game logic can be driven at scale inside one
+# process without touching kernel sockets or network ports.
+#
+# Usage: python simulate.py --players 200 --seconds 10 --shots-per-second 2
+
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+
+os.environ.setdefault('KIVY_NO_ARGS', '1')  # Keep Kivy from parsing our command line
+
+from client import LaserTagClient
+from transport import MemoryNetwork
+from EnhancedServerGUI import GameServer
+
+
+class SimulatedPlayer:
+    """One player: registers, fires at a steady rate and reports hits it takes"""
+
+    def __init__(self, network, port, number, seed, topics):
+        self.number = number  # Join order, which the server uses as the shooter ID
+        self.name = f"Sim_{number:04d}"
+        self.random = random.Random(seed)
+        self.messages_sent = 0
+        self.messages_received = 0
+        self.client = LaserTagClient(self.name, '127.0.0.1', port,
+                                     register_message={"type": "register", "player_name": self.name,
+                                                       "topics": topics},
+                                     on_messages=self.on_messages, network=network, reconnect=False)
+
+    def on_messages(self, messages):
+        self.messages_received += len(messages)
+
+    def send(self, message):
+        self.client.send_data(message)
+        self.messages_sent += 1
+
+    def play(self, players, deadline, shots_per_second, hit_chance):
+        interval = 1.0 / shots_per_second
+        next_shot = time.monotonic() + self.random.uniform(0, interval)
+        while next_shot < deadline:
+            delay = next_shot - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.send({"type": "shoot", "player_id": self.number})
+            if self.random.random() < hit_chance:
+                # The victim's gun reports the hit, as on the real hardware
+                victim = self.random.choice(players)
+                if victim is not self:
+                    victim.send({"type": "hit_detected", "victim_name": victim.name,
+                                 "shooter_id": self.number})
+            next_shot += interval
+
+
+def run(player_count, seconds, shots_per_second, hit_chance, seed, topics):
+    network = MemoryNetwork()
+    port = 9999
+    server = GameServer(lambda message: None, port=port, db_path=':memory:', recordings_dir=None,
+                        network=network, max_per_ip=player_count, max_connections=player_count)
+    server.game_state['max_players'] = player_count
+    server.max_health = max(server.max_health, 1000)  # Keep everyone alive for the whole run
+    server.start_server()
+
+    players = []
+    for number in range(1, player_count + 1):
+        player = SimulatedPlayer(network, port, number, seed + number, topics)
+        player.client.connect()
+        players.append(player)
+        # Register one at a time so join order matches the shooter IDs
+        while len(server.game_state['active_players']) < number:
+            time.sleep(0.001)
+
+    server.start_game()
+    start = time.monotonic()
+    deadline = start + seconds
+    threads = [threading.Thread(target=p.play, args=(players, deadline, shots_per_second, hit_chance),
+                                daemon=True) for p in players]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    time.sleep(0.5)  # Let the pipelined sends drain
+    scores = dict(server.player_scores)
+    for player in players:
+        player.client.disconnect()
+    server.shutdown()
+    sent = sum(p.messages_sent for p in players)
+    received = sum(p.messages_received for p in players)
+    print(f"{player_count} players, {elapsed:.1f}s: {sent} messages sent ({sent / elapsed:,.0f}/s), "
+          f"{received:,} messages delivered to clients")
+    print(f"  hits scored: {sum(scores.values()) // 10}, top score: {max(scores.values(), default=0)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many players against GameServer in memory")
+    parser.add_argument('--players', type=int, default=100)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--shots-per-second', type=float, default=2, help="per player")
+    parser.add_argument('--hit-chance', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--topics', default='self,game_control',
+                        help="comma-separated event topics each player subscribes to (see subscriptions.py)")
+    args = parser.parse_args()
+
+    # Per-message INFO logging would dominate the run
+    logging.getLogger().setLevel(logging.WARNING)
+    run(args.players, args.seconds, args.shots_per_second, args.hit_chance, args.seed, args.topics.split(','))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Socket tuning for Laser Tag connections
+# Game messages are tiny (a hit is ~60 bytes) and latency-sensitive, which is the
+# worst case for Nagle's algorithm: a small write can wait for the ACK of the
+# previous one, and delayed ACKs make that wait tens of milliseconds. A profile
+# turns Nagle off, enables keepalive so dead peers are noticed by the kernel too,
+# and optionally sizes the buffers. Options the platform lacks are skipped.
+
+import socket
+
+
+class SocketProfile:
+    """Options applied to every accepted and outbound TCP connection"""
+
+    def __init__(self, nodelay=True, keepalive=True, keepidle=10, keepintvl=3, keepcnt=3,
+                 sndbuf=None, rcvbuf=None):
+        """
+        Args:
+            nodelay: Disable Nagle's algorithm (TCP_NODELAY)
+            keepalive: Enable TCP keepalive probes after keepidle seconds of silence,
+                       every keepintvl seconds, giving up after keepcnt
+            sndbuf, rcvbuf: Kernel buffer sizes in bytes (None keeps the system default)
+        """
+        self.nodelay = nodelay
+        self.keepalive = keepalive
+        self.keepidle = keepidle
+        self.keepintvl = keepintvl
+        self.keepcnt = keepcnt
+        self.sndbuf = sndbuf
+        self.rcvbuf = rcvbuf
+
+    def options(self):
+        """(level, option name, value) for everything this profile sets"""
+        options = [
+            (socket.IPPROTO_TCP, 'TCP_NODELAY', int(self.nodelay)),
+            (socket.SOL_SOCKET, 'SO_KEEPALIVE', int(self.keepalive)),
+        ]
+        if self.keepalive:
+            # Linux names; macOS calls the idle time TCP_KEEPALIVE
+            idle_name = 'TCP_KEEPIDLE' if hasattr(socket, 'TCP_KEEPIDLE') else 'TCP_KEEPALIVE'
+            options += [
+                (socket.IPPROTO_TCP, idle_name, self.keepidle),
+                (socket.IPPROTO_TCP, 'TCP_KEEPINTVL', self.keepintvl),
+                (socket.IPPROTO_TCP, 'TCP_KEEPCNT', self.keepcnt),
+            ]
+        if self.sndbuf:
+            options.append((socket.SOL_SOCKET, 'SO_SNDBUF', self.sndbuf))
+        if self.rcvbuf:
+            options.append((socket.SOL_SOCKET, 'SO_RCVBUF', self.rcvbuf))
+        return options
+
+    def apply(self, sock):
+        """Set the profile's options on sock; returns sock"""
+        for level, name, value in self.options():
+            option = getattr(socket, name, None)
+            if option is None:
+                continue
+            try:
+                sock.setsockopt(level, option, value)
+            except OSError:
+                pass  # Not supported for this socket or platform
+        return sock
+
+
+# Names reported by socket_report()
+REPORTED_OPTIONS = [
+    (socket.IPPROTO_TCP, 'TCP_NODELAY'),
+    (socket.SOL_SOCKET, 'SO_KEEPALIVE'),
+    (socket.IPPROTO_TCP, 'TCP_KEEPIDLE'),
+    (socket.IPPROTO_TCP, 'TCP_KEEPINTVL'),
+    (socket.IPPROTO_TCP, 'TCP_KEEPCNT'),
+    (socket.SOL_SOCKET, 'SO_SNDBUF'),
+    (socket.SOL_SOCKET, 'SO_RCVBUF'),
+]
+
+
+def socket_report(sock):
+    """Read the effective options back with getsockopt; {} for non-kernel sockets"""
+    report = {}
+    getsockopt = getattr(sock, 'getsockopt', None)
+    if getsockopt is None:
+        return report
+    for level, name in REPORTED_OPTIONS:
+        option = getattr(socket, name, None)
+        if option is None:
+            continue
+        try:
+            report[name] = getsockopt(level, option)
+        except OSError:
+            pass
+    return report
+
+
+LOW_LATENCY = SocketProfile()
+SYSTEM_DEFAULT = SocketProfile(nodelay=False, keepalive=False)
@@ -0,0 +1,205 @@
+# Multicast spectator feed
+# Spectator events (timer updates, game events, hits, eliminations) are published
+# once to a LAN multicast group instead of once per display connection, so adding
+# displays costs the server nothing. Every packet is encrypted with the
+# encryptions.py key and numbered; a display that notices a gap in the numbers asks
+# for the missing events over its TCP connection, which the server answers from a
+# ring buffer of recent packets.
+#
+#   publisher -> {"seq": n, "msg": {...}} -> group:port
+#   display   -> {"type": "spectator_resync", "from_seq": n}              (TCP)
+#   server    -> {"type": "spectator_resync", "entries": [[seq, msg], ...],
+#                 "oldest": first seq still buffered}                     (TCP)
+#
+# Enable on the server with: python EnhancedServerGUI.py -- --spectator-group [group]
+
+import collections
+import socket
+import struct
+import threading
+import time
+
+from udp_channel import encode_datagram, decode_datagram, MAX_DATAGRAM
+
+SPECTATOR_EVENTS = ("timer_state", "game_event", "player_hit", "player_eliminated", "scoreboard")
+DEFAULT_SPECTATOR_GROUP = "239.255.42.99"  # Organisation-local scope; stays on the LAN
+DEFAULT_SPECTATOR_PORT = 9997
+RESYNC_RETRY = 1.0  # Seconds before an unanswered resync request is repeated
+
+
+class SpectatorPublisher:
+    """Server end: numbers spectator events, multicasts them and keeps the last few for resyncs"""
+
+    def __init__(self, sock, group=DEFAULT_SPECTATOR_GROUP, port=DEFAULT_SPECTATOR_PORT, capacity=256,
+                 interface=None):
+        """
+        Args:
+            sock: Datagram socket to send from (network.datagram())
+            capacity: Events kept for resync requests; older gaps are reported as lost
+            interface: Local address to multicast from (None lets the routing table pick)
+        """
+        self.sock = sock
+        self.address = (group, port)
+        self.ring = collections.deque(maxlen=capacity)  # (seq, message)
+        self.next_seq = 1
+        self.lock = threading.Lock()
+        self.send_errors = 0
+        try:
+            # One hop: the feed is for displays on this LAN only
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+            if interface:
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+        except (AttributeError, OSError):
+            pass
+
+    def publish(self, message):
+        """Multicast one event; returns its sequence number"""
+        with self.lock:
+            seq = self.next_seq
+            self.next_seq += 1
+            self.ring.append((seq, message))
+            datagram = encode_datagram({"seq": seq, "msg": message})
+        try:
+            self.sock.sendto(datagram, self.address)
+        except OSError:
+            self.send_errors += 1  # Subscribers will see the gap and resync
+        return seq
+
+    def resync(self, from_seq):
+        """The buffered events from from_seq on, as a spectator_resync reply"""
+        with self.lock:
+            entries = [[seq, message] for seq, message in self.ring if seq >= from_seq]
+            oldest = self.ring[0][0] if self.ring else self.next_seq
+        return {"type": "spectator_resync", "entries": entries, "oldest": oldest}
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def join_group(group=DEFAULT_SPECTATOR_GROUP, port=DEFAULT_SPECTATOR_PORT, interface='0.0.0.0'):
+    """A UDP socket bound to port and subscribed to the multicast group"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  # Several displays on one machine
+    sock.bind(('', port))
+    membership = struct.pack('4s4s', socket.inet_aton(group), socket.inet_aton(interface))
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+    return sock
+
+
+class SpectatorSubscriber:
+    """
+    Display end: delivers events in order. Events that arrive after a gap are held
+    back until the resync reply fills it; gaps older than the server's buffer are
+    skipped and counted in `lost`.
+    """
+
+    def __init__(self, sock, on_messages, request_resync, clock=time.monotonic):
+        """
+        Args:
+            sock: Socket from join_group()
+            on_messages: Called with a list of events, in order, from the receiving thread
+                         or from whichever thread calls handle_resync(); it runs under the
+                         subscriber's lock so deliveries cannot overtake each other
+            request_resync: Called with the first missing seq; should send a
+                            spectator_resync request over TCP
+        """
+        self.sock = sock
+        self.on_messages = on_messages
+        self.request_resync = request_resync
+        self.clock = clock
+        self.next_seq = None   # First event not yet delivered
+        self.held = {}         # {seq: message} received ahead of a gap
+        self.resync_sent = None
+        self.lost = 0
+        self.lock = threading.Lock()
+        self.running = False
+
+    def start(self, next_seq=None):
+        """Start receiving; next_seq (from the server) makes events missed before joining count as a gap"""
+        self.next_seq = next_seq
+        self.running = True
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def _run(self):
+        self.sock.settimeout(1)
+        while self.running:
+            try:
+                data, _ = self.sock.recvfrom(MAX_DATAGRAM)
+            except socket.timeout:
+                self._check_resync()
+                continue
+            except OSError:
+                break
+            try:
+                packet = decode_datagram(data)
+            except ValueError:
+                continue
+            self.receive(packet.get("seq"), packet.get("msg"))
+
+    def receive(self, seq, message):
+        if not isinstance(seq, int) or not isinstance(message, dict):
+            return
+        with self.lock:
+            if self.next_seq is None:
+                self.next_seq = seq
+            if seq < self.next_seq or seq in self.held:
+                return  # Already delivered, or already waiting
+            self.held[seq] = message
+            self._deliver()
+        self._check_resync()
+
+    def handle_resync(self, reply):
+        """Fill gaps from a spectator_resync reply received over TCP"""
+        with self.lock:
+            for seq, message in reply.get("entries", ()):
+                if self.next_seq is None or seq >= self.next_seq:
+                    self.held.setdefault(seq, message)
+            oldest = reply.get("oldest")
+            if self.next_seq is not None and oldest is not None and oldest > self.next_seq:
+                # The server no longer has these; skip them rather than wait forever
+                self.lost += oldest - self.next_seq
+                self.next_seq = oldest
+                self.held = {seq: message for seq, message in self.held.items() if seq >= oldest}
+            if self.next_seq is None and self.held:
+                self.next_seq = min(self.held)
+            self.resync_sent = None
+            self._deliver()
+
+    def resync_from(self, seq):
+        """The server has published up to seq - 1 (e.g. after a reconnect); fetch anything missed"""
+        with self.lock:
+            if self.next_seq is None or seq <= self.next_seq:
+                return
+            self.resync_sent = self.clock()
+            first_missing = self.next_seq
+        self.request_resync(first_missing)
+
+    def _deliver(self):
+        """Hand over every event that is now in order (lock held)"""
+        ready = []
+        while self.next_seq in self.held:
+            ready.append(self.held.pop(self.next_seq))
+            self.next_seq += 1
+        if ready:
+            self.on_messages(ready)
+
+    def _check_resync(self):
+        with self.lock:
+            if not self.held:
+                return
+            now = self.clock()
+            if self.resync_sent is not None and now - self.resync_sent < RESYNC_RETRY:
+                return
+            self.resync_sent = now
+            first_missing = self.next_seq
+        self.request_resync(first_missing)
@@ -0,0 +1,79 @@
+# Topic subscriptions for server events
+# Clients say at registration which events they want ("topics": [...]) and the
+# server sends each event only to the subscribers of its topic. A Pico gun that
+# only cares about its own hits no longer receives every timer tick and every
+# other player's hit.
+#
+#   self         - hits and eliminations involving this client's player
+#   game_control - game started / paused / resumed / stopped, game over
+#   timer        - timer_state changes (deadline and pause state)
+#   scoreboard   - every hit and elimination
+#   all          - everything (what clients that name no topics get)
+
+import threading
+
+TOPICS = ("self", "game_control", "timer", "scoreboard", "all")
+DEFAULT_TOPICS = ("all",)
+
+# {event type: topic}; unlisted types go to "all" subscribers only
+EVENT_TOPICS = {
+    "game_event": "game_control",
+    "game_over": "game_control",
+    "timer_state": "timer",
+    "player_hit": "scoreboard",
+    "player_eliminated": "scoreboard",
+    "scoreboard": "scoreboard",
+}
+
+
+class SubscriptionRegistry:
+    """
+    Recipient sets per topic, rebuilt when a client subscribes or leaves so that
+    routing an event is one dictionary lookup and a set union at most.
+    """
+
+    def __init__(self):
+        self.topics = {}           # {client_id: frozenset of topics}
+        self.players = {}          # {client_id: player name} for the "self" topic
+        self.recipients = {}       # {topic: frozenset of client_ids}, "all" subscribers included
+        self.self_recipients = {}  # {player name: frozenset of client_ids subscribed to "self"}
+        self.lock = threading.Lock()
+
+    def subscribe(self, client_id, topics=None, player_name=None):
+        """Set a client's topics (None or nothing valid means DEFAULT_TOPICS)"""
+        wanted = frozenset(topic for topic in (topics or ()) if topic in TOPICS) or frozenset(DEFAULT_TOPICS)
+        with self.lock:
+            self.topics[client_id] = wanted
+            if player_name:
+                self.players[client_id] = player_name
+            else:
+                self.players.pop(client_id, None)
+            self._rebuild()
+        return sorted(wanted)
+
+    def unsubscribe(self, client_id):
+        with self.lock:
+            if self.topics.pop(client_id, None) is not None:
+                self.players.pop(client_id, None)
+                self._rebuild()
+
+    def _rebuild(self):
+        recipients = {topic: set() for topic in TOPICS}
+        self_recipients = {}
+        for client_id, topics in self.topics.items():
+            for topic in (TOPICS if "all" in topics else topics):
+                recipients[topic].add(client_id)
+            player_name = self.players.get(client_id)
+            if "self" in topics and player_name:
+                self_recipients.setdefault(player_name, set()).add(client_id)
+        self.recipients = {topic: frozenset(ids) for topic, ids in recipients.items()}
+        self.self_recipients = {name: frozenset(ids) for name, ids in self_recipients.items()}
+
+    def route(self, message, involves=()):
+        """client_ids that should receive message; involves names the players it concerns"""
+        recipients = self.recipients.get(EVENT_TOPICS.get(message.get("type"), "all"), frozenset())
+        for player_name in involves:
+            extra = self.self_recipients.get(player_name)
+            if extra:
+                recipients = recipients | extra
+        return recipients
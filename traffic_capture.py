@@ -0,0 +1,261 @@
+# Raw TCP traffic capture and replay for protocol benchmarking
+# The server can log the exact encrypted bytes it receives on each connection,
+# chunked exactly as recv() returned them, with arrival times. The replayer sends
+# those chunks back to a fresh server from many concurrent connections at 1x, 10x
+# or maximum speed, so coalesced sends and partial reads show up in the numbers.
+#
+# Capture:  GameServer(..., capture_dir='captures')
+# Replay:   python traffic_capture.py captures/traffic_XXXX.cap --speed 10 --copies 50
+# (all replayed connections come from one address, so raise the target server's
+# max_per_ip and max_connections to match)
+
+import argparse
+import os
+import socket
+import struct
+import threading
+import time
+
+from socket_profile import LOW_LATENCY
+
+CAPTURE_DIR = 'captures'
+
+# Record header: connection id, seconds since capture start, event kind, data length
+RECORD = struct.Struct('<IdBI')
+
+EVENT_OPEN = 0   # data is the peer label, e.g. "ip:port"
+EVENT_DATA = 1   # data is one recv() result
+EVENT_CLOSE = 2
+
+
+class TrafficRecorder:
+    """Appends connection events to one capture file; safe to call from any client thread"""
+
+    def __init__(self, directory=CAPTURE_DIR):
+        self.directory = directory
+        self.path = None
+        self.file = None
+        self.lock = threading.Lock()
+        self.start = None
+        self.next_connection = 1
+        self.reopen()
+
+    def reopen(self):
+        """Start a new capture file if close() has ended the last one (a server restart)"""
+        with self.lock:
+            if self.file is not None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            stem = os.path.join(self.directory, time.strftime("traffic_%Y%m%d_%H%M%S"))
+            path, copy = stem + ".cap", 1
+            while os.path.exists(path):  # Restarted within the same second
+                copy += 1
+                path = f"{stem}_{copy}.cap"
+            self.path = path
+            self.file = open(path, 'ab')
+            self.start = time.monotonic()
+            self.next_connection = 1
+
+    def _write(self, connection_id, kind, data=b''):
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(RECORD.pack(connection_id, time.monotonic() - self.start, kind, len(data)))
+            if data:
+                self.file.write(data)
+
+    def open_connection(self, peer):
+        """Start recording a connection from peer ("ip:port"); returns its capture id"""
+        with self.lock:
+            connection_id = self.next_connection
+            self.next_connection += 1
+        self._write(connection_id, EVENT_OPEN, peer.encode('utf-8'))
+        return connection_id
+
+    def record_data(self, connection_id, data):
+        self._write(connection_id, EVENT_DATA, data)
+
+    def close_connection(self, connection_id):
+        self._write(connection_id, EVENT_CLOSE)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def load_capture(path):
+    """
+    Read a capture file.
+    returns: {connection_id: [(seconds, kind, data), ...]} in arrival order
+    """
+    connections = {}
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(RECORD.size)
+            if len(header) < RECORD.size:
+                break
+            connection_id, seconds, kind, length = RECORD.unpack(header)
+            data = f.read(length)
+            connections.setdefault(connection_id, []).append((seconds, kind, data))
+    return connections
+
+
+class FrameRestamper:
+    """
+    Replaces the 4-byte send timestamp at the front of every encrypted frame with the
+    current time, so captures older than decrypt_message's 5 minute window still decode.
+    Chunks are cut wherever recv() returned, so a frame header or timestamp can straddle
+    two chunks; one restamper follows one connection's stream across calls.
+    """
+
+    def __init__(self):
+        self.header = b''    # Length bytes of the current frame header seen so far
+        self.remaining = 0   # Payload bytes left in the current frame
+        self.stamp = b''     # Timestamp bytes still to write into the current frame
+
+    def feed(self, chunk):
+        out = bytearray(chunk)
+        position, end = 0, len(out)
+        while position < end:
+            if not self.remaining:
+                self.header += out[position:position + 1]
+                position += 1
+                if len(self.header) == 2:
+                    self.remaining = (self.header[0] << 8) | self.header[1]
+                    self.header = b''
+                    now = int(time.time())
+                    self.stamp = bytes([(now >> (i * 8)) & 0xFF for i in range(4)])
+            elif self.stamp:
+                out[position] = self.stamp[0]
+                self.stamp = self.stamp[1:]
+                position += 1
+                self.remaining -= 1
+            else:
+                # Skip the rest of the payload that is in this chunk
+                step = min(self.remaining, end - position)
+                position += step
+                self.remaining -= step
+        return bytes(out)
+
+
+class ReplayStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.failed_connections = 0
+        self.chunks_sent = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.send_seconds = 0.0
+
+    def add(self, **counts):
+        with self.lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+
+class TrafficReplayer:
+    """Replays every captured connection `copies` times against host:port"""
+
+    def __init__(self, connections, host='127.0.0.1', port=9999, speed=1.0, copies=1, stamp=True):
+        """
+        Args:
+            connections: Result of load_capture()
+            speed: Time scale (1 = as captured, 10 = ten times faster, 0 = no delays at all)
+            copies: Concurrent synthetic connections per captured connection
+            stamp: Rewrite message timestamps to the current time (see FrameRestamper)
+        """
+        self.connections = connections
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.copies = copies
+        self.stamp = stamp
+        self.stats = ReplayStats()
+
+    def _drain(self, sock):
+        """Read and discard whatever the server sends so its sends never block"""
+        try:
+            while True:
+                data = sock.recv(4096)
+                if not data:
+                    break
+                self.stats.add(bytes_received=len(data))
+        except OSError:
+            pass
+
+    def _replay_connection(self, events, start, origin):
+        try:
+            sock = LOW_LATENCY.apply(socket.create_connection((self.host, self.port)))
+        except OSError:
+            self.stats.add(failed_connections=1)
+            return
+        self.stats.add(connections=1)
+        threading.Thread(target=self._drain, args=(sock,), daemon=True).start()
+        restamper = FrameRestamper() if self.stamp else None
+
+        try:
+            for seconds, kind, data in events:
+                if self.speed:
+                    delay = start + (seconds - origin) / self.speed - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                if kind == EVENT_DATA:
+                    chunk = restamper.feed(data) if restamper else data
+                    sent_at = time.perf_counter()
+                    sock.sendall(chunk)
+                    self.stats.add(chunks_sent=1, bytes_sent=len(chunk),
+                                   send_seconds=time.perf_counter() - sent_at)
+                elif kind == EVENT_CLOSE:
+                    break
+        except OSError:
+            pass
+        finally:
+            sock.close()
+
+    def run(self):
+        """Replay everything and wait for it to finish; returns (stats, elapsed seconds)"""
+        threads = []
+        # Keep the spacing between connections as well as within them
+        origin = min(events[0][0] for events in self.connections.values())
+        start = time.perf_counter()
+        for events in self.connections.values():
+            for _ in range(self.copies):
+                thread = threading.Thread(target=self._replay_connection, args=(events, start, origin),
+                                          daemon=True)
+                thread.start()
+                threads.append(thread)
+        for thread in threads:
+            thread.join()
+        return self.stats, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a captured Laser Tag TCP stream against a server")
+    parser.add_argument('capture', help="capture file written by TrafficRecorder")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9999)
+    parser.add_argument('--speed', type=float, default=1.0, help="1, 10, ... or 0 for maximum speed")
+    parser.add_argument('--copies', type=int, default=1, help="concurrent connections per captured connection")
+    parser.add_argument('--no-restamp', action='store_true', help="send the captured bytes unchanged")
+    args = parser.parse_args()
+
+    connections = load_capture(args.capture)
+    replayer = TrafficReplayer(connections, args.host, args.port, args.speed, args.copies,
+                               stamp=not args.no_restamp)
+    stats, elapsed = replayer.run()
+
+    print(f"Replayed {len(connections)} captured connections x{args.copies} "
+          f"at {'max' if not args.speed else f'{args.speed:g}x'} speed in {elapsed:.2f}s")
+    print(f"  connections: {stats.connections} ok, {stats.failed_connections} failed")
+    print(f"  sent: {stats.chunks_sent} chunks, {stats.bytes_sent} bytes "
+          f"({stats.chunks_sent / elapsed:,.0f} chunks/s)")
+    print(f"  received: {stats.bytes_received} bytes")
+    if stats.chunks_sent:
+        print(f"  mean sendall: {stats.send_seconds / stats.chunks_sent * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# Transport layer for Laser Tag networking
+# The server and clients open connections through a network object instead of
+# calling socket.socket() themselves:
+#   TcpNetwork    - real TCP sockets (the default)
+#   MemoryNetwork - in-process connections built on queue pairs, for simulations
+#                   and benchmarks with hundreds of players and no kernel sockets
+# Both hand out objects with the socket methods the code base uses
+# (accept, recv, send, sendall, settimeout, close, ...), and datagram() opens a
+# UDP-style endpoint (sendto, recvfrom) for udp_channel.py.
+
+import itertools
+import queue
+import socket
+import threading
+
+from socket_profile import LOW_LATENCY
+
+
+class TcpNetwork:
+    """Plain TCP; listen() and connect() return real sockets tuned with a SocketProfile"""
+
+    def __init__(self, profile=LOW_LATENCY):
+        self.profile = profile
+
+    def configure(self, sock):
+        """Apply the socket profile to an accepted connection"""
+        return self.profile.apply(sock) if self.profile else sock
+
+    def listen(self, host, port, backlog=5):
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server_socket.bind((host, port))
+        server_socket.listen(backlog)
+        return server_socket
+
+    def connect(self, host, port, timeout=None):
+        return self.configure(socket.create_connection((host, port), timeout))
+
+    def datagram(self, host, port=0):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((host, port))
+        return sock
+
+
+class MemoryConnection:
+    """One end of an in-memory byte stream; behaves like a connected TCP socket"""
+
+    def __init__(self, incoming, outgoing, local_address, peer_address):
+        self.incoming = incoming    # queue.Queue of bytes; None means the peer closed
+        self.outgoing = outgoing
+        self.local_address = local_address
+        self.peer_address = peer_address
+        self.buffer = b''
+        self.timeout = None
+        self.closed = False
+        self.peer_closed = False
+
+    def recv(self, bufsize):
+        if self.closed:
+            raise OSError("Connection closed")
+        if not self.buffer:
+            if self.peer_closed:
+                return b''
+            try:
+                if self.timeout == 0:
+                    chunk = self.incoming.get_nowait()
+                else:
+                    chunk = self.incoming.get(timeout=self.timeout)
+            except queue.Empty:
+                if self.timeout == 0:
+                    raise BlockingIOError("No data available")
+                raise socket.timeout("timed out")
+            if chunk is None:
+                self.peer_closed = True
+                return b''
+            self.buffer = chunk
+        data, self.buffer = self.buffer[:bufsize], self.buffer[bufsize:]
+        return data
+
+    def send(self, data):
+        if self.closed:
+            raise OSError("Connection closed")
+        if self.peer_closed:
+            raise BrokenPipeError("Peer closed the connection")
+        if data:
+            self.outgoing.put(bytes(data))
+        return len(data)
+
+    def sendall(self, data):
+        self.send(data)
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def gettimeout(self):
+        return self.timeout
+
+    def setblocking(self, flag):
+        self.timeout = None if flag else 0
+
+    def setsockopt(self, *args):
+        pass  # No kernel socket to tune
+
+    def getpeername(self):
+        return self.peer_address
+
+    def getsockname(self):
+        return self.local_address
+
+    def shutdown(self, how):
+        if how in (socket.SHUT_WR, socket.SHUT_RDWR) and not self.closed:
+            self.outgoing.put(None)
+        if how in (socket.SHUT_RD, socket.SHUT_RDWR):
+            self.incoming.put(None)  # Wakes a reader blocked in recv()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.outgoing.put(None)
+            self.incoming.put(None)
+
+
+class MemoryListener:
+    """Listening end registered on a MemoryNetwork; accept() returns MemoryConnections"""
+
+    def __init__(self, network, address, backlog):
+        self.network = network
+        self.address = address
+        self.pending = queue.Queue(maxsize=max(1, backlog))
+        self.timeout = None
+        self.closed = False
+
+    def accept(self):
+        if self.closed:
+            raise OSError("Listener closed")
+        try:
+            connection = self.pending.get(timeout=self.timeout)
+        except queue.Empty:
+            raise socket.timeout("timed out")
+        if connection is None:
+            raise OSError("Listener closed")
+        return connection, connection.peer_address
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def setsockopt(self, *args):
+        pass
+
+    def getsockname(self):
+        return self.address
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.network.unregister(self)
+            try:
+                self.pending.put_nowait(None)
+            except queue.Full:
+                pass
+
+
+class MemoryDatagramSocket:
+    """A bound datagram endpoint on a MemoryNetwork; every datagram arrives, in order"""
+
+    def __init__(self, network, address):
+        self.network = network
+        self.address = address
+        self.incoming = queue.Queue()  # (data, sender address); None means closed
+        self.timeout = None
+        self.closed = False
+
+    def sendto(self, data, address):
+        if self.closed:
+            raise OSError("Socket closed")
+        destination = self.network.datagram_endpoints.get(address[1])
+        if destination is not None:  # Nobody listening: silently lost, as with UDP
+            destination.incoming.put((bytes(data), self.address))
+        return len(data)
+
+    def recvfrom(self, bufsize):
+        if self.closed:
+            raise OSError("Socket closed")
+        try:
+            if self.timeout == 0:
+                item = self.incoming.get_nowait()
+            else:
+                item = self.incoming.get(timeout=self.timeout)
+        except queue.Empty:
+            if self.timeout == 0:
+                raise BlockingIOError("No data available")
+            raise socket.timeout("timed out")
+        if item is None:
+            raise OSError("Socket closed")
+        return item[0][:bufsize], item[1]
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def setblocking(self, flag):
+        self.timeout = None if flag else 0
+
+    def getsockname(self):
+        return self.address
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.network.unregister_datagram(self)
+            self.incoming.put(None)
+
+
+class MemoryNetwork:
+    """An in-process network: listeners are found by port, connections are queue pairs"""
+
+    def __init__(self):
+        self.listeners = {}  # {port: MemoryListener}
+        self.datagram_endpoints = {}  # {port: MemoryDatagramSocket}
+        self.lock = threading.Lock()
+        self.ports = itertools.count(40000)
+
+    def configure(self, sock):
+        return sock  # Nothing to tune in memory
+
+    def listen(self, host, port, backlog=5):
+        with self.lock:
+            if port in self.listeners:
+                raise OSError(f"Address already in use: {port}")
+            listener = MemoryListener(self, (host, port), backlog)
+            self.listeners[port] = listener
+        return listener
+
+    def unregister(self, listener):
+        with self.lock:
+            if self.listeners.get(listener.address[1]) is listener:
+                del self.listeners[listener.address[1]]
+
+    def datagram(self, host, port=0):
+        with self.lock:
+            if not port:
+                port = next(self.ports)
+            if port in self.datagram_endpoints:
+                raise OSError(f"Address already in use: {port}")
+            endpoint = MemoryDatagramSocket(self, (host, port))
+            self.datagram_endpoints[port] = endpoint
+        return endpoint
+
+    def unregister_datagram(self, endpoint):
+        with self.lock:
+            if self.datagram_endpoints.get(endpoint.address[1]) is endpoint:
+                del self.datagram_endpoints[endpoint.address[1]]
+
+    def connect(self, host, port, timeout=None, source_ip='127.0.0.1'):
+        """
+        Open a connection to a listener on this network.
+        source_ip lets simulations give each client its own address.
+        """
+        with self.lock:
+            listener = self.listeners.get(port)
+            local_address = (source_ip, next(self.ports))
+        if listener is None:
+            raise ConnectionRefusedError(f"Nothing listening on port {port}")
+
+        to_server, to_client = queue.Queue(), queue.Queue()
+        server_end = MemoryConnection(to_server, to_client, (host, port), local_address)
+        client_end = MemoryConnection(to_client, to_server, local_address, (host, port))
+        try:
+            # A full backlog refuses the connection, like a SYN queue overflow
+            listener.pending.put(server_end, timeout=timeout if timeout is not None else 1)
+        except queue.Full:
+            raise ConnectionRefusedError(f"Backlog full on port {port}")
+        return client_end
@@ -0,0 +1,226 @@
+# UDP fast path for shots and hits
+# On one TCP stream, a single lost segment holds back every later message until it
+# has been retransmitted (head-of-line blocking). Shots and hits are independent of
+# each other, so they may also travel as datagrams, each on its own:
+#   - every datagram is encrypted with the encryptions.py key and carries the
+#     session's resume token and epoch from the server's welcome
+#   - every message has a sequence number; the server acks selectively (everything
+#     up to `cum` plus the numbers in `sack`) and the sender retransmits the rest
+#   - the server processes each sequence number once, however often it arrives
+#   - every datagram also names the sender's lowest unacked seq ("low"), so the
+#     server stops waiting for seqs the sender has given up on
+#   - every message carries an id ("mid") that it keeps if it is resent over TCP or
+#     renumbered after a reconnect; the server drops ids it has already processed
+# Registration and control stay on TCP. Written without struct, f-strings or
+# dataclasses so the same file runs on the Pico.
+
+import json
+import time
+
+from encryptions import encrypt_message, decrypt_message
+
+try:
+    from time import ticks_ms, ticks_diff, ticks_add  # MicroPython
+except ImportError:
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+    def ticks_add(a, b):
+        return a + b
+
+# Only these may take the fast path; everything else needs TCP's ordering
+UDP_MESSAGE_TYPES = ("shoot", "hit_detected")
+MAX_DATAGRAM = 1024
+DEFAULT_WINDOW = 32  # Unacknowledged messages a sender may have in flight
+
+
+def encode_datagram(envelope):
+    """Encrypt a dict for sending as one datagram"""
+    return encrypt_message(json.dumps(envelope))
+
+
+def decode_datagram(data):
+    """Decrypt and parse one datagram; raises ValueError if it is not ours"""
+    envelope = json.loads(decrypt_message(data).decode('utf-8'))
+    if not isinstance(envelope, dict):
+        raise ValueError("Datagram is not an object")
+    return envelope
+
+
+class DatagramSender:
+    """
+    Client end: numbers messages, retransmits until acked and gives up after max_tries.
+    The socket must be non-blocking; call poll() from the main loop.
+    """
+
+    def __init__(self, sock, address, token, epoch, rto_ms=150, max_rto_ms=1000, max_tries=5,
+                 window=DEFAULT_WINDOW):
+        """
+        Args:
+            sock: UDP socket (setblocking(False))
+            address: (host, port) of the server's datagram port, from the welcome
+            token, epoch: resume_token and udp_epoch from the welcome
+            rto_ms: Retransmit timeout before any RTT has been measured; doubles per retry
+            max_tries: Sends per message before poll() hands it back for TCP
+        """
+        self.sock = sock
+        self.address = address
+        self.token = token
+        self.epoch = epoch
+        self.initial_rto = rto_ms
+        self.max_rto = max_rto_ms
+        self.max_tries = max_tries
+        self.window = window
+        self.next_seq = 1
+        self.next_mid = 1
+        self.pending = {}  # {seq: [message, datagram, first_sent, next_send, tries]}
+        self.srtt = None
+        self.retransmits = 0
+
+    def rto(self):
+        if self.srtt is None:
+            return self.initial_rto
+        return min(self.max_rto, max(20, int(self.srtt * 2)))
+
+    def send(self, message):
+        """Send a message (dict); returns False if the window is full and it should go over TCP"""
+        if len(self.pending) >= self.window:
+            return False
+        if "mid" not in message:
+            message["mid"] = self.next_mid
+            self.next_mid += 1
+        seq = self.next_seq
+        self.next_seq += 1
+        low = min(self.pending) if self.pending else seq
+        datagram = encode_datagram({"token": self.token, "epoch": self.epoch, "seq": seq, "low": low,
+                                    "msg": message})
+        now = ticks_ms()
+        self.pending[seq] = [message, datagram, now, ticks_add(now, self.rto()), 1]
+        self._transmit(datagram)
+        return True
+
+    def _transmit(self, datagram):
+        try:
+            self.sock.sendto(datagram, self.address)
+        except OSError:
+            pass  # Same as a lost datagram: the retransmit timer covers it
+
+    def handle_ack(self, ack):
+        """Forget every message the ack covers; sample the RTT from first transmissions"""
+        if ack.get("epoch") != self.epoch:
+            return
+        cum = ack.get("cum", 0)
+        sack = ack.get("sack", ())
+        now = ticks_ms()
+        for seq in list(self.pending):
+            if seq <= cum or seq in sack:
+                entry = self.pending.pop(seq)
+                if entry[4] == 1:  # Karn: a retransmitted message's ack is ambiguous
+                    sample = ticks_diff(now, entry[2])
+                    self.srtt = sample if self.srtt is None else (7 * self.srtt + sample) / 8
+
+    def poll(self):
+        """
+        Read acks, retransmit what is due; returns the messages given up on. They keep
+        their "mid", so resending them over TCP cannot apply them twice.
+        """
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(MAX_DATAGRAM)
+            except OSError:
+                break  # Nothing more to read
+            try:
+                ack = decode_datagram(data)
+            except ValueError:
+                continue
+            if ack.get("type") == "udp_ack":
+                self.handle_ack(ack)
+
+        failed = []
+        now = ticks_ms()
+        for seq in list(self.pending):
+            entry = self.pending[seq]
+            if ticks_diff(now, entry[3]) < 0:
+                continue
+            if entry[4] >= self.max_tries:
+                del self.pending[seq]
+                failed.append(entry[0])
+                continue
+            entry[4] += 1
+            entry[3] = ticks_add(now, min(self.max_rto, self.rto() << (entry[4] - 1)))
+            self.retransmits += 1
+            self._transmit(entry[1])
+        return failed
+
+    def rebind(self, token, epoch):
+        """
+        A new welcome (after a reconnect) starts a new epoch; the server ignores the old
+        one, so unacked messages are renumbered and sent again under the new epoch.
+        """
+        self.token = token
+        self.epoch = epoch
+        unacked = [self.pending[seq][0] for seq in sorted(self.pending)]
+        self.pending = {}
+        self.next_seq = 1
+        for message in unacked:
+            self.send(message)
+
+
+class DatagramReceiver:
+    """Server end for one session epoch: accepts each sequence number once"""
+
+    def __init__(self, epoch, window=DEFAULT_WINDOW * 2):
+        self.epoch = epoch
+        self.window = window
+        self.cum = 0        # Every seq up to here has been received
+        self.above = set()  # Received seqs beyond cum
+
+    def accept(self, seq, low=None):
+        """
+        True the first time seq is seen; False for duplicates and seqs outside the window.
+        low is the sender's lowest unacked seq: anything below it was given up on, so
+        the window slides past it instead of waiting for it forever.
+        """
+        if not isinstance(seq, int):
+            return False
+        if isinstance(low, int) and self.cum < min(low, seq) - 1:
+            self.cum = min(low, seq) - 1
+            self.above = set(s for s in self.above if s > self.cum)
+            self._advance()
+        if seq <= self.cum or seq in self.above or seq > self.cum + self.window:
+            return False
+        self.above.add(seq)
+        self._advance()
+        return True
+
+    def _advance(self):
+        while self.cum + 1 in self.above:
+            self.cum += 1
+            self.above.discard(self.cum)
+
+    def ack(self):
+        return {"type": "udp_ack", "epoch": self.epoch, "cum": self.cum, "sack": sorted(self.above)}
+
+
+class MessageIds:
+    """Server end for one session: the last `capacity` message ids, to drop repeats"""
+
+    def __init__(self, capacity=256):
+        self.seen = set()
+        self.order = []  # Oldest first
+        self.capacity = capacity
+
+    def accept(self, mid):
+        """True the first time mid is seen (and for messages without one)"""
+        if mid is None:
+            return True
+        if mid in self.seen:
+            return False
+        self.seen.add(mid)
+        self.order.append(mid)
+        if len(self.order) > self.capacity:
+            self.seen.discard(self.order.pop(0))
+        return True
@@ -0,0 +1,381 @@
+# Wi-Fi impairment proxy for Laser Tag testing
+# Sits between clients and GameServer and makes localhost behave like a busy
+# 2.4 GHz network: added latency and jitter, a bandwidth cap, writes split into
+# pieces or coalesced together (how TCP segment loss and retransmits look to
+# recv()), lost packets, and occasional dropped connections. With --udp-target it
+# also relays datagrams (udp_channel.py) on the same port number, losing the same
+# share of them.
+#
+# Usage: python wifi_proxy.py --listen 9998 --target 127.0.0.1:9999 --profile congested
+# then point the clients at port 9998. Every proxied client reaches the server from
+# the proxy's address, so start the server with a per-address cap to match, e.g.
+# python EnhancedServerGUI.py -- --max-per-ip 64 (the default of 4 refuses the 5th).
+
+import argparse
+import itertools
+import queue
+import random
+import socket
+import threading
+import time
+
+from socket_profile import LOW_LATENCY
+
+# Ready-made conditions; any field can be overridden on the command line
+PROFILES = {
+    "clean": {},
+    "home": {"latency_ms": 5, "jitter_ms": 3, "split_chance": 0.05, "coalesce_ms": 2},
+    "congested": {"latency_ms": 30, "jitter_ms": 40, "bandwidth_kbps": 256, "split_chance": 0.2,
+                  "coalesce_ms": 15, "loss_chance": 0.01, "drop_chance": 0.001},
+    "bad": {"latency_ms": 120, "jitter_ms": 150, "bandwidth_kbps": 64, "split_chance": 0.4,
+            "coalesce_ms": 40, "loss_chance": 0.05, "drop_chance": 0.01},
+}
+
+
+class Impairment:
+    """Conditions applied to one direction of every proxied connection"""
+    def __init__(self, latency_ms=0, jitter_ms=0, bandwidth_kbps=0, split_chance=0.0, coalesce_ms=0,
+                 loss_chance=0.0, rto_ms=200, drop_chance=0.0, seed=None):
+        """
+        Args:
+            latency_ms: Fixed one-way delay
+            jitter_ms: Extra random delay, 0..jitter_ms (bytes still arrive in order, as with TCP)
+            bandwidth_kbps: Throughput cap in kilobits/s (0 = unlimited)
+            split_chance: Chance that a write is delivered as several smaller pieces
+            coalesce_ms: Writes due within this window of each other are delivered as one
+            loss_chance: Chance per write (or datagram) that its packet is lost. Over TCP the
+                         kernel resends it after rto_ms (200 ms is Linux's minimum) and
+                         everything written after it waits too; a lost datagram is gone
+            drop_chance: Chance per write that the whole connection is dropped
+        """
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.bandwidth = bandwidth_kbps * 1000 / 8  # bytes per second
+        self.split_chance = split_chance
+        self.coalesce = coalesce_ms / 1000
+        self.loss_chance = loss_chance
+        self.rto = rto_ms / 1000
+        self.drop_chance = drop_chance
+        self.seed = seed
+        self.streams = itertools.count()
+
+    def new_random(self):
+        """
+        A generator for one thread. Threads sharing one would draw in whatever order
+        they are scheduled; derived from the seed in creation order, runs repeat.
+        """
+        if self.seed is None:
+            return random.Random()
+        return random.Random(f"{self.seed}/{next(self.streams)}")
+
+
+class ProxyStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.bytes = 0
+        self.writes = 0
+        self.splits = 0
+        self.coalesced = 0
+        self.losses = 0
+        self.datagrams = 0
+        self.drops = 0
+
+    def add(self, **counts):
+        with self.lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def __str__(self):
+        return (f"connections={self.connections} bytes={self.bytes} writes={self.writes} "
+                f"splits={self.splits} coalesced={self.coalesced} losses={self.losses} "
+                f"datagrams={self.datagrams} drops={self.drops}")
+
+
+class _Pipe:
+    """Copies one direction of a connection through an Impairment"""
+
+    def __init__(self, source, destination, impairment, stats, on_drop):
+        self.source = source
+        self.destination = destination
+        self.impairment = impairment
+        self.stats = stats
+        self.on_drop = on_drop
+        self.pending = queue.Queue()  # (deliver_at, data); None marks end of stream
+        self.last_deliver_at = 0.0
+        self.read_random = impairment.new_random()
+        self.write_random = impairment.new_random()
+
+    def start(self):
+        threading.Thread(target=self._read, daemon=True).start()
+        threading.Thread(target=self._write, daemon=True).start()
+
+    def _read(self):
+        imp = self.impairment
+        rng = self.read_random
+        try:
+            while True:
+                data = self.source.recv(4096)
+                if not data:
+                    break
+                if imp.drop_chance and rng.random() < imp.drop_chance:
+                    self.stats.add(drops=1)
+                    self.on_drop()
+                    break  # The writer still needs the end-of-stream marker to finish
+                delay = imp.latency + rng.uniform(0, imp.jitter)
+                if imp.loss_chance and rng.random() < imp.loss_chance:
+                    delay += imp.rto  # Arrives on the retransmit
+                    self.stats.add(losses=1)
+                # Never deliver before earlier data: TCP keeps byte order even when packets don't
+                deliver_at = max(time.monotonic() + delay, self.last_deliver_at)
+                self.last_deliver_at = deliver_at
+                self.pending.put((deliver_at, data))
+        except OSError:
+            pass
+        self.pending.put(None)
+
+    def _write(self):
+        imp = self.impairment
+        rng = self.write_random
+        held = None  # Item taken from the queue that was too late to coalesce
+        try:
+            while True:
+                item = held if held is not None else self.pending.get()
+                held = None
+                if item is None:
+                    break
+                deliver_at, data = item
+
+                # Coalesce: anything else due within the window goes out in the same write
+                finished = False
+                while imp.coalesce:
+                    try:
+                        next_item = self.pending.get(timeout=max(0.0, deliver_at + imp.coalesce - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if next_item is None:
+                        finished = True
+                        break
+                    if next_item[0] > deliver_at + imp.coalesce:
+                        held = next_item
+                        break
+                    data += next_item[1]
+                    self.stats.add(coalesced=1)
+
+                wait = deliver_at - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+
+                # Split: deliver in a few pieces with short gaps, like a partial recv()
+                pieces = [data]
+                if len(data) > 1 and rng.random() < imp.split_chance:
+                    count = min(len(data) - 1, rng.randint(1, 3))
+                    cuts = sorted(rng.sample(range(1, len(data)), count))
+                    pieces = [data[a:b] for a, b in zip([0] + cuts, cuts + [len(data)])]
+                    self.stats.add(splits=1)
+
+                for piece in pieces:
+                    if imp.bandwidth:
+                        time.sleep(len(piece) / imp.bandwidth)
+                    self.destination.sendall(piece)
+                    if len(pieces) > 1:
+                        time.sleep(0.002)
+                self.stats.add(bytes=len(data), writes=len(pieces))
+
+                if finished:
+                    break
+        except OSError:
+            pass
+        try:
+            self.destination.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+
+class ImpairmentProxy:
+    """Accepts clients on listen_port and forwards each to target through impaired pipes"""
+
+    def __init__(self, listen_port, target, upstream=None, downstream=None, listen_host='0.0.0.0'):
+        """
+        Args:
+            target: (host, port) of the real server
+            upstream: Impairment for client -> server traffic
+            downstream: Impairment for server -> client traffic
+        """
+        self.listen_host = listen_host
+        self.listen_port = listen_port
+        self.target = target
+        self.upstream = upstream or Impairment()
+        self.downstream = downstream or Impairment()
+        self.stats = ProxyStats()
+        self.running = False
+        self.server_socket = None
+
+    def start(self):
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((self.listen_host, self.listen_port))
+        self.server_socket.listen(64)
+        self.server_socket.settimeout(1)
+        self.running = True
+        threading.Thread(target=self.accept_connections, daemon=True).start()
+
+    def accept_connections(self):
+        while self.running:
+            try:
+                client_socket, addr = self.server_socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                server_socket = LOW_LATENCY.apply(socket.create_connection(self.target))
+            except OSError as e:
+                print(f"Proxy: cannot reach {self.target}: {e}")
+                client_socket.close()
+                continue
+            LOW_LATENCY.apply(client_socket)  # The proxy adds delay on purpose, never by accident
+            self.stats.add(connections=1)
+
+            def drop(client=client_socket, server=server_socket):
+                # A radio dropout: both ends see the connection die
+                for sock in (client, server):
+                    try:
+                        sock.shutdown(socket.SHUT_RDWR)
+                        sock.close()
+                    except OSError:
+                        pass
+
+            _Pipe(client_socket, server_socket, self.upstream, self.stats, drop).start()
+            _Pipe(server_socket, client_socket, self.downstream, self.stats, drop).start()
+
+    def stop(self):
+        self.running = False
+        if self.server_socket:
+            self.server_socket.close()
+
+
+class DatagramRelay:
+    """
+    Relays datagrams from listen_port to target. Each client address gets its own
+    upstream socket, so the server's replies find their way back.
+    """
+
+    def __init__(self, listen_port, target, upstream=None, downstream=None, stats=None, listen_host='0.0.0.0'):
+        self.listen_host = listen_host
+        self.listen_port = listen_port
+        self.target = target
+        self.upstream = upstream or Impairment()
+        self.downstream = downstream or Impairment()
+        self.stats = stats or ProxyStats()
+        self.running = False
+        self.sock = None
+        self.routes = {}  # {client address: upstream socket}
+        self.upstream_random = self.upstream.new_random()  # Only the receiving thread draws from it
+
+    def start(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((self.listen_host, self.listen_port))
+        self.sock.settimeout(1)
+        self.running = True
+        threading.Thread(target=self._from_clients, daemon=True).start()
+
+    def _forward(self, imp, rng, sock, data, address):
+        # Datagrams may overtake each other; only loss and delay are simulated
+        if imp.loss_chance and rng.random() < imp.loss_chance:
+            self.stats.add(losses=1)
+            return
+        delay = imp.latency + rng.uniform(0, imp.jitter)
+
+        def deliver():
+            try:
+                sock.sendto(data, address)
+                self.stats.add(datagrams=1, bytes=len(data))
+            except OSError:
+                pass
+        threading.Timer(delay, deliver).start()
+
+    def _from_clients(self):
+        while self.running:
+            try:
+                data, client = self.sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            upstream = self.routes.get(client)
+            if upstream is None:
+                upstream = self.routes[client] = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                upstream.settimeout(1)
+                # Its generator is made here so the streams are handed out in arrival order
+                threading.Thread(target=self._from_server, args=(upstream, client, self.downstream.new_random()),
+                                 daemon=True).start()
+            self._forward(self.upstream, self.upstream_random, upstream, data, self.target)
+
+    def _from_server(self, upstream, client, rng):
+        while self.running:
+            try:
+                data, _ = upstream.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self._forward(self.downstream, rng, self.sock, data, client)
+        upstream.close()
+
+    def stop(self):
+        self.running = False
+        if self.sock:
+            self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TCP proxy that adds Wi-Fi style impairments")
+    parser.add_argument('--listen', type=int, default=9998, help="port clients connect to")
+    parser.add_argument('--target', default='127.0.0.1:9999', help="host:port of the real server")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='congested')
+    parser.add_argument('--latency-ms', type=float)
+    parser.add_argument('--jitter-ms', type=float)
+    parser.add_argument('--bandwidth-kbps', type=float)
+    parser.add_argument('--split-chance', type=float)
+    parser.add_argument('--coalesce-ms', type=float)
+    parser.add_argument('--loss-chance', type=float)
+    parser.add_argument('--rto-ms', type=float)
+    parser.add_argument('--drop-chance', type=float)
+    parser.add_argument('--udp-target', help="host:port of the server's datagram port (relayed on --listen)")
+    parser.add_argument('--seed', type=int, help="random seed for repeatable runs")
+    args = parser.parse_args()
+
+    settings = dict(PROFILES[args.profile])
+    for name in ('latency_ms', 'jitter_ms', 'bandwidth_kbps', 'split_chance', 'coalesce_ms', 'loss_chance',
+                 'rto_ms', 'drop_chance'):
+        if getattr(args, name) is not None:
+            settings[name] = getattr(args, name)
+
+    host, _, port = args.target.rpartition(':')
+    seed = args.seed
+    proxy = ImpairmentProxy(
+        args.listen, (host, int(port)),
+        upstream=Impairment(seed=seed, **settings),
+        downstream=Impairment(seed=None if seed is None else seed + 1, **settings)
+    )
+    proxy.start()
+    print(f"Proxy on port {args.listen} -> {args.target} with {settings or 'no impairments'}")
+    relay = None
+    if args.udp_target:
+        udp_host, _, udp_port = args.udp_target.rpartition(':')
+        relay = DatagramRelay(args.listen, (udp_host, int(udp_port)), proxy.upstream, proxy.downstream, proxy.stats)
+        relay.start()
+        print(f"Relaying datagrams on port {args.listen} -> {args.udp_target}")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"Proxy: {proxy.stats}")
+    except KeyboardInterrupt:
+        proxy.stop()
+        if relay:
+            relay.stop()
+
+
+if __name__ == "__main__":
+    main()